@@ -0,0 +1,8 @@
+"""
+Performance benchmarks for the booking APIs.
+
+Each module is a script run from the project root, for example
+`python -m benchmarks.pagination`. Benchmarks build a throwaway test
+database and print their results as JSON. The full suite of API scenarios
+(benchmarks.suite) also runs as `python manage.py benchmark`.
+"""
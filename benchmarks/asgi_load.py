@@ -0,0 +1,193 @@
+"""
+Load test of the catalog and booking endpoints under uvicorn (ASGI) and a
+WSGI server, at high concurrency. Each mode runs in its own server process
+against the same seeded SQLite file:
+
+    wsgi        gunicorn (threads), or Django's runserver when gunicorn is missing
+    asgi-sync   uvicorn serving the DRF views (one thread per request)
+    asgi-async  uvicorn serving the async views (ASYNC_VIEWS=True)
+
+    pip install uvicorn gunicorn
+    python -m benchmarks.asgi_load --concurrency 200 --duration 15
+
+Reports requests/sec, latency percentiles and errors per endpoint and mode.
+Pass --no-cache to measure the catalog without its page cache.
+"""
+import argparse
+import asyncio
+import importlib.util
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.utils import setup_django, summarize, print_report
+
+
+MODES = ('wsgi', 'asgi-sync', 'asgi-async')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def seed(teachers, students, days):
+    """Migrate and fill the benchmark database; returns student access tokens."""
+    from django.core.management import call_command
+    from user.models import User
+    from user.tokens import RoleRefreshToken
+    from benchmarks.data import create_teachers, create_users, create_slots
+
+    call_command('migrate', verbosity=0)
+    create_slots(create_teachers(teachers), days)
+    return [str(RoleRefreshToken.for_user(student).access_token) for student in create_users(students, User.UserRole.STUDENT)]
+
+
+def server_command(mode, port, workers, threads):
+    if mode == 'wsgi':
+        if importlib.util.find_spec('gunicorn'):
+            return ['gunicorn', 'online_class_book.wsgi:application', '-b', f'127.0.0.1:{port}',
+                    '-w', str(workers), '--threads', str(threads), '--log-level', 'warning']
+        return [sys.executable, 'manage.py', 'runserver', f'127.0.0.1:{port}', '--noreload']
+    return ['uvicorn', 'online_class_book.asgi:application', '--port', str(port),
+            '--workers', str(workers), '--log-level', 'warning', '--no-access-log']
+
+
+def start_server(mode, port, env, workers, threads):
+    env = {**env, 'ASYNC_VIEWS': 'True' if mode == 'asgi-async' else 'False'}
+    process = subprocess.Popen(server_command(mode, port, workers, threads), env=env, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f'{mode} server did not start on port {port}')
+
+
+async def read_response(reader):
+    """Read one HTTP/1.1 response; returns (status, keep_alive)."""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('connection closed')
+    status = int(status_line.split()[1])
+    length = 0
+    keep_alive = status_line.startswith(b'HTTP/1.1')
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        name = name.strip().lower()
+        if name == 'content-length':
+            length = int(value)
+        elif name == 'connection':
+            keep_alive = value.strip().lower() == 'keep-alive'
+    await reader.readexactly(length)
+    return status, keep_alive
+
+
+async def load(port, paths, tokens, concurrency, duration):
+    """Keep `concurrency` keep-alive connections busy for `duration` seconds."""
+    samples = []
+    errors = 0
+    deadline = time.monotonic() + duration
+
+    async def worker(number):
+        nonlocal errors
+        token = tokens[number % len(tokens)]
+        connection = None
+        sent = number
+        while time.monotonic() < deadline:
+            path = paths[sent % len(paths)]
+            sent += 1
+            request = (f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\n'
+                       f'Authorization: Bearer {token}\r\n\r\n').encode()
+            started = time.perf_counter()
+            try:
+                if connection is None:
+                    connection = await asyncio.open_connection('127.0.0.1', port)
+                reader, writer = connection
+                writer.write(request)
+                await writer.drain()
+                status, keep_alive = await read_response(reader)
+            except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+                errors += 1
+                connection = None
+                continue
+            samples.append((time.perf_counter() - started) * 1000)
+            if status >= 400:
+                errors += 1
+            if not keep_alive:
+                writer.close()
+                connection = None
+
+    started = time.monotonic()
+    await asyncio.gather(*(worker(number) for number in range(concurrency)))
+    elapsed = time.monotonic() - started
+    if not samples:
+        return {'errors': errors}
+    return {**summarize(samples), 'requests_per_s': round(len(samples) / elapsed, 1), 'errors': errors}
+
+
+def endpoints(pages):
+    from django.urls import reverse
+
+    return {
+        'catalog': [f"{reverse('teacher_available_slot')}?page={page}" for page in range(1, pages + 1)],
+        'catalog_cursor': [f"{reverse('teacher_available_slot')}?pagination=cursor"],
+        'bookings': [reverse('book_class_slot')],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--teachers', type=int, default=50)
+    parser.add_argument('--students', type=int, default=100)
+    parser.add_argument('--days', type=int, default=14)
+    parser.add_argument('--pages', type=int, default=20, help="Distinct catalog pages requested.")
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=15)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--threads', type=int, default=8, help="Threads per gunicorn worker.")
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    parser.add_argument('--no-cache', action='store_true')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = {**os.environ, 'SQLITE_NAME': os.path.join(directory, 'bench.sqlite3')}
+        if args.no_cache:
+            env['CACHE_BACKEND'] = 'django.core.cache.backends.dummy.DummyCache'
+        # Seed through the same settings the servers will load
+        os.environ.update(env)
+        setup_django()
+        tokens = seed(args.teachers, args.students, args.days)
+        paths = endpoints(args.pages)
+
+        results = []
+        for mode in args.modes:
+            if mode != 'wsgi' and not importlib.util.find_spec('uvicorn'):
+                results.append({'mode': mode, 'skipped': 'uvicorn is not installed'})
+                continue
+            port = free_port()
+            process = start_server(mode, port, env, args.workers, args.threads)
+            try:
+                result = {'mode': mode}
+                for name, urls in paths.items():
+                    result[name] = asyncio.run(load(port, urls, tokens, args.concurrency, args.duration))
+                results.append(result)
+            finally:
+                process.terminate()
+                process.wait()
+
+    print_report('asgi_load', results, teachers=args.teachers, students=args.students, days=args.days,
+                 concurrency=args.concurrency, duration=args.duration, workers=args.workers, cache=not args.no_cache)
+
+
+if __name__ == '__main__':
+    main()
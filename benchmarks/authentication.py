@@ -0,0 +1,82 @@
+"""
+Compare per-request cost of database-backed JWT authentication with the
+stateless token user on the authenticated slot endpoints.
+
+    python -m benchmarks.authentication --teachers 50 --days 7 --repeat 50
+"""
+import argparse
+from contextlib import contextmanager
+from benchmarks.utils import setup_django, benchmark_database, measure, print_report
+
+
+@contextmanager
+def authentication_classes(classes):
+    """Swap the authentication classes of every APIView for the duration of a run."""
+    from rest_framework.views import APIView
+
+    previous = APIView.authentication_classes
+    APIView.authentication_classes = classes
+    try:
+        yield
+    finally:
+        APIView.authentication_classes = previous
+
+
+def run(teachers, days, repeat):
+    from django.test import Client
+    from django.urls import reverse
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.tokens import RefreshToken
+    from user.authentication import StatelessJWTAuthentication
+    from user.tokens import RoleRefreshToken
+    from user.models import User
+    from slot_booking.booking import book_slot
+    from benchmarks.data import create_teachers, create_users, create_slots
+
+    teacher_users = create_teachers(teachers)
+    slots = create_slots(teacher_users, days)
+    student = create_users(1, User.UserRole.STUDENT)[0]
+    teacher = teacher_users[0]
+    # A few bookings with different teachers at different hours
+    for index in range(min(5, teachers)):
+        book_slot(student, slots[index * (teachers + 1)].id)
+
+    endpoints = [
+        ('teacher_slot_get_create', teacher),
+        ('teacher_available_slot', student),
+        ('book_class_slot', student),
+    ]
+    modes = [
+        ('database_user', [JWTAuthentication], RefreshToken),
+        ('token_user', [StatelessJWTAuthentication], RoleRefreshToken),
+    ]
+
+    # Unique query strings keep the catalog cache out of the measurement
+    counter = iter(range(10 ** 9))
+    results = []
+    for name, user in endpoints:
+        result = {'endpoint': reverse(name)}
+        for mode, classes, token_class in modes:
+            client = Client(HTTP_AUTHORIZATION=f'Bearer {token_class.for_user(user).access_token}')
+            url = result['endpoint'] + '?nocache={}'
+            with authentication_classes(classes):
+                result[mode] = measure(lambda: client.get(url.format(next(counter))), repeat)
+        results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--teachers', type=int, default=50)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+    with benchmark_database():
+        results = run(args.teachers, args.days, args.repeat)
+    print_report('authentication', results, teachers=args.teachers, days=args.days, repeat=args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Compare coverage and runtime of the default booking solvers ('greedy' and
+'matching', see slot_booking/matching.py) on a generated day, in memory.
+
+    python -m benchmarks.booking_solvers --students 10000 --teachers 10
+
+Teachers open a random subset of the day's hourly slots with random
+capacities; `--staggered` of them start on the half hour, so their slots
+partly overlap the others. `--prebooked` of the students already hold one
+booking. Coverage is bookings over what students could attend at most.
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from benchmarks.utils import setup_django, print_report
+
+
+def build_day(teachers, students, hours, min_capacity, max_capacity, staggered, prebooked, seed):
+    """Inputs of an assign function: (teacher_slots, student_ids, schedules, seats)."""
+    from slot_booking.default_booking import StudentDay
+
+    rng = random.Random(seed)
+    day = datetime(2030, 1, 7)
+    teacher_slots = {}
+    seats = {}
+    slot_id = 0
+    for teacher_id in range(1, teachers + 1):
+        offset = timedelta(minutes=30) if rng.random() < staggered else timedelta()
+        open_hours = sorted(rng.sample(list(hours), rng.randint(len(hours) // 2, len(hours))))
+        teacher_slots[teacher_id] = []
+        for hour in open_hours:
+            slot_id += 1
+            start_time = day + timedelta(hours=hour) + offset
+            teacher_slots[teacher_id].append((slot_id, start_time, start_time + timedelta(hours=1)))
+            seats[slot_id] = rng.randint(min_capacity, max_capacity)
+
+    student_ids = list(range(1, students + 1))
+    schedules = {student_id: StudentDay() for student_id in student_ids}
+    all_slots = [(teacher_id, slot) for teacher_id, slots in teacher_slots.items() for slot in slots]
+    for student_id in rng.sample(student_ids, int(students * prebooked)):
+        teacher_id, (slot_id, start_time, end_time) = rng.choice(all_slots)
+        if seats[slot_id] > 0:
+            seats[slot_id] -= 1
+            schedules[student_id].attend(teacher_id, start_time, end_time)
+    return teacher_slots, student_ids, schedules, seats
+
+
+def copy_day(day):
+    """Fresh copy of the mutable parts of a build_day result."""
+    from slot_booking.default_booking import StudentDay
+
+    teacher_slots, student_ids, schedules, seats = day
+    copies = {}
+    for student_id, schedule in schedules.items():
+        copy = StudentDay()
+        for teacher_id in schedule.teachers:
+            copy.teachers.add(teacher_id)
+        for start_time, end_time in schedule.intervals:
+            copy.intervals.add(start_time, end_time)
+        copies[student_id] = copy
+    return teacher_slots, student_ids, copies, dict(seats)
+
+
+def run_solver(assign, day, repeat):
+    samples = []
+    for _ in range(repeat):
+        teacher_slots, student_ids, schedules, seats = copy_day(day)
+        started = time.perf_counter()
+        assignments = assign(teacher_slots, student_ids, schedules, seats)
+        samples.append((time.perf_counter() - started) * 1000)
+
+    teachers = len(teacher_slots)
+    return {
+        'booked': len(assignments),
+        'fully_covered_students': sum(len(schedule.teachers) == teachers for schedule in schedules.values()),
+        'min_ms': round(min(samples), 1),
+        'mean_ms': round(sum(samples) / len(samples), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--teachers', type=int, default=10)
+    parser.add_argument('--students', type=int, default=10000)
+    parser.add_argument('--first-hour', type=int, default=8)
+    parser.add_argument('--last-hour', type=int, default=20)
+    parser.add_argument('--min-capacity', type=int, default=500)
+    parser.add_argument('--max-capacity', type=int, default=1500)
+    parser.add_argument('--staggered', type=float, default=0.0, help="Share of teachers starting on the half hour.")
+    parser.add_argument('--prebooked', type=float, default=0.05, help="Share of students with one booking already.")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+    from slot_booking.default_booking import assign_greedy
+    from slot_booking.matching import assign_matching
+
+    day = build_day(
+        args.teachers, args.students, range(args.first_hour, args.last_hour), args.min_capacity,
+        args.max_capacity, args.staggered, args.prebooked, args.seed
+    )
+    teacher_slots, student_ids, schedules, seats = day
+    # A student attends at most one slot per teacher, and no more slots than fit in a day without overlaps
+    day_length = 0
+    day_end = None
+    for start_time, end_time in sorted({slot[1:] for slots in teacher_slots.values() for slot in slots}, key=lambda interval: interval[1]):
+        if day_end is None or start_time >= day_end:
+            day_length += 1
+            day_end = end_time
+    demand = sum(min(args.teachers, day_length) - len(schedule.teachers) for schedule in schedules.values())
+    bound = min(demand, sum(seats.values()))
+
+    results = {
+        'greedy': run_solver(assign_greedy, day, args.repeat),
+        'matching': run_solver(assign_matching, day, args.repeat),
+    }
+
+    for result in results.values():
+        result['coverage'] = round(result['booked'] / bound, 4) if bound else None
+    print_report('booking_solvers', results, upper_bound=bound, seats=sum(seats.values()), **vars(args))
+
+
+if __name__ == '__main__':
+    main()
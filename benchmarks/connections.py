@@ -0,0 +1,126 @@
+"""
+Per-request database connection overhead: a connection per request
+(CONN_MAX_AGE=0) against persistent connections, with and without health
+checks, and the psycopg pool on PostgreSQL. On SQLite each mode also runs
+with the production PRAGMAs (settings.SQLITE_PRAGMAS).
+
+    python -m benchmarks.connections --repeat 500
+    DB_ENGINE=postgresql DB_NAME=... python -m benchmarks.connections
+
+Requests go through the Django test client. It does not fire the
+request_finished cleanup, so each request is followed by
+close_old_connections() as the WSGI handler would.
+"""
+import argparse
+import os
+import tempfile
+import time
+from benchmarks.utils import setup_django, benchmark_database, measure, print_report
+
+
+MODES = {
+    'per_request': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False},
+    'persistent': {'CONN_MAX_AGE': 60, 'CONN_HEALTH_CHECKS': False},
+    'persistent_health_checks': {'CONN_MAX_AGE': 60, 'CONN_HEALTH_CHECKS': True},
+    # PostgreSQL only
+    'pool': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': True, 'pool': True},
+}
+PRODUCTION_PRAGMAS = {'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'busy_timeout': 5000}
+
+
+def seed():
+    from django.db import close_old_connections
+    from django.urls import reverse
+    from django.test import Client
+    from user.models import User
+    from user.tokens import RoleRefreshToken
+    from benchmarks.data import create_teachers, create_users, create_slots
+
+    create_slots(create_teachers(10), 3)
+    student = create_users(1, User.UserRole.STUDENT)[0]
+    client = Client(HTTP_AUTHORIZATION=f'Bearer {RoleRefreshToken.for_user(student).access_token}')
+    url = reverse('book_class_slot')
+
+    def request():
+        client.get(url)
+        close_old_connections()
+
+    return request
+
+
+def connect_ms(connection, repeat=50):
+    """Mean time to open a new connection, PRAGMAs included."""
+    samples = []
+    for _ in range(repeat):
+        connection.close()
+        started = time.perf_counter()
+        connection.ensure_connection()
+        samples.append((time.perf_counter() - started) * 1000)
+    return round(sum(samples) / len(samples), 3)
+
+
+def run_mode(connection, name, request, repeat):
+    from django.db.backends.signals import connection_created
+
+    options = MODES[name]
+    if options.get('pool') and connection.vendor != 'postgresql':
+        return {'skipped': 'the pool needs PostgreSQL'}
+
+    connection.close()
+    if connection.vendor == 'postgresql':
+        connection.close_pool()
+    connection.settings_dict['CONN_MAX_AGE'] = options['CONN_MAX_AGE']
+    connection.settings_dict['CONN_HEALTH_CHECKS'] = options['CONN_HEALTH_CHECKS']
+    if 'pool' in options:
+        connection.settings_dict['OPTIONS']['pool'] = options['pool']
+    else:
+        connection.settings_dict['OPTIONS'].pop('pool', None)
+
+    opened = []
+
+    def count(sender, connection, **kwargs):
+        opened.append(connection.alias)
+
+    connection_created.connect(count)
+    try:
+        result = measure(request, repeat)
+    finally:
+        connection_created.disconnect(count)
+    result['connections_opened'] = len(opened)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=300)
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+    from django.test import override_settings
+
+    with tempfile.TemporaryDirectory() as directory:
+        if connection.vendor == 'sqlite':
+            # A file database: the in-memory test database never closes its connection
+            connection.settings_dict['TEST']['NAME'] = os.path.join(directory, 'bench.sqlite3')
+            pragma_profiles = {'default': {}, 'production': PRODUCTION_PRAGMAS}
+        else:
+            pragma_profiles = {'default': {}}
+
+        results = []
+        with benchmark_database():
+            request = seed()
+            for profile, pragmas in pragma_profiles.items():
+                with override_settings(SQLITE_PRAGMAS=pragmas):
+                    result = {'pragmas': profile, 'connect_ms': connect_ms(connection)}
+                    for name in args.modes:
+                        result[name] = run_mode(connection, name, request, args.repeat)
+                    results.append(result)
+            connection.close()
+
+    print_report('connections', results, vendor=connection.vendor, repeat=args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+from datetime import datetime, time, timedelta
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+from user.models import User, TeacherProfile, normalize_subject
+from slot_booking.models import TeacherAvailabilitySlot
+
+
+SUBJECTS = ('Math', 'Physics', 'Chemistry', 'Biology', 'History', 'Geography', 'English', 'Music')
+BATCH_SIZE = 2000
+
+
+def create_users(count, role, offset=0):
+    """Bulk insert `count` users of `role` with unusable passwords."""
+    password = make_password(None)
+    users = [
+        User(
+            email=f"{role.lower()}{offset + index}@bench.test",
+            first_name=role,
+            last_name=f"Bench{offset + index}",
+            phone=f"{'7' if role == User.UserRole.TEACHER else '8'}{offset + index:09d}",
+            age=20,
+            role=role,
+            password=password,
+        )
+        for index in range(count)
+    ]
+    return User.objects.bulk_create(users, batch_size=BATCH_SIZE)
+
+
+def create_teachers(count, offset=0):
+    """Bulk insert teachers with a profile, cycling through SUBJECTS."""
+    teachers = create_users(count, User.UserRole.TEACHER, offset)
+    profiles = []
+    for index, teacher in enumerate(teachers):
+        subject = SUBJECTS[index % len(SUBJECTS)]
+        profiles.append(TeacherProfile(user=teacher, subject=subject, subject_key=normalize_subject(subject)))
+    TeacherProfile.objects.bulk_create(profiles, batch_size=BATCH_SIZE)
+    return teachers
+
+
+def create_slots(teachers, days, hours=range(8, 20), first_day=None, capacity=30):
+    """Bulk insert one-hour slots for every teacher, hour and day starting tomorrow."""
+    first_day = first_day or timezone.localdate() + timedelta(days=1)
+    slots = []
+    for offset in range(days):
+        day = first_day + timedelta(days=offset)
+        for hour in hours:
+            start_time = timezone.make_aware(datetime.combine(day, time(hour)))
+            for teacher in teachers:
+                slots.append(TeacherAvailabilitySlot(
+                    teacher=teacher,
+                    start_time=start_time,
+                    end_time=start_time + timedelta(hours=1),
+                    capacity=capacity,
+                ))
+    return TeacherAvailabilitySlot.objects.bulk_create(slots, batch_size=BATCH_SIZE)
+
+
+def generate_dataset(teachers, students, slots_per_day, days, first_day=None):
+    """
+    Bulk insert `teachers` teachers with `slots_per_day` one-hour slots on
+    each of `days` days from `first_day` (today by default), and `students`
+    students. Returns the created objects.
+    """
+    first_day = first_day or timezone.localdate()
+    first_hour = max(0, min(8, 24 - slots_per_day))
+    teacher_users = create_teachers(teachers)
+    return {
+        'teachers': teacher_users,
+        'students': create_users(students, User.UserRole.STUDENT),
+        'slots': create_slots(teacher_users, days, range(first_hour, first_hour + slots_per_day), first_day),
+        'first_day': first_day,
+    }
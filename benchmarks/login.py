@@ -0,0 +1,114 @@
+"""
+Login throughput per password hasher, through the sync LoginAPIView and
+the async AsyncLoginAPIView.
+
+    python -m benchmarks.login --hashers pbkdf2 scrypt argon2 --logins 64 --concurrency 8
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.utils import setup_django, benchmark_database, summarize, print_report
+
+
+PASSWORD = 'Bench@123'
+
+
+def hasher_settings(name):
+    from django.conf import settings
+
+    paths = {
+        'argon2': 'user.hashers.TunedArgon2PasswordHasher',
+        'scrypt': 'user.hashers.TunedScryptPasswordHasher',
+        'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    }
+    return [paths[name]] + [path for path in settings.PASSWORD_HASHERS if path != paths[name]]
+
+
+def timed_logins(login, emails, concurrency):
+    """Run `login(email)` for every email with `concurrency` threads."""
+    samples = []
+
+    def timed(email):
+        started = time.perf_counter()
+        login(email)
+        samples.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(timed, emails))
+    return samples, time.perf_counter() - started
+
+
+async def async_timed_logins(view, factory, emails, concurrency):
+    """Run the async login view for every email, `concurrency` at a time."""
+    samples = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed(email):
+        async with semaphore:
+            request = factory.post('/api/login/', {'email': email, 'password': PASSWORD}, content_type='application/json')
+            started = time.perf_counter()
+            response = await view(request)
+            samples.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 200, response.content
+
+    started = time.perf_counter()
+    await asyncio.gather(*(timed(email) for email in emails))
+    return samples, time.perf_counter() - started
+
+
+def run(hashers, logins, concurrency):
+    from django.contrib.auth.hashers import make_password, get_hasher
+    from django.test import Client, AsyncRequestFactory, override_settings
+    from django.urls import reverse
+    from user.models import User
+    from user.views import AsyncLoginAPIView
+    from benchmarks.data import create_users
+
+    users = create_users(logins, User.UserRole.STUDENT)
+    emails = [user.email for user in users]
+    url = reverse('login')
+    results = []
+
+    for name in hashers:
+        if name == 'argon2':
+            try:
+                import argon2  # noqa: F401
+            except ImportError:
+                results.append({'hasher': name, 'skipped': 'argon2-cffi is not installed'})
+                continue
+
+        with override_settings(PASSWORD_HASHERS=hasher_settings(name)):
+            started = time.perf_counter()
+            User.objects.update(password=make_password(PASSWORD))
+            result = {'hasher': get_hasher().algorithm, 'hash_ms': round((time.perf_counter() - started) * 1000, 3)}
+
+            def login(email):
+                response = Client().post(url, {'email': email, 'password': PASSWORD}, content_type='application/json')
+                assert response.status_code == 200, response.content
+
+            samples, elapsed = timed_logins(login, emails, concurrency)
+            result['sync'] = {**summarize(samples), 'logins_per_s': round(len(samples) / elapsed, 2)}
+
+            samples, elapsed = asyncio.run(async_timed_logins(AsyncLoginAPIView.as_view(), AsyncRequestFactory(), emails, concurrency))
+            result['async'] = {**summarize(samples), 'logins_per_s': round(len(samples) / elapsed, 2)}
+        results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hashers', nargs='+', choices=['pbkdf2', 'scrypt', 'argon2'], default=['pbkdf2', 'scrypt', 'argon2'])
+    parser.add_argument('--logins', type=int, default=64)
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    setup_django()
+    with benchmark_database():
+        results = run(args.hashers, args.logins, args.concurrency)
+    print_report('login', results, logins=args.logins, concurrency=args.concurrency)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Compare page-N latency of page-number and cursor pagination on the student
+slot catalog (`teacher-available-slot/`).
+
+    python -m benchmarks.pagination --teachers 100 --days 40 --pages 1 10 100 1000
+"""
+import argparse
+from benchmarks.utils import setup_django, benchmark_database, measure, print_report
+
+
+def run(teachers, days, pages, repeat):
+    from django.test import Client
+    from django.urls import reverse
+    from rest_framework.settings import api_settings
+    from rest_framework_simplejwt.tokens import RefreshToken
+    from online_class_book.pagination import KeysetPagination
+    from slot_booking.models import TeacherAvailabilitySlot
+    from user.models import User
+    from benchmarks.data import create_teachers, create_users, create_slots
+
+    create_slots(create_teachers(teachers), days)
+    student = create_users(1, User.UserRole.STUDENT)[0]
+    client = Client(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(student).access_token}')
+    url = 'http://testserver' + reverse('teacher_available_slot')
+    total = TeacherAvailabilitySlot.objects.count()
+
+    results = []
+    for page in pages:
+        offset = (page - 1) * api_settings.PAGE_SIZE
+        if offset >= total:
+            continue
+
+        # Cursor that a client walking the catalog would hold when asking for this page
+        cursor_url = url + '?pagination=cursor'
+        if offset:
+            paginator = KeysetPagination()
+            paginator.base_url = cursor_url
+            last_row = TeacherAvailabilitySlot.objects.order_by('start_time', 'id').values('start_time', 'id')[offset - 1]
+            cursor_url = paginator.encode_cursor(last_row, reverse=False)
+
+        results.append({
+            'page': page,
+            'page_number': measure(lambda: client.get(url, {'page': page}), repeat),
+            'cursor': measure(lambda: client.get(cursor_url), repeat),
+        })
+    return total, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--teachers', type=int, default=100)
+    parser.add_argument('--days', type=int, default=40)
+    parser.add_argument('--pages', type=int, nargs='+', default=[1, 10, 100, 1000, 4000])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    with benchmark_database():
+        total, results = run(args.teachers, args.days, args.pages, args.repeat)
+    print_report('pagination', results, slots=total, repeat=args.repeat)
+
+
+if __name__ == '__main__':
+    main()
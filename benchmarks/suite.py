@@ -0,0 +1,259 @@
+"""
+Benchmark suite: timed scenarios for every URL of the user and slot_booking
+apps plus the daily default-booking run, on a generated dataset.
+
+    python -m benchmarks.suite --teachers 50 --students 500 --output before.json
+    python -m benchmarks.suite --compare before.json
+
+Also available as `python manage.py benchmark`. Scenarios that write run
+inside a rolled back transaction, so every repetition sees the same data.
+Each scenario reports wall time percentiles and queries per call; the JSON
+report records the git commit it was run on for comparisons.
+"""
+import argparse
+import json
+import subprocess
+from contextlib import contextmanager
+from datetime import timedelta
+from benchmarks.utils import setup_django, benchmark_database, measure
+
+
+PASSWORD = 'Bench@123'
+
+
+class Rollback(Exception):
+    pass
+
+
+def rolled_back(func):
+    """Run `func` in a transaction that is always rolled back."""
+    from django.db import transaction
+
+    def run():
+        try:
+            with transaction.atomic():
+                func()
+                raise Rollback
+        except Rollback:
+            pass
+    return run
+
+
+def expect(response, status_code):
+    assert response.status_code == status_code, (response.status_code, response.content[:500])
+    return response
+
+
+def consume(response):
+    """Read a streamed response to the end, so its queries and rendering are measured."""
+    for _ in response.streaming_content:
+        pass
+    return response
+
+
+@contextmanager
+def no_catalog_cache():
+    from django.test import override_settings
+
+    with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}):
+        yield
+
+
+@contextmanager
+def catalog_cache():
+    from django.test import override_settings
+
+    # The suite runs in one process, so the local-memory cache is as good as a shared one
+    with override_settings(SLOT_CATALOG_PAGE_CACHE=True):
+        yield
+
+
+def build_scenarios(data):
+    """Scenario name -> (callable, context manager factory or None)."""
+    from django.contrib.auth.hashers import make_password
+    from django.test import Client
+    from django.urls import reverse
+    from user.tokens import RoleRefreshToken
+    from slot_booking.default_booking import DefaultBookingEngine
+    from slot_booking.jobs import run_pending_jobs
+    from slot_booking.models import BookingJob, TeacherAvailabilitySlot
+
+    first_day = data['first_day']
+    teacher, student = data['teachers'][0], data['students'][0]
+    # A student without bookings, for the booking scenario
+    new_student = data['students'][-1]
+    student.password = make_password(PASSWORD)
+    student.save(update_fields=['password'])
+    # The default booking endpoints are staff only
+    teacher.is_staff = True
+    teacher.save(update_fields=['is_staff'])
+
+    # Tomorrow's slots booked for every student but the last, so listings have bookings
+    DefaultBookingEngine(first_day + timedelta(days=1)).run()
+    new_student.booked_slots.all().delete()
+
+    def client_for(user):
+        refresh = RoleRefreshToken.for_user(user)
+        return Client(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}'), refresh
+
+    teacher_client, _ = client_for(teacher)
+    student_client, student_refresh = client_for(student)
+    new_student_client, _ = client_for(new_student)
+    anonymous = Client()
+
+    last_day = first_day + timedelta(days=data['days'] - 1)
+    free_day = last_day + timedelta(days=1)
+    book_slot_id = TeacherAvailabilitySlot.objects.filter(start_time__date=last_day).order_by('start_time', 'id').values_list('id', flat=True).first()
+    catalog = reverse('teacher_available_slot')
+
+    # A finished job, so the pending jobs run by the default booking scenario stay the same
+    status_job = BookingJob.objects.create(day=first_day - timedelta(days=1), status=BookingJob.Status.DONE, result={})
+    # Each row is hashed with the preferred hasher, so keep the import small
+    bulk_users = [{
+        'email': f'bench-bulk{index}@bench.test', 'first_name': 'Bulk', 'last_name': 'Student',
+        'phone': f'6{index:09d}', 'age': 20, 'role': 'Student', 'password': PASSWORD,
+    } for index in range(10)]
+
+    def new_slot(hour):
+        return {'start_time': f'{free_day} {hour:02d}:00', 'end_time': f'{free_day} {hour + 1:02d}:00'}
+
+    return {
+        'register': (rolled_back(lambda: expect(anonymous.post(reverse('register'), {
+            'email': 'bench-new@bench.test', 'first_name': 'New', 'last_name': 'Student', 'phone': '6000000000',
+            'age': 20, 'role': 'Student', 'password': PASSWORD,
+        }, content_type='application/json'), 201)), None),
+        'login': (lambda: expect(anonymous.post(reverse('login'), {
+            'email': student.email, 'password': PASSWORD
+        }, content_type='application/json'), 200), None),
+        'refresh': (lambda: expect(anonymous.post(reverse('refresh'), {
+            'refresh': str(student_refresh)
+        }, content_type='application/json'), 200), None),
+        'register_bulk': (rolled_back(lambda: expect(teacher_client.post(
+            reverse('register_bulk'), {'users': bulk_users}, content_type='application/json'
+        ), 201)), None),
+        'logout': (rolled_back(lambda: expect(student_client.post(reverse('logout'), {
+            'refresh': str(student_refresh)
+        }, content_type='application/json'), 200)), None),
+        'teacher_slots_list': (lambda: expect(teacher_client.get(reverse('teacher_slot_get_create')), 200), None),
+        'teacher_slots_create': (rolled_back(lambda: expect(teacher_client.post(
+            reverse('teacher_slot_get_create'), new_slot(8), content_type='application/json'
+        ), 201)), None),
+        'teacher_slots_bulk': (rolled_back(lambda: expect(teacher_client.post(
+            reverse('teacher_slot_bulk_create'), {'slots': [new_slot(hour) for hour in range(8, 20)]}, content_type='application/json'
+        ), 201)), None),
+        'teacher_slots_export': (lambda: consume(expect(teacher_client.get(reverse('teacher_slot_export')), 200)), None),
+        'teacher_slots_export_ndjson': (lambda: consume(expect(teacher_client.get(
+            reverse('teacher_slot_export'), {'export_format': 'ndjson'}
+        ), 200)), None),
+        'catalog_page_1': (lambda: expect(student_client.get(catalog), 200), no_catalog_cache),
+        'catalog_last_page': (lambda: expect(student_client.get(catalog, {'page': 'last'}), 200), no_catalog_cache),
+        'catalog_subject': (lambda: expect(student_client.get(catalog, {'subject': 'math'}), 200), no_catalog_cache),
+        'catalog_cursor': (lambda: expect(student_client.get(catalog, {'pagination': 'cursor'}), 200), no_catalog_cache),
+        'catalog_cached': (lambda: expect(student_client.get(catalog), 200), catalog_cache),
+        'catalog_heatmap': (lambda: expect(student_client.get(reverse('teacher_available_slot_heatmap'), {
+            'date_from': first_day.isoformat(), 'date_to': last_day.isoformat()
+        }), 200), no_catalog_cache),
+        'bookings_list': (lambda: expect(student_client.get(reverse('book_class_slot')), 200), None),
+        'book_slot': (rolled_back(lambda: expect(new_student_client.post(
+            reverse('book_class_slot'), {'slot_id': book_slot_id}, content_type='application/json'
+        ), 201)), None),
+        # Enqueue through the API, then run the job inline (the pool cannot see a rolled-back transaction)
+        'default_booking': (rolled_back(lambda: (
+            expect(teacher_client.post(reverse('set_default_class_slot')), 202), run_pending_jobs(workers=1)
+        )), None),
+        'default_booking_status': (lambda: expect(teacher_client.get(
+            reverse('default_class_slot_job', args=[status_job.id])
+        ), 200), None),
+    }
+
+
+def run(params, names=None):
+    from benchmarks.data import generate_dataset
+
+    data = generate_dataset(params['teachers'], params['students'], params['slots_per_day'], params['days'])
+    data['days'] = params['days']
+    scenarios = build_scenarios(data)
+
+    results = {}
+    for name, (func, context) in scenarios.items():
+        if names and name not in names:
+            continue
+        if context:
+            with context():
+                results[name] = measure(func, params['repeat'])
+        else:
+            results[name] = measure(func, params['repeat'])
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline):
+    """Per scenario p50 ratio and query difference against a previous report."""
+    changes = {}
+    for name, result in results.items():
+        before = baseline['results'].get(name)
+        if not before:
+            continue
+        changes[name] = {
+            'p50_ratio': round(result['p50_ms'] / before['p50_ms'], 3) if before['p50_ms'] else None,
+            'queries_delta': round(result['queries'] - before['queries'], 2),
+        }
+    return {'baseline_commit': baseline.get('commit'), 'changes': changes}
+
+
+def run_suite(teachers=50, students=500, slots_per_day=8, days=7, repeat=20, scenarios=None, baseline=None):
+    """Build a throwaway database, run the scenarios and return the JSON report."""
+    params = {'teachers': teachers, 'students': students, 'slots_per_day': slots_per_day, 'days': days, 'repeat': repeat}
+    with benchmark_database():
+        results = run(params, scenarios)
+    report = {'benchmark': 'suite', 'commit': git_commit(), 'params': params, 'results': results}
+    if baseline:
+        report['comparison'] = compare(results, baseline)
+    return report
+
+
+def add_arguments(parser):
+    parser.add_argument('--teachers', type=int, default=50)
+    parser.add_argument('--students', type=int, default=500)
+    parser.add_argument('--slots-per-day', type=int, default=8)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--scenarios', nargs='+', help="Only run these scenarios.")
+    parser.add_argument('--output', help="Also write the JSON report to this file.")
+    parser.add_argument('--compare', help="JSON report of an earlier run to compare against.")
+
+
+def main_with(options, write):
+    baseline = None
+    if options['compare']:
+        with open(options['compare']) as baseline_file:
+            baseline = json.load(baseline_file)
+
+    report = run_suite(
+        options['teachers'], options['students'], options['slots_per_day'], options['days'],
+        options['repeat'], options['scenarios'], baseline
+    )
+    output = json.dumps(report, indent=2, default=str)
+    if options['output']:
+        with open(options['output'], 'w') as output_file:
+            output_file.write(output)
+    write(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    setup_django()
+    main_with(vars(args), print)
+
+
+if __name__ == '__main__':
+    main()
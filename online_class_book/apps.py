@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class OnlineClassBookConfig(AppConfig):
+    """Project-wide hooks that belong to no single app."""
+    name = 'online_class_book'
+
+    def ready(self):
+        # Per-connection database setup (SQLite PRAGMAs)
+        from online_class_book import db  # noqa: F401
@@ -0,0 +1,72 @@
+"""
+Minimal async counterpart of DRF's APIView for the ASGI-native endpoints.
+
+DRF views are synchronous, so under ASGI every request to them holds a
+thread. AsyncAPIView keeps what the slot endpoints rely on (stateless JWT
+authentication, permission classes, the get_response envelope and DRF's
+exception handling) and runs the handler as a coroutine. Handlers use the
+async ORM; anything that must stay synchronous, like a transaction, goes
+through sync_to_async.
+"""
+from django.http import HttpResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, status
+from rest_framework.parsers import JSONParser, FormParser, MultiPartParser
+from rest_framework.request import Request
+from rest_framework.views import set_rollback
+from online_class_book.renderers import FastJSONRenderer
+from online_class_book.utils import custom_token_exception_handler
+from user.authentication import StatelessJWTAuthentication, TokenUser
+
+
+def render_json(data, code_status=status.HTTP_200_OK, headers=None):
+    """JSON HttpResponse rendered the way FastJSONRenderer renders DRF responses."""
+    return HttpResponse(FastJSONRenderer().render(data), status=code_status, content_type='application/json', headers=headers)
+
+
+class AsyncAPIView(View):
+    # Only authentication that needs no query can run on the event loop
+    authentication_classes = [StatelessJWTAuthentication]
+    permission_classes = []
+    parser_classes = [JSONParser, FormParser, MultiPartParser]
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Token authenticated like the DRF views, so no CSRF check
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        request = Request(
+            request,
+            parsers=[parser() for parser in self.parser_classes],
+            authenticators=[auth() for auth in self.authentication_classes]
+        )
+        self.request = request
+        try:
+            await self.check_permissions(request)
+            handler = getattr(self, request.method.lower(), None)
+            if request.method.lower() not in self.http_method_names or handler is None:
+                raise exceptions.MethodNotAllowed(request.method)
+            return await handler(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            return self.handle_exception(exc)
+
+    async def check_permissions(self, request):
+        user = request.user
+        if isinstance(user, TokenUser):
+            # Tokens without a role claim need the user row; load it here,
+            # not from the sync permission check
+            await user.aload()
+        for permission in [permission() for permission in self.permission_classes]:
+            if not permission.has_permission(request, self):
+                if request.authenticators and not request.successful_authenticator:
+                    raise exceptions.NotAuthenticated()
+                raise exceptions.PermissionDenied(getattr(permission, 'message', None))
+
+    def handle_exception(self, exc):
+        response = custom_token_exception_handler(exc, {'view': self, 'request': self.request})
+        if response is None:
+            raise exc
+        set_rollback()
+        return render_json(response.data, response.status_code)
@@ -0,0 +1,15 @@
+"""
+Cache helpers shared by the apps. Web workers, the booking worker and
+management commands run in separate processes, so data they exchange
+through a cache needs a backend all of them see.
+"""
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+# Backends whose contents only the current process sees
+PROCESS_LOCAL_BACKENDS = (LocMemCache, DummyCache)
+
+
+def is_process_local(cache):
+    return isinstance(cache, PROCESS_LOCAL_BACKENDS)
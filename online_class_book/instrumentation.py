@@ -0,0 +1,325 @@
+"""
+Per-request instrumentation: view name, query count, DB time, serializer
+time and render time, for a sampled share of requests.
+
+RequestMetricsMiddleware opens a RequestMetrics record for sampled requests
+and keeps it in a context variable, which follows the request into
+sync_to_async threads. Queries are timed by an execute wrapper installed on
+every database connection; serializers and renderers report their time
+through `record_time`. Finished records get a Server-Timing header and are
+handed to the sinks in settings.REQUEST_METRICS_SINKS.
+"""
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+
+_current = ContextVar('request_metrics', default=None)
+logger = logging.getLogger('online_class_book.requests')
+
+
+class RequestMetrics:
+    __slots__ = ('method', 'path', 'view', 'status', 'queries', 'db_ms', 'serializer_ms', 'render_ms', 'total_ms', '_started')
+
+    def __init__(self, request):
+        self.method = request.method
+        self.path = request.path
+        self.view = None
+        self.status = None
+        self.queries = 0
+        self.db_ms = 0.0
+        self.serializer_ms = 0.0
+        self.render_ms = 0.0
+        self.total_ms = 0.0
+        self._started = time.perf_counter()
+
+    def as_dict(self):
+        return {
+            'method': self.method,
+            'path': self.path,
+            'view': self.view,
+            'status': self.status,
+            'queries': self.queries,
+            'db_ms': round(self.db_ms, 3),
+            'serializer_ms': round(self.serializer_ms, 3),
+            'render_ms': round(self.render_ms, 3),
+            'total_ms': round(self.total_ms, 3),
+        }
+
+    def server_timing(self):
+        return (
+            f'db;dur={self.db_ms:.2f};desc="{self.queries} queries", '
+            f'serializer;dur={self.serializer_ms:.2f}, render;dur={self.render_ms:.2f}, '
+            f'total;dur={self.total_ms:.2f}'
+        )
+
+
+def current_metrics():
+    """Metrics of the request being handled, or None when it is not sampled."""
+    return _current.get()
+
+
+@contextmanager
+def record_time(name):
+    """Add the time spent in the block to `<name>_ms` of the current request."""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        setattr(metrics, f'{name}_ms', getattr(metrics, f'{name}_ms') + (time.perf_counter() - started) * 1000)
+
+
+def record_query(execute, sql, params, many, context):
+    """Connection execute wrapper counting and timing queries of sampled requests."""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_ms += (time.perf_counter() - started) * 1000
+
+
+def install_query_recorder(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    install_query_recorder(connection)
+
+
+class TimedSerializerMixin:
+    """Serializer mixin reporting the time spent building `.data` as serializer time."""
+
+    @property
+    def data(self):
+        with record_time('serializer'):
+            return super().data
+
+
+class RequestMetricsMiddleware:
+    """
+    Collect RequestMetrics for REQUEST_METRICS_SAMPLE_RATE of the requests.
+    Unsampled requests only pay for one random() call.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'REQUEST_METRICS_SAMPLE_RATE', 1.0)
+        self.server_timing = getattr(settings, 'REQUEST_METRICS_SERVER_TIMING', True)
+        self.sinks = get_sinks()
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(connection)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+
+        token = _current.set(RequestMetrics(request))
+        try:
+            response = self.get_response(request)
+            return self.finish(response)
+        finally:
+            _current.reset(token)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+
+        token = _current.set(RequestMetrics(request))
+        try:
+            response = await self.get_response(request)
+            return self.finish(response)
+        finally:
+            _current.reset(token)
+
+    def sampled(self):
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = _current.get()
+        if metrics is not None:
+            view_class = getattr(view_func, 'view_class', None)
+            metrics.view = (view_class or view_func).__name__
+
+    def finish(self, response):
+        metrics = _current.get()
+        # Streaming responses render while being sent, after this point
+        if not response.streaming and hasattr(response, 'render') and not response.is_rendered:
+            response.render()
+        metrics.status = response.status_code
+        metrics.total_ms = (time.perf_counter() - metrics._started) * 1000
+        if self.server_timing:
+            response['Server-Timing'] = metrics.server_timing()
+        for sink in self.sinks:
+            sink.emit(metrics)
+        return response
+
+
+_sinks = None
+
+
+def get_sinks():
+    """Sink instances for settings.REQUEST_METRICS_SINKS, shared by the process."""
+    global _sinks
+    if _sinks is None:
+        _sinks = [import_string(path)() for path in getattr(settings, 'REQUEST_METRICS_SINKS', [])]
+    return _sinks
+
+
+class LogSink:
+    """One JSON log line per request on the `online_class_book.requests` logger."""
+
+    def emit(self, metrics):
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps(metrics.as_dict()))
+
+
+# Upper bounds of the histogram buckets; the last bucket is open-ended
+MS_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+HISTOGRAM_FIELDS = {
+    'total_ms': MS_BUCKETS,
+    'db_ms': MS_BUCKETS,
+    'serializer_ms': MS_BUCKETS,
+    'render_ms': MS_BUCKETS,
+    'queries': COUNT_BUCKETS,
+}
+KEY_PREFIX = 'reqmetrics'
+INDEX_KEY = f'{KEY_PREFIX}:processes'
+
+
+def empty_histograms():
+    return {
+        'count': 0,
+        **{field: {'sum': 0, 'buckets': [0] * (len(bounds) + 1)} for field, bounds in HISTOGRAM_FIELDS.items()},
+    }
+
+
+def merge_histograms(target, source):
+    target['count'] += source['count']
+    for field in HISTOGRAM_FIELDS:
+        target[field]['sum'] += source[field]['sum']
+        target[field]['buckets'] = [a + b for a, b in zip(target[field]['buckets'], source[field]['buckets'])]
+    return target
+
+
+def histogram_percentile(histogram, bounds, fraction):
+    """Upper bound of the bucket holding the given fraction of the samples."""
+    total = sum(histogram['buckets'])
+    if not total:
+        return None
+    rank = fraction * total
+    seen = 0
+    for index, count in enumerate(histogram['buckets']):
+        seen += count
+        if seen >= rank:
+            return bounds[index] if index < len(bounds) else float('inf')
+
+
+def summarize_histograms(histograms):
+    """Per-view counts, means and bucket percentiles of a {view: histograms} mapping."""
+    summary = {}
+    for view, data in sorted(histograms.items()):
+        count = data['count']
+        row = {'count': count}
+        for field, bounds in HISTOGRAM_FIELDS.items():
+            row[f'{field}_mean'] = round(data[field]['sum'] / count, 3) if count else None
+        for fraction in (0.5, 0.95, 0.99):
+            row[f'total_ms_p{round(fraction * 100)}'] = histogram_percentile(data['total_ms'], MS_BUCKETS, fraction)
+        summary[view] = row
+    return summary
+
+
+class HistogramSink:
+    """
+    Fixed-bucket histograms per view, kept in process and published to the
+    REQUEST_METRICS_CACHE_ALIAS cache every REQUEST_METRICS_FLUSH_INTERVAL
+    seconds, where the `request_metrics` command merges the snapshots of all
+    processes. The default alias is a file cache, shared by the processes of
+    one host; the command warns when the alias is process-local.
+    """
+
+    def __init__(self):
+        self.histograms = {}
+        self.process_key = f'{KEY_PREFIX}:process:{socket.gethostname()}:{os.getpid()}'
+        self._lock = threading.Lock()
+        self._flushed_at = time.monotonic()
+
+    def emit(self, metrics):
+        view = metrics.view or metrics.path
+        with self._lock:
+            data = self.histograms.get(view)
+            if data is None:
+                data = self.histograms[view] = empty_histograms()
+            data['count'] += 1
+            for field, bounds in HISTOGRAM_FIELDS.items():
+                value = getattr(metrics, field)
+                data[field]['sum'] += value
+                data[field]['buckets'][bisect_left(bounds, value)] += 1
+        if time.monotonic() - self._flushed_at >= getattr(settings, 'REQUEST_METRICS_FLUSH_INTERVAL', 10):
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            snapshot = json.loads(json.dumps(self.histograms))
+            self._flushed_at = time.monotonic()
+        cache = get_metrics_cache()
+        cache.set(self.process_key, snapshot, 24 * 60 * 60)
+        index = cache.get(INDEX_KEY) or []
+        if self.process_key not in index:
+            cache.set(INDEX_KEY, index + [self.process_key], None)
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
+
+
+def get_metrics_cache():
+    return caches[getattr(settings, 'REQUEST_METRICS_CACHE_ALIAS', 'default')]
+
+
+def collected_histograms():
+    """Histograms of every process that published to the cache, merged per view."""
+    cache = get_metrics_cache()
+    merged = {}
+    for snapshot in cache.get_many(cache.get(INDEX_KEY) or []).values():
+        for view, data in snapshot.items():
+            merge_histograms(merged.setdefault(view, empty_histograms()), data)
+    return merged
+
+
+def reset_collected_histograms():
+    cache = get_metrics_cache()
+    cache.delete_many((cache.get(INDEX_KEY) or []) + [INDEX_KEY])
+    for sink in get_sinks():
+        if isinstance(sink, HistogramSink):
+            sink.reset()
@@ -0,0 +1,188 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from django.core.paginator import InvalidPage, Page
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination keyed on a (datetime, id) pair, by default (start_time, id).
+
+    Each page is an index range scan starting right after the previous
+    page's last row, so deep pages cost the same as the first one and no
+    COUNT(*) is run. The response keeps the page-number envelope minus `count`.
+    """
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, ordering=('start_time', 'id')):
+        self.ordering = ordering
+
+    def encode_cursor(self, row, reverse):
+        time_value, id_value = self.get_position(row)
+        token = '{}|{}|{}'.format('r' if reverse else 'n', time_value.isoformat(), id_value)
+        return replace_query_param(self.base_url, self.cursor_query_param, urlsafe_b64encode(token.encode()).decode())
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            direction, time_value, id_value = urlsafe_b64decode(encoded.encode()).decode().split('|')
+            if direction not in ('n', 'r'):
+                raise ValueError(direction)
+            return direction == 'r', datetime.fromisoformat(time_value), int(id_value)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_position(self, row):
+        time_field, id_field = self.ordering
+        if isinstance(row, dict):
+            return row[time_field], row[id_field]
+        return getattr(row, time_field), getattr(row, id_field)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if isinstance(queryset, list):
+            return self.paginate_list(queryset, request)
+        queryset, cursor, reverse = self.page_queryset(queryset, request)
+        return self.page_rows(list(queryset), cursor, reverse)
+
+    def paginate_list(self, rows, request):
+        """paginate_queryset for rows already in memory and sorted by the ordering."""
+        self.base_url = request.build_absolute_uri()
+        cursor = self.decode_cursor(request)
+        reverse = False
+
+        if cursor:
+            reverse, time_value, id_value = cursor
+            if reverse:
+                rows = [row for row in reversed(rows) if self.get_position(row) < (time_value, id_value)]
+            else:
+                rows = [row for row in rows if self.get_position(row) > (time_value, id_value)]
+
+        return self.page_rows(rows[:self.page_size + 1], cursor, reverse)
+
+    async def apaginate_queryset(self, queryset, request):
+        """Async paginate_queryset, for the async views."""
+        queryset, cursor, reverse = self.page_queryset(queryset, request)
+        return self.page_rows([row async for row in queryset], cursor, reverse)
+
+    def page_queryset(self, queryset, request):
+        """The queryset of the requested page, plus the decoded cursor and direction."""
+        self.base_url = request.build_absolute_uri()
+        time_field, id_field = self.ordering
+        cursor = self.decode_cursor(request)
+        reverse = False
+
+        if cursor:
+            reverse, time_value, id_value = cursor
+            if reverse:
+                queryset = queryset.filter(
+                    Q(**{f'{time_field}__lte': time_value}),
+                    Q(**{f'{time_field}__lt': time_value}) | Q(**{f'{id_field}__lt': id_value})
+                )
+            else:
+                queryset = queryset.filter(
+                    Q(**{f'{time_field}__gte': time_value}),
+                    Q(**{f'{time_field}__gt': time_value}) | Q(**{f'{id_field}__gt': id_value})
+                )
+
+        if reverse:
+            queryset = queryset.order_by(f'-{time_field}', f'-{id_field}')
+        else:
+            queryset = queryset.order_by(time_field, id_field)
+
+        # Fetch one extra row to know whether there is another page
+        return queryset[:self.page_size + 1], cursor, reverse
+
+    def page_rows(self, rows, cursor, reverse):
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        has_next = has_more if not reverse else cursor is not None
+        has_previous = has_more if reverse else cursor is not None
+        self.next_link = self.encode_cursor(rows[-1], False) if rows and has_next else None
+        self.previous_link = self.encode_cursor(rows[0], True) if rows and has_previous else None
+        return rows
+
+    def get_paginated_data(self, data):
+        return {
+            'next': self.next_link,
+            'previous': self.previous_link,
+            'results': data,
+        }
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class AsyncPageNumberPagination(PageNumberPagination):
+    """
+    PageNumberPagination for the async views: the count and the page are
+    fetched with the async ORM, links and errors are the same as the sync one.
+    """
+
+    async def apaginate_queryset(self, queryset, request):
+        self.request = request
+        count = await queryset.acount()
+        paginator = self.django_paginator_class([], self.page_size)
+        # Paginator only needs the count to validate page numbers
+        paginator.__dict__['count'] = count
+
+        page_number = self.get_page_number(request, paginator)
+        try:
+            number = paginator.validate_number(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+
+        offset = (number - 1) * self.page_size
+        rows = [row async for row in queryset[offset:offset + self.page_size]]
+        self.page = Page(rows, number, paginator)
+        return rows
+
+    def get_paginated_data(self, data):
+        return {
+            'count': self.page.paginator.count,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+
+
+class SelectablePaginationMixin:
+    """
+    Lets each request opt into keyset pagination with `?pagination=cursor`;
+    page-number pagination stays the default.
+    """
+    pagination_query_param = 'pagination'
+    keyset_ordering = ('start_time', 'id')
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if self.request.query_params.get(self.pagination_query_param) == 'cursor':
+                self._paginator = KeysetPagination(self.keyset_ordering)
+            elif self.pagination_class is None:
+                self._paginator = None
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
@@ -14,6 +14,7 @@ from pathlib import Path
 from dotenv import load_dotenv
 from datetime import timedelta
 import os
+import tempfile
 
 load_dotenv() 
 
@@ -45,11 +46,15 @@ INSTALLED_APPS = [
     'rest_framework',
     'rest_framework_simplejwt',
     'rest_framework_simplejwt.token_blacklist',
+    # Project-wide hooks, see online_class_book/apps.py
+    'online_class_book.apps.OnlineClassBookConfig',
     'user',
     'slot_booking'
 ]
 
 MIDDLEWARE = [
+    # First, so its total covers every other middleware
+    'online_class_book.instrumentation.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -83,32 +88,102 @@ WSGI_APPLICATION = 'online_class_book.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-# DATABASES = {
-#     'default': {
-#         'ENGINE': 'django.db.backends.postgresql_psycopg2',
-#         'NAME': os.getenv('DB_NAME'),
-#         'USER': os.getenv('DB_USERNAME'),
-#         'PASSWORD': os.getenv('PASSWORD'),
-#         'HOST': os.getenv('HOST'),
-#         'PORT': os.getenv('PORT'),
-#     }
-# }
+# DB_ENGINE picks the backend: 'sqlite' (default) or 'postgresql'
+DB_ENGINE = os.getenv('DB_ENGINE', 'sqlite')
+# Seconds a connection is reused across requests, 0 closes it after each
+# request. Async views run each request in another thread, so they rely on
+# the pool instead of persistent connections.
+DB_CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', 0 if os.environ.get('ASYNC_VIEWS') == 'True' else 60))
+# Check a reused connection before the first query of each request
+DB_CONN_HEALTH_CHECKS = os.getenv('DB_CONN_HEALTH_CHECKS', 'True') == 'True'
+
+if DB_ENGINE == 'postgresql':
+    # psycopg 3 connection pool (Django 5.1), needs psycopg[pool]; replaces persistent connections
+    DB_POOL = os.getenv('DB_POOL', 'False') == 'True'
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('DB_NAME'),
+            'USER': os.getenv('DB_USERNAME'),
+            'PASSWORD': os.getenv('DB_PASSWORD', os.getenv('PASSWORD')),
+            'HOST': os.getenv('DB_HOST', os.getenv('HOST')),
+            'PORT': os.getenv('DB_PORT', os.getenv('PORT')),
+            'CONN_MAX_AGE': 0 if DB_POOL else DB_CONN_MAX_AGE,
+            # With the pool, connections are checked as they leave it
+            'CONN_HEALTH_CHECKS': DB_CONN_HEALTH_CHECKS,
+            'OPTIONS': {},
+        }
+    }
+    if DB_POOL:
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+            # Seconds a request waits for a free connection
+            'timeout': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+            # Seconds before an idle connection above min_size is closed
+            'max_idle': float(os.getenv('DB_POOL_MAX_IDLE', 600)),
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('SQLITE_NAME', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': DB_CONN_HEALTH_CHECKS,
+            # Take the write lock when a transaction starts, so concurrent writers
+            # (like default booking shards) wait for it instead of failing
+            'OPTIONS': {'transaction_mode': 'IMMEDIATE'},
+        }
+    }
+
+# PRAGMAs run on every new SQLite connection (online_class_book/db.py).
+# Production mode: write-ahead log so readers never wait for the writer,
+# fsync at checkpoints only, and a busy timeout for concurrent writers.
+SQLITE_PRODUCTION = os.getenv('SQLITE_PRODUCTION', 'False') == 'True'
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+} if SQLITE_PRODUCTION else {}
 
 
-DATABASES = {
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    },
+    # Request metrics of every process, read by the request_metrics command;
+    # files are shared by the processes of one host
+    'request_metrics': {
+        'BACKEND': os.getenv('REQUEST_METRICS_CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.getenv('REQUEST_METRICS_CACHE_LOCATION', os.path.join(tempfile.gettempdir(), 'online_class_book_request_metrics')),
+    },
 }
 
+# Student slot catalog response cache (slot_booking.cache)
+SLOT_CATALOG_CACHE_ALIAS = 'default'
+SLOT_CATALOG_CACHE_TIMEOUT = int(os.getenv('SLOT_CATALOG_CACHE_TIMEOUT', 60))
+# ETag/Last-Modified on the slot listings come from version counters in the
+# cache: 'True'/'False', or unset to send them only when the cache is shared
+# by all processes (not LocMemCache), see slot_booking.cache.validators_enabled
+SLOT_LISTING_VALIDATORS = {'True': True, 'False': False}.get(os.getenv('SLOT_LISTING_VALIDATORS'))
+# Same for the cached catalog pages, see slot_booking.cache.page_cache_enabled
+SLOT_CATALOG_PAGE_CACHE = {'True': True, 'False': False}.get(os.getenv('SLOT_CATALOG_PAGE_CACHE'))
+
 
 # Rest framework
 REST_FRAMEWORK = {
     'EXCEPTION_HANDLER': 'online_class_book.utils.custom_token_exception_handler',
     'NON_FIELD_ERRORS_KEY': 'detail',
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'user.authentication.StatelessJWTAuthentication',  # role and id from token claims, no user query
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'online_class_book.renderers.FastJSONRenderer',  # orjson when installed
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,  # Number of items per page
@@ -122,6 +197,56 @@ SIMPLE_JWT = {
     "SIGNING_KEY": "gdfgnknfh545gh45g4",
 }
 
+# Bloom-filter front of the token blacklist, see user/blacklist.py: 'True'/'False',
+# or unset to use it only when the cache is shared by all processes (not
+# LocMemCache); forced on with a local cache, a process accepts other
+# processes' logouts for up to TOKEN_BLACKLIST_SYNC_INTERVAL seconds
+TOKEN_BLACKLIST_BLOOM = {'True': True, 'False': False}.get(os.getenv('TOKEN_BLACKLIST_BLOOM'))
+TOKEN_BLACKLIST_BLOOM_CAPACITY = int(os.environ.get('TOKEN_BLACKLIST_BLOOM_CAPACITY', 100000))
+TOKEN_BLACKLIST_BLOOM_ERROR_RATE = 0.001
+# Longest a filter goes without a re-sync, when cache versions are missed
+TOKEN_BLACKLIST_SYNC_INTERVAL = int(os.environ.get('TOKEN_BLACKLIST_SYNC_INTERVAL', 5))
+TOKEN_BLACKLIST_CACHE_ALIAS = 'default'
+
+# Seconds a process keeps User rows loaded behind stateless tokens, 0 disables it
+USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 0))
+
+
+# Password hashing
+# https://docs.djangoproject.com/en/5.1/topics/auth/passwords/
+# The preferred hasher hashes new passwords: Django's stock PBKDF2, or opt in
+# to the tuned 'scrypt' or 'argon2' (needs argon2-cffi). These cost more per
+# check and only the async login (ASYNC_VIEWS) verifies off the request
+# thread. The other hashers stay listed, so existing hashes keep verifying and
+# are rehashed with the preferred one on the user's next successful login.
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'pbkdf2')
+_PASSWORD_HASHERS = {
+    'argon2': 'user.hashers.TunedArgon2PasswordHasher',
+    'scrypt': 'user.hashers.TunedScryptPasswordHasher',
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+}
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASHER]] + [
+    path for name, path in _PASSWORD_HASHERS.items() if name != PASSWORD_HASHER
+] + ['django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher']
+
+PASSWORD_SCRYPT = {
+    'work_factor': int(os.environ.get('PASSWORD_SCRYPT_WORK_FACTOR', 2 ** 15)),
+    'block_size': 8,
+    'parallelism': 1,
+}
+PASSWORD_ARGON2 = {
+    'time_cost': int(os.environ.get('PASSWORD_ARGON2_TIME_COST', 3)),
+    'memory_cost': int(os.environ.get('PASSWORD_ARGON2_MEMORY_COST', 65536)),  # KiB
+    'parallelism': 1,
+}
+# Threads verifying passwords for the async login view
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+# Processes hashing passwords for the import_users command (user.bulk_import)
+PASSWORD_IMPORT_WORKERS = int(os.environ.get('PASSWORD_IMPORT_WORKERS', os.cpu_count() or 1))
+
+# Serve the async variants of views that have one (run under ASGI)
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', 'False') == 'True'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -166,3 +291,49 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Setup user model
 AUTH_USER_MODEL = 'user.User'
+
+# Per-request metrics (online_class_book/instrumentation.py)
+# Share of requests measured, 0 to turn instrumentation off
+REQUEST_METRICS_SAMPLE_RATE = float(os.environ.get('REQUEST_METRICS_SAMPLE_RATE', '1.0'))
+REQUEST_METRICS_SERVER_TIMING = os.environ.get('REQUEST_METRICS_SERVER_TIMING', 'True') == 'True'
+_REQUEST_METRICS_SINKS = {
+    'log': 'online_class_book.instrumentation.LogSink',
+    'histogram': 'online_class_book.instrumentation.HistogramSink',
+}
+REQUEST_METRICS_SINKS = [
+    _REQUEST_METRICS_SINKS.get(name, name)
+    for name in os.environ.get('REQUEST_METRICS_SINKS', 'histogram').split(',') if name
+]
+# Seconds between publishing a process's histograms to the cache
+REQUEST_METRICS_FLUSH_INTERVAL = int(os.environ.get('REQUEST_METRICS_FLUSH_INTERVAL', '10'))
+REQUEST_METRICS_CACHE_ALIAS = 'request_metrics'
+
+# Daily default booking job (slot_booking/jobs.py)
+# Server-local time after which the booking worker enqueues the day's job
+DEFAULT_BOOKING_TIME = os.environ.get('DEFAULT_BOOKING_TIME', '00:05')
+# 'greedy' books in student order, 'matching' teacher by teacher with a max-flow
+# per teacher (a heuristic, see slot_booking/matching.py)
+DEFAULT_BOOKING_SOLVER = os.environ.get('DEFAULT_BOOKING_SOLVER', 'greedy')
+DEFAULT_BOOKING_SHARD_SIZE = int(os.environ.get('DEFAULT_BOOKING_SHARD_SIZE', '2000'))
+# Processes running shards in parallel; 1 runs them in the worker itself
+DEFAULT_BOOKING_WORKERS = int(os.environ.get('DEFAULT_BOOKING_WORKERS', os.cpu_count() or 1))
+# A running job without a heartbeat for this long is resumed by another worker
+BOOKING_JOB_STALE_SECONDS = int(os.environ.get('BOOKING_JOB_STALE_SECONDS', '600'))
+BOOKING_WORKER_POLL_INTERVAL = int(os.environ.get('BOOKING_WORKER_POLL_INTERVAL', '30'))
+# Run the worker in a thread of the web process instead of `manage.py booking_worker`
+BOOKING_WORKER_IN_PROCESS = os.environ.get('BOOKING_WORKER_IN_PROCESS', 'False') == 'True'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'online_class_book.requests': {
+            'handlers': ['console'],
+            'level': os.environ.get('REQUEST_METRICS_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
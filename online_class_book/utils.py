@@ -1,13 +1,47 @@
+from datetime import date as date_type, datetime, time, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.utils import timezone
 from rest_framework.response import Response
 from rest_framework.views import exception_handler
 from rest_framework_simplejwt.exceptions import InvalidToken
-from rest_framework.exceptions import NotAuthenticated
+from rest_framework.exceptions import NotAuthenticated, PermissionDenied
 from rest_framework import status
+from online_class_book.renderers import FastJSONRenderer
 
 
 # Helper for return response
-def get_response(code_status, msg, payload):
-    return Response( {'status': code_status, 'msg': msg, 'data': payload }, status=code_status)
+def get_response(code_status, msg, payload, headers=None):
+    return Response( {'status': code_status, 'msg': msg, 'data': payload }, status=code_status, headers=headers)
+
+
+# Same envelope for plain Django views (the async ones), rendered like DRF would
+def get_json_response(code_status, msg, payload, headers=None):
+    content = FastJSONRenderer().render({'status': code_status, 'msg': msg, 'data': payload})
+    return HttpResponse(content, status=code_status, content_type='application/json', headers=headers)
+
+
+# Conditional GET headers for a response with the given validators, none without an ETag
+def validator_headers(etag, last_modified):
+    if etag is None:
+        return {}
+    return {'ETag': etag, 'Last-Modified': http_date(last_modified)}
+
+
+def get_not_modified_response(request, etag, last_modified):
+    """
+    The 304 (or 412) response when the request's If-None-Match or
+    If-Modified-Since headers match the validators, otherwise None.
+    """
+    if etag is None:
+        return None
+    response = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+    if response is not None:
+        for name, value in validator_headers(etag, last_modified).items():
+            response[name] = value
+    return response
 
 
 # Custom error for authentication
@@ -15,5 +49,57 @@ def custom_token_exception_handler(exc, context):
     response = exception_handler(exc, context)
     if (isinstance(exc, InvalidToken)) or (isinstance(exc, NotAuthenticated)):
         return get_response(status.HTTP_401_UNAUTHORIZED, 'Invalid Access key.', {})
+    if isinstance(exc, PermissionDenied):
+        return get_response(status.HTTP_403_FORBIDDEN, str(exc.detail), {})
 
     return response
+
+
+DATE_FORMAT = "%Y-%m-%d"
+INVALID_DATE_MESSAGE = "Please Pass Valid Date Params in 'YYYY-MM-DD' format"
+
+
+# Helper for turning calendar days into an index-friendly datetime range
+def date_window(first_day, last_day=None, tz=None):
+    """
+    Return the half-open [start, end) datetime range covering `first_day`
+    through `last_day` (inclusive) in `tz`, the current timezone by default.
+    """
+    tz = tz or timezone.get_current_timezone()
+    last_day = last_day or first_day
+    start = timezone.make_aware(datetime.combine(first_day, time.min), tz)
+    end = timezone.make_aware(datetime.combine(last_day + timedelta(days=1), time.min), tz)
+    return start, end
+
+
+def get_date_window(query_params):
+    """
+    Build a date window from `date` or `date_from`/`date_to` query params,
+    read in the user's `tz` timezone when given. Returns None when no date
+    filter was passed and raises ValueError with a client message on bad input.
+    """
+    date = query_params.get("date")
+    date_from = query_params.get("date_from") or date
+    date_to = query_params.get("date_to") or date
+    if not (date_from or date_to):
+        return None
+
+    try:
+        first_day = datetime.strptime(date_from or date_to, DATE_FORMAT).date()
+        last_day = datetime.strptime(date_to or date_from, DATE_FORMAT).date()
+    except ValueError:
+        raise ValueError(INVALID_DATE_MESSAGE)
+    # The window ends the day after last_day and may move a day in UTC; keep both representable
+    if first_day == date_type.min or last_day == date_type.max:
+        raise ValueError(INVALID_DATE_MESSAGE)
+    if last_day < first_day:
+        raise ValueError("'date_to' must not be earlier than 'date_from'.")
+
+    tz = None
+    if query_params.get("tz"):
+        try:
+            tz = ZoneInfo(query_params["tz"])
+        except (ZoneInfoNotFoundError, ValueError):
+            raise ValueError("Please Pass a Valid 'tz' Timezone Name")
+
+    return date_window(first_day, last_day, tz)
@@ -0,0 +1,18 @@
+"""
+Spawned process pools with Django set up, for slot_booking.jobs and
+user.bulk_import. Pool processes import this module before Django is set
+up, so it must not import Django at module level; neither may the modules
+of the functions sent to the pool (slot_booking.job_worker, user.hash_worker).
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+
+def setup():
+    import django
+    django.setup()
+
+
+def spawn_pool(workers):
+    """Pool of `workers` processes. Spawning, unlike forking, is safe next to the worker and server threads."""
+    return ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'), initializer=setup)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class SlotBookingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'slot_booking'
+
+    def ready(self):
+        # Register signal handlers
+        from slot_booking import signals  # noqa: F401
@@ -0,0 +1,116 @@
+"""
+ASGI-native versions of the catalog and booking endpoints, served instead
+of the DRF views in slot_booking.views when settings.ASYNC_VIEWS is on.
+Responses are the same as the sync views'.
+"""
+from asgiref.sync import sync_to_async
+from django.db.models import F
+from django.utils.timezone import now
+from rest_framework import status
+from online_class_book.async_views import AsyncAPIView, render_json
+from online_class_book.pagination import AsyncPageNumberPagination, KeysetPagination
+from online_class_book.utils import get_date_window, get_json_response, validator_headers, get_not_modified_response
+from user.permissions import IsStudent
+from slot_booking.models import TeacherAvailabilitySlot
+from slot_booking.serializers import SlotBookingForStudentSerializer
+from slot_booking.fast_serializers import available_slot_values, available_slot_rows, schedule_booking_rows
+from slot_booking.booking import book_slot, BookingError
+from slot_booking.schedules import upcoming_bookings
+from slot_booking.cache import catalog_validators, listing_validators, student_scope, get_cached_page, set_cached_page
+
+
+class AsyncSelectablePaginationMixin:
+    """Async SelectablePaginationMixin: `?pagination=cursor` switches to keyset pagination."""
+    pagination_query_param = 'pagination'
+    keyset_ordering = ('start_time', 'id')
+
+    async def paginate(self, request, queryset):
+        if request.query_params.get(self.pagination_query_param) == 'cursor':
+            self.paginator = KeysetPagination(self.keyset_ordering)
+        else:
+            self.paginator = AsyncPageNumberPagination()
+        if isinstance(queryset, list):
+            # Rows already in memory, nothing to await
+            return self.paginator.paginate_queryset(queryset, request)
+        return await self.paginator.apaginate_queryset(queryset, request)
+
+
+class AsyncStudentTeacherSlotsAPIView(AsyncSelectablePaginationMixin, AsyncAPIView):
+    """
+    Async StudentTeacherSlotsAPIView.
+    """
+    permission_classes = [IsStudent]
+    permission_denied_messages = {'GET': "You do not have permission to requested endpoint."}
+
+    async def get(self, request):
+        subject = request.query_params.get("subject", None)
+
+        try:
+            window = get_date_window(request.query_params)
+        except ValueError as e:
+            return get_json_response(status.HTTP_400_BAD_REQUEST, str(e), {})
+
+        # Cache backends are blocking, keep them off the event loop
+        cache_key, etag, last_modified = await sync_to_async(catalog_validators, thread_sensitive=False)(request, window)
+        not_modified = get_not_modified_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+        headers = validator_headers(etag, last_modified)
+
+        cached_page = await sync_to_async(get_cached_page, thread_sensitive=False)(cache_key)
+        if cached_page is not None:
+            return render_json(cached_page, headers={'X-Cache': 'HIT', **headers})
+
+        slots_queryset = TeacherAvailabilitySlot.objects.filter(
+            start_time__gt=now(),
+            booked_count__lt=F('capacity')
+        )
+        if subject:
+            slots_queryset = slots_queryset.for_subject(subject)
+        if window:
+            slots_queryset = slots_queryset.starting_within(window)
+        slots_queryset = slots_queryset.order_by('start_time', 'id')
+
+        slots = await self.paginate(request, available_slot_values(slots_queryset))
+        data = self.paginator.get_paginated_data(available_slot_rows(slots))
+        await sync_to_async(set_cached_page, thread_sensitive=False)(cache_key, data)
+        return render_json(data, headers={'X-Cache': 'MISS', **headers})
+
+
+class AsyncBookSlotAPIView(AsyncSelectablePaginationMixin, AsyncAPIView):
+    """
+    Async BookSlotAPIView. Listing reads the student's day schedules and
+    booking stays one locked transaction, both in a worker thread.
+    """
+    permission_classes = [IsStudent]
+    permission_denied_messages = {'POST': "You do not have permission to book a slot."}
+
+    async def get(self, request):
+        try:
+            window = get_date_window(request.query_params)
+        except ValueError as e:
+            return get_json_response(status.HTTP_400_BAD_REQUEST, str(e), {})
+
+        _, etag, last_modified = await sync_to_async(listing_validators, thread_sensitive=False)(request, [student_scope(request.user.id)])
+        not_modified = get_not_modified_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        bookings = await sync_to_async(upcoming_bookings)(request.user.id, window)
+        slots = await self.paginate(request, bookings)
+        rows = await sync_to_async(schedule_booking_rows)(slots)
+        return render_json(self.paginator.get_paginated_data(rows), headers=validator_headers(etag, last_modified))
+
+    async def post(self, request):
+        slot_id = request.data.get("slot_id")
+
+        try:
+            data = await sync_to_async(book_slot_data)(request.user, slot_id)
+        except BookingError as e:
+            return get_json_response(status.HTTP_400_BAD_REQUEST, str(e), {})
+
+        return get_json_response(status.HTTP_201_CREATED, "Slot booked successfully!", data)
+
+
+def book_slot_data(student, slot_id):
+    return SlotBookingForStudentSerializer(book_slot(student, slot_id)).data
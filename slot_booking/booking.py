@@ -0,0 +1,51 @@
+from django.db import transaction
+from django.db.models import F
+from slot_booking.models import TeacherAvailabilitySlot, SlotBooking
+from slot_booking.schedules import load_day_schedules, booking_conflict
+
+
+class BookingError(Exception):
+    """Raised when a slot cannot be booked; the message is safe to return to the client."""
+
+
+def book_slot(student, slot_id):
+    """
+    Book `slot_id` for `student` atomically. `student` only needs an `id`, so
+    the token user of the request is enough.
+
+    The slot row and the student's day schedules are locked for the whole
+    check-and-insert, and the seat is taken with a guarded counter update so
+    the slot can never be overbooked, even on backends without row locks.
+    """
+    with transaction.atomic():
+        slot_object = TeacherAvailabilitySlot.objects.select_for_update(of=('self',)).select_related(
+            'teacher', 'teacher__teacher_profile'
+        ).filter(id=slot_id).first()
+
+        if not slot_object:
+            raise BookingError("The slot does not exist.")
+
+        if slot_object.is_full:
+            raise BookingError("This slot is fully booked.")
+
+        # Check both the same teacher same date and the overlapping time range rules on the student's schedule
+        schedules = load_day_schedules(student.id, slot_object.start_time, slot_object.end_time)
+        conflict = booking_conflict(schedules, slot_object.teacher_id, slot_object.start_time, slot_object.end_time)
+        if conflict == 'teacher':
+            raise BookingError("You have already booked a slot with this teacher for the same date.")
+        if conflict == 'overlap':
+            raise BookingError("You have already booked a slot for this time range.")
+
+        # Take a seat only while one is left
+        if not TeacherAvailabilitySlot.objects.filter(
+            id=slot_object.id,
+            booked_count__lt=F('capacity')
+        ).update(booked_count=F('booked_count') + 1):
+            raise BookingError("This slot is fully booked.")
+        slot_object.booked_count += 1
+
+        booking = SlotBooking(student_id=student.id, slot=slot_object)
+        # Saves the post_save signal reading the schedule rows again
+        booking.loaded_schedules = schedules
+        booking.save(force_insert=True)
+        return booking
@@ -0,0 +1,66 @@
+from django.db import transaction
+from slot_booking.models import TeacherAvailabilitySlot
+from slot_booking.serializers import BulkSlotItemSerializer
+from slot_booking.intervals import sweep_overlaps
+from slot_booking.cache import invalidate_slot_days
+
+
+# Most slots accepted in one bulk request
+MAX_BULK_SLOTS = 1000
+BULK_BATCH_SIZE = 500
+
+OVERLAP_MESSAGES = {
+    'existing': "This time slot overlaps with an existing slot.",
+    'candidate': "This time slot overlaps with another slot in this request.",
+}
+
+
+def create_bulk_slots(teacher_id, items):
+    """
+    Validate `items` (BulkSlotItemSerializer input) for a teacher and insert
+    the valid ones with one bulk_create.
+
+    Overlaps are checked in memory: the teacher's existing slots in the
+    batch's time span are loaded with one query and swept together with the
+    candidates. Returns (created slots, per-item errors) where each error is
+    {'index': position in `items`, 'errors': ...}.
+    """
+    errors = []
+    candidates = []
+    capacities = {}
+    for index, item in enumerate(items):
+        serializer = BulkSlotItemSerializer(data=item)
+        if serializer.is_valid():
+            candidates.append((serializer.validated_data['start_time'], serializer.validated_data['end_time'], index))
+            capacities[index] = serializer.validated_data.get('capacity')
+        else:
+            errors.append({'index': index, 'errors': serializer.errors})
+
+    if not candidates:
+        return [], errors
+
+    with transaction.atomic():
+        existing = TeacherAvailabilitySlot.objects.filter(
+            teacher_id=teacher_id,
+            start_time__lt=max(end for _, end, _ in candidates),
+            end_time__gt=min(start for start, _, _ in candidates)
+        ).values_list('start_time', 'end_time')
+
+        accepted, rejected = sweep_overlaps(list(existing), candidates)
+        errors.extend(
+            {'index': index, 'errors': {'detail': [OVERLAP_MESSAGES[reason]]}}
+            for index, reason in rejected
+        )
+
+        slots = []
+        for start_time, end_time, index in accepted:
+            slot = TeacherAvailabilitySlot(teacher_id=teacher_id, start_time=start_time, end_time=end_time)
+            if capacities[index] is not None:
+                slot.capacity = capacities[index]
+            slots.append(slot)
+        TeacherAvailabilitySlot.objects.bulk_create(slots, batch_size=BULK_BATCH_SIZE)
+        # bulk_create sends no signals
+        invalidate_slot_days(*{slot.start_time for slot in slots})
+
+    errors.sort(key=lambda error: error['index'])
+    return slots, errors
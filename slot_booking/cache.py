@@ -0,0 +1,191 @@
+import hashlib
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+from online_class_book.caches import is_process_local
+
+
+KEY_PREFIX = 'slotcat'
+# Catalog-wide version, for listings that are not limited to a date window
+ALL_SCOPE = 'all'
+# Longest date window still keyed on per-date versions
+MAX_WINDOW_DAYS = 31
+
+
+def get_cache():
+    return caches[getattr(settings, 'SLOT_CATALOG_CACHE_ALIAS', 'default')]
+
+
+def date_scope(day):
+    return f'date:{day.isoformat()}'
+
+
+def student_scope(student_id):
+    """Version scope of one student's bookings."""
+    return f'student:{student_id}'
+
+
+def version_key(scope):
+    return f'{KEY_PREFIX}:version:{scope}'
+
+
+def modified_key(scope):
+    return f'{KEY_PREFIX}:modified:{scope}'
+
+
+def window_scopes(window):
+    """Version scopes covering a listing: one per server-local day, or the catalog-wide one."""
+    if window is None:
+        return [ALL_SCOPE]
+    first_day = timezone.localdate(window[0])
+    last_day = timezone.localdate(window[1] - timedelta(microseconds=1))
+    days = (last_day - first_day).days + 1
+    if days > MAX_WINDOW_DAYS:
+        return [ALL_SCOPE]
+    return [date_scope(first_day + timedelta(days=offset)) for offset in range(days)]
+
+
+def get_versions(scopes):
+    """
+    Current (version, last modified timestamp) of each scope, from one
+    get_many. Missing versions start from the clock so a counter evicted from
+    the cache never reuses an old value.
+    """
+    cache = get_cache()
+    now = time.time_ns()
+    defaults = {version_key(scope): now for scope in scopes}
+    defaults.update({modified_key(scope): now / 1e9 for scope in scopes})
+    values = cache.get_many(defaults)
+    for key, default in defaults.items():
+        if key not in values:
+            cache.add(key, default, None)
+            # A backend like DummyCache keeps nothing
+            values[key] = cache.get(key, default)
+    return [(values[version_key(scope)], values[modified_key(scope)]) for scope in scopes]
+
+
+def bump_versions(scopes):
+    cache = get_cache()
+    for scope in scopes:
+        key = version_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+    cache.set_many({modified_key(scope): time.time() for scope in scopes}, None)
+
+
+def reset_versions(scopes):
+    """bump_versions for many scopes at once: drop their counters, which restart from the clock."""
+    cache = get_cache()
+    cache.delete_many([version_key(scope) for scope in scopes])
+    cache.set_many({modified_key(scope): time.time() for scope in scopes}, None)
+
+
+def invalidate_slot_days(*start_times):
+    """
+    Invalidate cached catalog pages for the days of the given slot start times
+    once the current transaction commits.
+    """
+    scopes = {ALL_SCOPE}
+    scopes.update(date_scope(timezone.localdate(start_time)) for start_time in start_times if start_time)
+    transaction.on_commit(lambda: bump_versions(sorted(scopes)))
+
+
+def invalidate_students(*student_ids):
+    """Change the validators of the students' booking listings once the current transaction commits."""
+    scopes = sorted({student_scope(student_id) for student_id in student_ids})
+    if len(scopes) == 1:
+        transaction.on_commit(lambda: bump_versions(scopes))
+    elif scopes:
+        transaction.on_commit(lambda: reset_versions(scopes))
+
+
+def validators_enabled():
+    """
+    Whether listings send ETag and Last-Modified. Both come from version
+    counters alone, so they are only sound when every process bumping them
+    (web workers, the booking worker and its shard processes) shares the
+    cache; settings.SLOT_LISTING_VALIDATORS overrides the check.
+    """
+    enabled = getattr(settings, 'SLOT_LISTING_VALIDATORS', None)
+    if enabled is None:
+        enabled = not is_process_local(get_cache())
+    return enabled
+
+
+def page_cache_enabled():
+    """
+    Whether catalog pages are cached. A cached page is only dropped through a
+    version bump, so like validators_enabled() this needs a cache shared by
+    every process; settings.SLOT_CATALOG_PAGE_CACHE overrides the check.
+    """
+    enabled = getattr(settings, 'SLOT_CATALOG_PAGE_CACHE', None)
+    if enabled is None:
+        enabled = not is_process_local(get_cache())
+    return enabled
+
+
+def listing_validators(request, scopes):
+    """
+    (cache key, ETag, Last-Modified timestamp) of a listing depending on
+    `scopes`, from their versions alone, without a query. Listings drop slots
+    once they start and slots start on the hour, so the current hour is part
+    of the state too. ETag and Last-Modified are None unless validators_enabled().
+    """
+    params = sorted((key, value) for key, values in request.query_params.lists() for value in values)
+    versions = get_versions(scopes)
+    hour = timezone.localtime().replace(minute=0, second=0, microsecond=0).timestamp()
+    raw = repr((request.get_host(), request.path, params, [version for version, _ in versions], hour))
+    digest = hashlib.md5(raw.encode()).hexdigest()
+    if not validators_enabled():
+        return f'{KEY_PREFIX}:page:{digest}', None, None
+    last_modified = max([modified for _, modified in versions] + [hour])
+    return f'{KEY_PREFIX}:page:{digest}', f'"{digest}"', last_modified
+
+
+def catalog_validators(request, window):
+    """listing_validators of a catalog response over the date `window`."""
+    return listing_validators(request, window_scopes(window))
+
+
+def get_cached_page(key):
+    """The cached page under `key`, or None, always None unless page_cache_enabled()."""
+    if not page_cache_enabled():
+        return None
+    cache = get_cache()
+    data = cache.get(key)
+    _count('hits' if data is not None else 'misses')
+    return data
+
+
+def set_cached_page(key, data):
+    if page_cache_enabled():
+        get_cache().set(key, data, getattr(settings, 'SLOT_CATALOG_CACHE_TIMEOUT', 60))
+
+
+def _count(name):
+    cache = get_cache()
+    key = f'{KEY_PREFIX}:stats:{name}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        # First count, or a backend like DummyCache that keeps nothing
+        cache.add(key, 1, None)
+
+
+def catalog_cache_stats():
+    """Hit/miss counters of the catalog cache since the counters were last reset."""
+    cache = get_cache()
+    counters = cache.get_many([f'{KEY_PREFIX}:stats:hits', f'{KEY_PREFIX}:stats:misses'])
+    hits = counters.get(f'{KEY_PREFIX}:stats:hits', 0)
+    misses = counters.get(f'{KEY_PREFIX}:stats:misses', 0)
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_ratio': round(hits / total, 4) if total else None}
+
+
+def reset_catalog_cache_stats():
+    get_cache().delete_many([f'{KEY_PREFIX}:stats:hits', f'{KEY_PREFIX}:stats:misses'])
@@ -0,0 +1,208 @@
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from online_class_book.utils import date_window
+from user.models import User
+from slot_booking.models import TeacherAvailabilitySlot, SlotBooking, StudentDaySchedule
+from slot_booking.intervals import IntervalSet
+from slot_booking.schedules import START, END, TEACHER, add_bookings, delete_empty_rows, from_micros, lock_rows, to_micros, touched_days
+from slot_booking.cache import invalidate_slot_days, invalidate_students
+
+
+# Rows written per INSERT statement by bulk_create
+BULK_BATCH_SIZE = 1000
+
+# Assignment functions for settings.DEFAULT_BOOKING_SOLVER
+SOLVERS = {
+    'greedy': 'slot_booking.default_booking.assign_greedy',
+    'matching': 'slot_booking.matching.assign_matching',
+}
+
+
+class StudentDay:
+    """
+    A student's bookings for one day: the teachers already attended
+    and the time ranges already taken.
+    """
+    __slots__ = ('teachers', 'intervals')
+
+    def __init__(self):
+        self.teachers = set()
+        self.intervals = IntervalSet()
+
+    def can_attend(self, teacher_id, start_time, end_time):
+        return teacher_id not in self.teachers and not self.intervals.overlaps(start_time, end_time)
+
+    def attend(self, teacher_id, start_time, end_time):
+        self.teachers.add(teacher_id)
+        self.intervals.add(start_time, end_time)
+
+    def copy(self):
+        day = StudentDay()
+        day.teachers = set(self.teachers)
+        day.intervals = IntervalSet(self.intervals)
+        return day
+
+    def add_entries(self, entries, day_start):
+        """Add a StudentDaySchedule row's entries; `day_start` is the day's start in epoch microseconds."""
+        for entry in entries:
+            # Bookings running over from the day before take time but not the teacher
+            if entry[START] >= day_start:
+                self.teachers.add(entry[TEACHER])
+            self.intervals.add(from_micros(entry[START]), from_micros(entry[END]))
+
+
+def assign_greedy(teacher_slots, student_ids, schedules, seats):
+    """
+    Give every student the first non-conflicting slot with seats left for
+    each teacher they have not attended yet.
+
+    `teacher_slots` maps teacher id to a list of (slot_id, start, end) sorted
+    by start time, `schedules` maps student id to its StudentDay and `seats`
+    maps slot id to its free seats (both updated in place). Returns a list of
+    (student_id, slot_id, start, end) to book.
+    """
+    assignments = []
+    teacher_ids = sorted(teacher_slots)
+
+    for student_id in student_ids:
+        schedule = schedules[student_id]
+
+        # Skip the student if they have already booked slots for all available teachers
+        if len(schedule.teachers) >= len(teacher_ids):
+            continue
+
+        for teacher_id in teacher_ids:
+            if teacher_id in schedule.teachers:
+                continue
+
+            # Book the first non-conflicting slot for the student
+            for slot_id, start_time, end_time in teacher_slots[teacher_id]:
+                if seats[slot_id] > 0 and schedule.can_attend(teacher_id, start_time, end_time):
+                    seats[slot_id] -= 1
+                    schedule.attend(teacher_id, start_time, end_time)
+                    assignments.append((student_id, slot_id, start_time, end_time))
+                    break
+
+    return assignments
+
+
+class DefaultBookingEngine:
+    """
+    Books the day's default slots for every student with a constant number
+    of queries: load the day's slots and bookings, assign in memory, then
+    write all new bookings with one bulk_create.
+    """
+
+    def __init__(self, day=None, student_range=None, solver=None):
+        self.day = day or timezone.localdate()
+        # (first, last) student id to limit the run to, see slot_booking.jobs
+        self.student_range = student_range
+        self.solver = solver or settings.DEFAULT_BOOKING_SOLVER
+        self.assign = import_string(SOLVERS[self.solver])
+        self.timings = {}
+
+    @contextmanager
+    def _phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = round((time.perf_counter() - started) * 1000, 2)
+
+    def load(self):
+        """Fetch today's slots, students and their day schedules (three queries)."""
+        teacher_slots = defaultdict(list)
+        seats = {}
+        window = date_window(self.day)
+        slot_rows = TeacherAvailabilitySlot.objects.starting_within(window).order_by('teacher_id', 'start_time', 'id').values_list(
+            'id', 'teacher_id', 'start_time', 'end_time', 'capacity', 'booked_count'
+        )
+        for slot_id, teacher_id, start_time, end_time, capacity, booked_count in slot_rows:
+            teacher_slots[teacher_id].append((slot_id, start_time, end_time))
+            seats[slot_id] = capacity - booked_count
+
+        students = User.objects.filter(role=User.UserRole.STUDENT)
+        day_schedules = StudentDaySchedule.objects.filter(day=self.day)
+        if self.student_range:
+            students = students.filter(id__range=self.student_range)
+            day_schedules = day_schedules.filter(student__id__range=self.student_range)
+
+        student_ids = list(students.order_by('id').values_list('id', flat=True))
+        schedules = {student_id: StudentDay() for student_id in student_ids}
+
+        day_start = to_micros(window[0])
+        for student_id, entries in day_schedules.values_list('student_id', 'entries'):
+            schedule = schedules.get(student_id)
+            if schedule is not None:
+                schedule.add_entries(entries, day_start)
+
+        return teacher_slots, student_ids, schedules, seats
+
+    def write(self, assignments):
+        """
+        Insert all new bookings, their seat counters and the students' day
+        schedules in a single transaction.
+
+        The booked slots and the students' day schedules are locked and
+        re-read first, as book_slot does; assignments that no longer fit
+        because of bookings made since `load` are dropped.
+        """
+        with transaction.atomic():
+            slots = TeacherAvailabilitySlot.objects.select_for_update().in_bulk(
+                {slot_id for _, slot_id, _, _ in assignments}
+            )
+            rows = lock_rows(
+                {(student_id, day) for student_id, _, start_time, end_time in assignments for day in touched_days(start_time, end_time)}
+            )
+            day_start = to_micros(date_window(self.day)[0])
+            schedules = defaultdict(StudentDay)
+            for (student_id, _), row in rows.items():
+                schedules[student_id].add_entries(row.entries, day_start)
+
+            bookings = []
+            for student_id, slot_id, start_time, end_time in assignments:
+                slot = slots.get(slot_id)
+                schedule = schedules[student_id]
+                if slot is None or slot.is_full or not schedule.can_attend(slot.teacher_id, start_time, end_time):
+                    continue
+                schedule.attend(slot.teacher_id, start_time, end_time)
+                slot.booked_count += 1
+                bookings.append(
+                    SlotBooking(student_id=student_id, slot=slot, start_time=start_time, end_time=end_time)
+                )
+
+            SlotBooking.objects.bulk_create(bookings, batch_size=BULK_BATCH_SIZE)
+            TeacherAvailabilitySlot.objects.bulk_update(slots.values(), ['booked_count'], batch_size=BULK_BATCH_SIZE)
+            # bulk_create sends no signals; the locked rows are updated in place
+            add_bookings(bookings, rows)
+            delete_empty_rows(rows)
+            invalidate_slot_days(*{booking.start_time for booking in bookings})
+            invalidate_students(*{booking.student_id for booking in bookings})
+        return bookings
+
+    def run(self):
+        """Run all phases and report the number of bookings and per-phase timings in ms."""
+        self.timings = {}
+        with self._phase('load'):
+            teacher_slots, student_ids, schedules, seats = self.load()
+
+        with self._phase('assign'):
+            assignments = self.assign(teacher_slots, student_ids, schedules, seats)
+
+        with self._phase('write'):
+            bookings = self.write(assignments)
+
+        self.timings['total'] = round(sum(self.timings.values()), 2)
+        return {
+            'date': self.day.isoformat(),
+            'students': len(student_ids),
+            'teachers': len(teacher_slots),
+            'booked': len(bookings),
+            'solver': self.solver,
+            'timings_ms': self.timings,
+        }
@@ -0,0 +1,115 @@
+"""
+Streaming roster export: slots with their reserved students as CSV or
+NDJSON, for the export endpoint and the export_slots command.
+
+Rows come from one values() query over slots left-joined to their bookings
+and students, ordered by slot, and are read with .iterator(chunk_size=...),
+so memory stays flat however many rows are exported.
+"""
+import csv
+from functools import partial
+from itertools import groupby
+from operator import itemgetter
+from django.utils import timezone
+from online_class_book.renderers import FastJSONRenderer
+from slot_booking.fast_serializers import TEACHER_SLOT_FIELDS, build_teacher_slot, format_iso_datetime
+from slot_booking.serializers import STUDENT_FIELDS
+
+
+# Media type of each export format
+EXPORT_FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+# Rows fetched from the database at a time
+CHUNK_SIZE = 2000
+# Bytes handed to the response or the file at a time
+WRITE_SIZE = 64 * 1024
+
+BOOKING_VALUES = ['bookings__id', 'bookings__created_at']
+STUDENT_VALUES = [f'bookings__student__{field}' for field in STUDENT_FIELDS]
+EXPORT_VALUES = [*TEACHER_SLOT_FIELDS, *BOOKING_VALUES, *STUDENT_VALUES]
+
+# Leading characters that make spreadsheets read a cell as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def escape_formula(value):
+    """Quote user-entered text that a spreadsheet would run as a formula."""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+# One CSV row per reserved student; slots nobody booked get one row with empty student columns
+SLOT_CSV_COLUMNS = [
+    ('slot_id', 'id', None),
+    ('teacher_id', 'teacher_id', None),
+    ('start_time', 'start_time', format_iso_datetime),
+    ('end_time', 'end_time', format_iso_datetime),
+    ('capacity', 'capacity', None),
+    ('booked_count', 'booked_count', None),
+    ('created_at', 'created_at', format_iso_datetime),
+]
+BOOKING_CSV_COLUMNS = [
+    ('booking_id', 'bookings__id', None),
+    ('booked_at', 'bookings__created_at', format_iso_datetime),
+    *((f'student_{field}', f'bookings__student__{field}', escape_formula) for field in STUDENT_FIELDS),
+]
+_student_row = itemgetter(*STUDENT_VALUES)
+
+
+def export_values(queryset, chunk_size=CHUNK_SIZE):
+    """Slot and reserved student rows of `queryset`, grouped by slot, streamed from the database."""
+    return queryset.order_by('start_time', 'id', 'bookings__id').values(*EXPORT_VALUES).iterator(chunk_size=chunk_size)
+
+
+class Echo:
+    """File-like object handing back what csv.writer writes, one row at a time."""
+
+    def write(self, value):
+        return value
+
+
+def csv_cells(columns, tz):
+    """Function reading the `columns` cells of a row; datetimes are formatted in `tz`."""
+    getters = [
+        (itemgetter(source), partial(formatter, tz=tz) if formatter is format_iso_datetime else formatter)
+        for _, source, formatter in columns
+    ]
+    return lambda row: [formatter(getter(row)) if formatter else getter(row) for getter, formatter in getters]
+
+
+def csv_lines(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow([column for column, _, _ in SLOT_CSV_COLUMNS + BOOKING_CSV_COLUMNS])
+    tz = timezone.get_current_timezone()
+    slot_cells, booking_cells = csv_cells(SLOT_CSV_COLUMNS, tz), csv_cells(BOOKING_CSV_COLUMNS, tz)
+    # A slot's cells repeat on each of its students' rows; format them once
+    slot_id = cells = None
+    for row in rows:
+        if row['id'] != slot_id:
+            slot_id, cells = row['id'], slot_cells(row)
+        yield writer.writerow(cells + booking_cells(row))
+
+
+def ndjson_lines(rows):
+    """One TeacherSlotAPIView-shaped object per slot and line."""
+    encode = FastJSONRenderer().encode
+    for _, slot_rows in groupby(rows, key=itemgetter('id')):
+        slot_rows = list(slot_rows)
+        students = [dict(zip(STUDENT_FIELDS, _student_row(row))) for row in slot_rows if row['bookings__id'] is not None]
+        yield encode(build_teacher_slot({**slot_rows[0], 'reserved_students': students})).decode() + '\n'
+
+
+def export_chunks(queryset, export_format, chunk_size=CHUNK_SIZE):
+    """Encoded export of `queryset` in about WRITE_SIZE byte chunks."""
+    lines = csv_lines if export_format == 'csv' else ndjson_lines
+    buffer = []
+    size = 0
+    for line in lines(export_values(queryset, chunk_size)):
+        buffer.append(line)
+        size += len(line)
+        if size >= WRITE_SIZE:
+            yield ''.join(buffer).encode()
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer).encode()
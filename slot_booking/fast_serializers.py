@@ -0,0 +1,166 @@
+"""
+Read-only fast path for slot listings.
+
+Rows are fetched with `.values()` and turned into the same dicts the
+ModelSerializers in slot_booking.serializers produce, using accessors
+compiled once at import time instead of building serializer fields per row.
+"""
+from operator import itemgetter
+from django.utils import timezone
+from slot_booking.models import TeacherAvailabilitySlot, SlotBooking
+from slot_booking.serializers import STUDENT_FIELDS
+from online_class_book.instrumentation import record_time
+
+
+SLOT_TIME_FORMAT = "%Y-%m-%d %H:%M"
+
+
+def format_slot_time(value):
+    """Same output as serializers.DateTimeField(format=SLOT_TIME_FORMAT)."""
+    if not value:
+        return None
+    return value.astimezone(timezone.get_current_timezone()).strftime(SLOT_TIME_FORMAT)
+
+
+def format_iso_datetime(value, tz=None):
+    """
+    Same output as serializers.DateTimeField() with the default ISO 8601
+    format; long loops can pass the current timezone in `tz` once.
+    """
+    if not value:
+        return None
+    value = value.astimezone(tz or timezone.get_current_timezone()).isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+class Nested:
+    """A nested object in a row spec, read from `source`-prefixed values() keys."""
+
+    def __init__(self, source, spec):
+        self.source = source
+        self.spec = spec
+
+
+def compile_spec(spec, prefix=''):
+    """
+    Compile a row spec into the `.values()` field names it needs and a function
+    building one output dict per row.
+
+    `spec` is a sequence of (key, source) or (key, source, formatter) entries,
+    where source is a values() field name or a Nested spec.
+    """
+    fields = []
+    parts = []
+    for key, source, *formatter in spec:
+        if isinstance(source, Nested):
+            nested_prefix = f'{prefix}{source.source}__'
+            nested_fields, build_nested = compile_spec(source.spec, nested_prefix)
+            fields.extend(nested_fields)
+            parts.append((key, build_nested))
+        else:
+            name = prefix + source
+            fields.append(name)
+            getter = itemgetter(name)
+            if formatter:
+                parts.append((key, lambda row, getter=getter, format=formatter[0]: format(getter(row))))
+            else:
+                parts.append((key, getter))
+
+    def build(row):
+        return {key: part(row) for key, part in parts}
+
+    return fields, build
+
+
+# UserSerializer's readable fields
+USER_SPEC = [(field, field) for field in STUDENT_FIELDS]
+
+# AvailableSlotForStudent
+AVAILABLE_SLOT_SPEC = [
+    ('id', 'id'),
+    ('teacher', Nested('teacher', USER_SPEC)),
+    ('start_time', 'start_time', format_slot_time),
+    ('end_time', 'end_time', format_slot_time),
+    ('subject', 'teacher__teacher_profile__subject'),
+    ('created_at', 'created_at', format_iso_datetime),
+]
+
+# TeacherAvailabilitySlotSerializer; reserved_students is filled in by teacher_slot_rows
+TEACHER_SLOT_SPEC = [
+    ('id', 'id'),
+    ('teacher', 'teacher_id'),
+    ('start_time', 'start_time', format_slot_time),
+    ('end_time', 'end_time', format_slot_time),
+    ('capacity', 'capacity'),
+    ('booked_count', 'booked_count'),
+    ('reserved_students', 'reserved_students'),
+    ('created_at', 'created_at', format_iso_datetime),
+]
+
+AVAILABLE_SLOT_FIELDS, build_available_slot = compile_spec(AVAILABLE_SLOT_SPEC)
+_teacher_slot_fields, build_teacher_slot = compile_spec(TEACHER_SLOT_SPEC)
+# reserved_students comes from a second query, not from values()
+TEACHER_SLOT_FIELDS = [field for field in _teacher_slot_fields if field != 'reserved_students']
+STUDENT_VALUES = [f'student__{field}' for field in STUDENT_FIELDS]
+_student_row = itemgetter(*range(1, len(STUDENT_FIELDS) + 1))
+
+
+def available_slot_values(queryset):
+    """`.values()` queryset for available_slot_rows; keeps start_time for keyset pagination."""
+    return queryset.values(*AVAILABLE_SLOT_FIELDS)
+
+
+def available_slot_rows(rows):
+    with record_time('serializer'):
+        return [build_available_slot(row) for row in rows]
+
+
+def schedule_booking_rows(rows):
+    """
+    SlotBookingForStudentSerializer rows for slot_booking.schedules.upcoming_bookings
+    rows: the page's slots are read in one query, without joining the bookings.
+    """
+    slots = {}
+    if rows:
+        slot_rows = TeacherAvailabilitySlot.objects.filter(id__in={row['slot_id'] for row in rows}).values(*AVAILABLE_SLOT_FIELDS)
+        slots = {slot_row['id']: slot_row for slot_row in slot_rows}
+
+    with record_time('serializer'):
+        return [
+            {
+                'id': row['id'],
+                'slot': build_available_slot(slots[row['slot_id']]) if row['slot_id'] in slots else None,
+                'created_at': format_iso_datetime(row['created_at']),
+            }
+            for row in rows
+        ]
+
+
+def teacher_slot_values(queryset):
+    return queryset.values(*TEACHER_SLOT_FIELDS)
+
+
+def teacher_slot_rows(rows):
+    """
+    Build teacher slot rows, loading the reserved students of the whole page
+    in a single query.
+    """
+    students = {row['id']: [] for row in rows}
+    if students:
+        student_rows = SlotBooking.objects.filter(slot_id__in=students).order_by('id').values_list('slot_id', *STUDENT_VALUES)
+        for student_row in student_rows:
+            students[student_row[0]].append(dict(zip(STUDENT_FIELDS, _student_row(student_row))))
+
+    with record_time('serializer'):
+        return [build_teacher_slot({**row, 'reserved_students': students[row['id']]}) for row in rows]
+
+
+def new_teacher_slot_rows(slots):
+    """Teacher slot rows for just-created slot instances, which have no reserved students."""
+    with record_time('serializer'):
+        return [
+            build_teacher_slot({**{field: getattr(slot, field) for field in TEACHER_SLOT_FIELDS}, 'reserved_students': []})
+            for slot in slots
+        ]
@@ -0,0 +1,66 @@
+from bisect import bisect_left
+
+
+class IntervalSet:
+    """
+    Sorted set of non-overlapping half-open [start, end) intervals.
+    Overlap checks are a single bisect, so they stay O(log n) per lookup.
+    """
+    __slots__ = ('_starts', '_ends')
+
+    def __init__(self, intervals=()):
+        self._starts = []
+        self._ends = []
+        for start, end in sorted(intervals):
+            self._starts.append(start)
+            self._ends.append(end)
+
+    def __len__(self):
+        return len(self._starts)
+
+    def __iter__(self):
+        return zip(self._starts, self._ends)
+
+    def overlaps(self, start, end):
+        """Return True if [start, end) intersects any stored interval."""
+        # Intervals never overlap each other, so only the last one starting
+        # before `end` can reach past `start`.
+        index = bisect_left(self._starts, end)
+        return index > 0 and self._ends[index - 1] > start
+
+    def add(self, start, end):
+        """Insert [start, end); callers check `overlaps` first."""
+        index = bisect_left(self._starts, start)
+        self._starts.insert(index, start)
+        self._ends.insert(index, end)
+
+
+def sweep_overlaps(existing, candidates):
+    """
+    Accept candidate intervals that overlap neither `existing` nor an earlier
+    accepted candidate, in one pass over both lists sorted by start time.
+
+    `existing` is a list of non-overlapping (start, end) pairs and `candidates`
+    a list of (start, end, key). Returns (accepted, rejected) where rejected
+    holds (key, reason) pairs, reason being 'existing' or 'candidate'.
+    """
+    existing = sorted(existing)
+    accepted = []
+    rejected = []
+    position = 0
+    accepted_end = None
+
+    for start, end, key in sorted(candidates, key=lambda candidate: candidate[:2]):
+        # Skip existing intervals that end before this candidate starts
+        while position < len(existing) and existing[position][1] <= start:
+            position += 1
+
+        if position < len(existing) and existing[position][0] < end:
+            rejected.append((key, 'existing'))
+        elif accepted_end is not None and accepted_end > start:
+            rejected.append((key, 'candidate'))
+        else:
+            accepted.append((start, end, key))
+            accepted_end = end
+
+    return accepted, rejected
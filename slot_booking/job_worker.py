@@ -0,0 +1,8 @@
+"""
+Process pool entry points for slot_booking.jobs, see online_class_book.workers.
+"""
+
+
+def run_shard(shard_id):
+    from slot_booking.jobs import run_shard
+    return run_shard(shard_id)
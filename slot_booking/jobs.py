@@ -0,0 +1,247 @@
+"""
+Daily default booking as a background job, without an external broker.
+
+A BookingJob per day is split into BookingJobShards of contiguous student
+id ranges. Shards run in a process pool; each one books its students and
+marks itself done in the same transaction, so a job that dies half-way is
+resumed by running the shards still pending. Running a shard again is
+harmless anyway: the engine skips teachers a student already attends.
+
+BookingWorker claims and runs queued jobs and enqueues the day's job once
+settings.DEFAULT_BOOKING_TIME has passed. It runs in the `booking_worker`
+command, or in a thread of the web process with BOOKING_WORKER_IN_PROCESS.
+"""
+import logging
+import threading
+from concurrent.futures import as_completed
+from datetime import datetime, time, timedelta
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+from user.models import User
+from slot_booking.models import BookingJob, BookingJobShard
+from slot_booking.default_booking import DefaultBookingEngine
+from online_class_book.workers import spawn_pool
+from slot_booking import job_worker
+
+
+logger = logging.getLogger(__name__)
+
+# Assign/write rounds per shard when concurrent shards took the seats it picked
+SHARD_ATTEMPTS = 3
+
+
+def job_data(job):
+    shards = job.shards.aggregate(total=Count('id'), done=Count('id', filter=Q(done=True)))
+    return {
+        'job_id': job.id,
+        'date': job.day.isoformat(),
+        'status': job.status,
+        'shards': shards['total'],
+        'shards_done': shards['done'],
+        'result': job.result,
+        'error': job.error,
+    }
+
+
+def enqueue_default_booking(day=None, force=False):
+    """
+    Queue the default booking of `day` (today by default) and return its job.
+
+    There is one job per day: enqueuing again returns the existing job,
+    requeues it if it failed (keeping finished shards) and, with `force`,
+    runs a finished one again from scratch.
+    """
+    day = day or timezone.localdate()
+    with transaction.atomic():
+        job, created = BookingJob.objects.select_for_update().get_or_create(day=day)
+        if job.status == BookingJob.Status.FAILED or (force and job.status == BookingJob.Status.DONE):
+            if job.status == BookingJob.Status.DONE:
+                job.shards.all().delete()
+            job.status = BookingJob.Status.PENDING
+            job.error = ''
+            job.result = None
+            job.save(update_fields=['status', 'error', 'result'])
+        if job.status == BookingJob.Status.PENDING:
+            transaction.on_commit(wake_worker)
+    return job
+
+
+def claim_job(job_id=None):
+    """
+    Mark the oldest runnable job running and return it, or None.
+
+    Pending jobs are runnable, and so are running jobs whose runner stopped
+    sending heartbeats. The claim is a conditional UPDATE, so two workers
+    never run the same job.
+    """
+    stale_before = timezone.now() - timedelta(seconds=settings.BOOKING_JOB_STALE_SECONDS)
+    runnable = BookingJob.objects.filter(
+        Q(status=BookingJob.Status.PENDING) | Q(status=BookingJob.Status.RUNNING, heartbeat_at__lt=stale_before)
+    )
+    if job_id is not None:
+        runnable = runnable.filter(id=job_id)
+
+    for job in runnable.order_by('id')[:10]:
+        claimed_at = timezone.now()
+        claimed = BookingJob.objects.filter(id=job.id, status=job.status, heartbeat_at=job.heartbeat_at).update(
+            status=BookingJob.Status.RUNNING, heartbeat_at=claimed_at, started_at=claimed_at
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+    return None
+
+
+def create_shards(job):
+    """Split the students into contiguous id ranges of DEFAULT_BOOKING_SHARD_SIZE, once per job."""
+    if job.shards.exists():
+        return
+    student_ids = list(User.objects.filter(role=User.UserRole.STUDENT).order_by('id').values_list('id', flat=True))
+    size = settings.DEFAULT_BOOKING_SHARD_SIZE
+    BookingJobShard.objects.bulk_create(
+        BookingJobShard(job=job, first_student_id=chunk[0], last_student_id=chunk[-1])
+        for chunk in (student_ids[start:start + size] for start in range(0, len(student_ids), size))
+    )
+
+
+def run_shard(shard_id):
+    """
+    Book the default slots of one shard's students. Returns the number of
+    bookings made; a shard already done books nothing.
+    """
+    shard = BookingJobShard.objects.select_related('job').get(id=shard_id)
+    if shard.done:
+        return 0
+
+    engine = DefaultBookingEngine(shard.job.day, (shard.first_student_id, shard.last_student_id))
+    booked = 0
+    for attempt in range(SHARD_ATTEMPTS):
+        teacher_slots, student_ids, schedules, seats = engine.load()
+        assignments = engine.assign(teacher_slots, student_ids, schedules, seats)
+        with transaction.atomic():
+            bookings = engine.write(assignments)
+            # Retry if other shards took seats since `load`
+            done = len(bookings) == len(assignments) or attempt == SHARD_ATTEMPTS - 1
+            BookingJobShard.objects.filter(id=shard_id).update(
+                done=done, students=len(student_ids), booked=F('booked') + len(bookings)
+            )
+        booked += len(bookings)
+        if done:
+            break
+    return booked
+
+
+def run_job(job, workers=None):
+    """Run the pending shards of a claimed job and record its result."""
+    workers = workers or settings.DEFAULT_BOOKING_WORKERS
+    started = timezone.now()
+    try:
+        create_shards(job)
+        pending = list(job.shards.filter(done=False).values_list('id', flat=True))
+        if workers > 1 and len(pending) > 1:
+            # Pool processes open their own connections
+            connections.close_all()
+            with spawn_pool(min(workers, len(pending))) as pool:
+                for future in as_completed([pool.submit(job_worker.run_shard, shard_id) for shard_id in pending]):
+                    future.result()
+                    heartbeat(job)
+        else:
+            for shard_id in pending:
+                run_shard(shard_id)
+                heartbeat(job)
+    except Exception as exc:
+        logger.exception("Default booking job %s failed", job.id)
+        BookingJob.objects.filter(id=job.id).update(status=BookingJob.Status.FAILED, error=repr(exc), finished_at=timezone.now())
+        job.refresh_from_db()
+        return job
+
+    totals = job.shards.aggregate(students=Sum('students'), booked=Sum('booked'))
+    job.status = BookingJob.Status.DONE
+    job.finished_at = timezone.now()
+    job.result = {
+        'date': job.day.isoformat(),
+        'students': totals['students'] or 0,
+        'booked': totals['booked'] or 0,
+        'shards': job.shards.count(),
+        'workers': workers,
+        'solver': settings.DEFAULT_BOOKING_SOLVER,
+        'duration_ms': round((job.finished_at - started).total_seconds() * 1000, 2),
+    }
+    job.save(update_fields=['status', 'finished_at', 'result'])
+    return job
+
+
+def heartbeat(job):
+    BookingJob.objects.filter(id=job.id).update(heartbeat_at=timezone.now())
+
+
+def run_pending_jobs(workers=None):
+    """Claim and run runnable jobs until none is left. Returns the jobs run."""
+    jobs = []
+    while (job := claim_job()) is not None:
+        jobs.append(run_job(job, workers))
+    return jobs
+
+
+class BookingWorker:
+    """
+    Scheduler and worker loop: enqueue the day's job once DEFAULT_BOOKING_TIME
+    has passed and run queued jobs, waking early when a job is enqueued in
+    this process.
+    """
+
+    def __init__(self, workers=None, poll_interval=None):
+        self.workers = workers
+        self.poll_interval = poll_interval or settings.BOOKING_WORKER_POLL_INTERVAL
+        self.wake = threading.Event()
+        self.stopped = threading.Event()
+
+    def schedule_due(self, current=None):
+        """Enqueue today's job if its time has come and it does not exist yet."""
+        current = timezone.localtime(current)
+        due = timezone.make_aware(
+            datetime.combine(current.date(), time.fromisoformat(settings.DEFAULT_BOOKING_TIME))
+        )
+        if current >= due and not BookingJob.objects.filter(day=current.date()).exists():
+            return enqueue_default_booking(current.date())
+        return None
+
+    def run_once(self):
+        self.schedule_due()
+        return run_pending_jobs(self.workers)
+
+    def serve(self):
+        while not self.stopped.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Booking worker iteration failed")
+            finally:
+                connections.close_all()
+            self.wake.wait(self.poll_interval)
+            self.wake.clear()
+
+    def stop(self):
+        self.stopped.set()
+        self.wake.set()
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def start_in_process_worker():
+    """Start a BookingWorker thread in this process, once."""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = BookingWorker()
+            threading.Thread(target=_worker.serve, name='booking-worker', daemon=True).start()
+    return _worker
+
+
+def wake_worker():
+    if _worker is not None:
+        _worker.wake.set()
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from benchmarks.suite import add_arguments, main_with
+
+
+class Command(BaseCommand):
+    help = "Run the benchmark suite (benchmarks/suite.py) on a throwaway test database and print a JSON report."
+
+    def add_arguments(self, parser):
+        add_arguments(parser)
+
+    def handle(self, *args, **options):
+        main_with(options, self.stdout.write)
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from slot_booking.jobs import BookingWorker
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the booking worker: enqueue each day's default booking at settings.DEFAULT_BOOKING_TIME "
+        "and run queued jobs, including those queued through the API."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, help="Processes running shards, settings.DEFAULT_BOOKING_WORKERS by default.")
+        parser.add_argument('--poll-interval', type=int, help="Seconds between checks for new jobs.")
+        parser.add_argument('--once', action='store_true', help="Run queued jobs once and exit.")
+
+    def handle(self, *args, **options):
+        worker = BookingWorker(options['workers'], options['poll_interval'])
+        if options['once']:
+            for job in worker.run_once():
+                self.stdout.write(f"Job {job.id} ({job.day}): {job.status}")
+            return
+
+        self.stdout.write("Booking worker started.")
+        try:
+            worker.serve()
+        except KeyboardInterrupt:
+            worker.stop()
@@ -0,0 +1,20 @@
+import json
+from django.core.management.base import BaseCommand
+from slot_booking.cache import catalog_cache_stats, reset_catalog_cache_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Print the slot catalog cache hit/miss counters and hit ratio. Processes count in the cache, "
+        "so this sees other processes only with a shared cache backend."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help="Clear the counters.")
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            reset_catalog_cache_stats()
+            self.stdout.write("Catalog cache counters cleared.")
+            return
+        self.stdout.write(json.dumps(catalog_cache_stats(), indent=2))
@@ -0,0 +1,25 @@
+import json
+from datetime import date
+from django.core.management.base import BaseCommand
+from slot_booking.jobs import enqueue_default_booking, claim_job, run_job, job_data
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the default booking job of a day now, in this process. Safe to run again: "
+        "a finished job is reported, a failed or interrupted one is resumed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--day', type=date.fromisoformat, help="Day to book (YYYY-MM-DD), today by default.")
+        parser.add_argument('--workers', type=int, help="Processes running shards, settings.DEFAULT_BOOKING_WORKERS by default.")
+        parser.add_argument('--force', action='store_true', help="Run a finished job again.")
+
+    def handle(self, *args, **options):
+        job = enqueue_default_booking(options['day'], force=options['force'])
+        claimed = claim_job(job.id)
+        if claimed is not None:
+            job = run_job(claimed, options['workers'])
+        else:
+            job.refresh_from_db()
+        self.stdout.write(json.dumps(job_data(job), indent=2))
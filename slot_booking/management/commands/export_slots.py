@@ -0,0 +1,38 @@
+from datetime import date
+from django.core.management.base import BaseCommand
+from online_class_book.utils import date_window
+from slot_booking.export import EXPORT_FORMATS, CHUNK_SIZE, export_chunks
+from slot_booking.models import TeacherAvailabilitySlot
+
+
+class Command(BaseCommand):
+    help = (
+        "Write slots with their reserved students as CSV or NDJSON, streamed from the "
+        "database in chunks, to a file or stdout."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv', dest='export_format')
+        parser.add_argument('--output', help="File to write, stdout by default.")
+        parser.add_argument('--teacher', type=int, help="Only this teacher's slots.")
+        parser.add_argument('--date-from', type=date.fromisoformat, help="First day of slot start times (YYYY-MM-DD).")
+        parser.add_argument('--date-to', type=date.fromisoformat, help="Last day of slot start times (YYYY-MM-DD).")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Rows fetched from the database at a time.")
+
+    def handle(self, *args, **options):
+        slots_queryset = TeacherAvailabilitySlot.objects.all()
+        if options['teacher']:
+            slots_queryset = slots_queryset.filter(teacher_id=options['teacher'])
+        if options['date_from'] or options['date_to']:
+            slots_queryset = slots_queryset.starting_within(
+                date_window(options['date_from'] or options['date_to'], options['date_to'] or options['date_from'])
+            )
+
+        chunks = export_chunks(slots_queryset, options['export_format'], options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'wb') as output:
+                for chunk in chunks:
+                    output.write(chunk)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk.decode(), ending='')
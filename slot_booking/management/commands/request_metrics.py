@@ -0,0 +1,45 @@
+import json
+from django.core.management.base import BaseCommand
+from online_class_book.caches import is_process_local
+from online_class_book.instrumentation import collected_histograms, get_metrics_cache, summarize_histograms, reset_collected_histograms
+
+
+class Command(BaseCommand):
+    help = (
+        "Print per-view request metrics collected by HistogramSink. Processes publish to the "
+        "REQUEST_METRICS_CACHE_ALIAS cache, so this sees other processes only with a shared cache backend."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--view', help="Only report this view.")
+        parser.add_argument('--json', action='store_true', help="Print the raw summary as JSON.")
+        parser.add_argument('--reset', action='store_true', help="Clear the collected histograms.")
+
+    def handle(self, *args, **options):
+        cache = get_metrics_cache()
+        if is_process_local(cache):
+            self.stderr.write(self.style.WARNING(
+                f"The request metrics cache is a {type(cache).__name__}, which only this command's process sees: "
+                f"no server metrics can be read. Point REQUEST_METRICS_CACHE_ALIAS at a shared cache."
+            ))
+        if options['reset']:
+            reset_collected_histograms()
+            self.stdout.write("Request metrics cleared.")
+            return
+
+        summary = summarize_histograms(collected_histograms())
+        if options['view']:
+            summary = {view: row for view, row in summary.items() if view == options['view']}
+
+        if options['json']:
+            self.stdout.write(json.dumps(summary, indent=2))
+            return
+        if not summary:
+            self.stdout.write("No request metrics collected.")
+            return
+
+        columns = ['count', 'total_ms_p50', 'total_ms_p95', 'total_ms_p99', 'total_ms_mean', 'queries_mean', 'db_ms_mean', 'serializer_ms_mean', 'render_ms_mean']
+        width = max(len(view) for view in summary)
+        self.stdout.write(' '.join([f"{'view':<{width}}", *(f'{column:>18}' for column in columns)]))
+        for view, row in summary.items():
+            self.stdout.write(' '.join([f'{view:<{width}}', *(f'{str(row[column]):>18}' for column in columns)]))
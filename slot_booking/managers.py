@@ -0,0 +1,62 @@
+from django.db import connections, models
+from django.db.models import Count, F, Sum
+from user.models import normalize_subject
+
+
+# Sorts after any character, closing a prefix range
+PREFIX_UPPER_BOUND = '\U0010ffff'
+
+
+class TimeRangeQuerySet(models.QuerySet):
+
+    def starting_within(self, window):
+        """Keep rows starting inside the half-open [start, end) `window`; a plain index range."""
+        start, end = window
+        return self.filter(start_time__gte=start, start_time__lt=end)
+
+
+class TeacherAvailabilitySlotQuerySet(TimeRangeQuerySet):
+
+    def for_subject(self, subject):
+        """
+        Filter slots by the teacher's subject using the indexed subject_key.
+
+        PostgreSQL keeps substring matching through the pg_trgm index; other
+        backends match on the subject prefix as a plain index range scan.
+        """
+        key = normalize_subject(subject)
+        if connections[self.db].vendor == 'postgresql':
+            return self.filter(teacher__teacher_profile__subject_key__contains=key)
+        return self.filter(
+            teacher__teacher_profile__subject_key__gte=key,
+            teacher__teacher_profile__subject_key__lt=key + PREFIX_UPPER_BOUND
+        )
+
+    def start_time_counts(self):
+        """
+        (start_time, slots, open seats) per distinct start time, ordered by
+        start time, from one grouped query. Slots start on the hour, so this
+        is already per hour and needs no date function per row.
+        """
+        return self.order_by('start_time').values('start_time').annotate(
+            slots=Count('id'),
+            seats=Sum(F('capacity') - F('booked_count'))
+        ).values_list('start_time', 'slots', 'seats')
+
+    def has_overlap(self, teacher_id, start_time, end_time):
+        """
+        Check if [start_time, end_time) overlaps one of the teacher's slots.
+
+        A teacher's slots never overlap each other, so only the latest slot
+        starting before `end_time` can overlap; fetching it is a single seek
+        on the (teacher, start_time, end_time) index.
+        """
+        previous_end = self.filter(
+            teacher_id=teacher_id,
+            start_time__lt=end_time
+        ).order_by('-start_time').values_list('end_time', flat=True).first()
+        return previous_end is not None and previous_end > start_time
+
+
+class SlotBookingQuerySet(TimeRangeQuerySet):
+    """Student conflicts are checked on StudentDaySchedule, see slot_booking/schedules.py."""
@@ -0,0 +1,156 @@
+"""
+Teacher-by-teacher heuristic for the default booking, used when
+settings.DEFAULT_BOOKING_SOLVER is 'matching'. Same contract as
+default_booking.assign_greedy.
+
+Booking the most students without overlaps or repeated teachers is NP-hard
+once slots partly overlap, so this does not maximize it either. Where
+assign_greedy books student by student, so early students can take the
+only seats that fit later ones, this books teacher by teacher, fewest free
+seats first, and gives each teacher the most students it can take with one
+max-flow over groups of students with the same day so far:
+
+    source -> group (students) -> slot (free seats) -> sink
+
+Each group tries first the slots overlapping the fewest free seats it could
+still take with teachers booked later, so those stay open to it. Groups keep
+the graph small, so a pure Python Dinic max-flow is enough.
+"""
+from collections import defaultdict, deque
+
+
+def dinic_max_flow(node_count, edges, source, sink):
+    """Max flow of `edges` [(from, to, capacity)]; returns the flow on each edge."""
+    graph = [[] for _ in range(node_count)]
+    heads = []
+    capacities = []
+    for tail, head, capacity in edges:
+        # Edge 2i is the i-th input edge and 2i + 1 its residual
+        graph[tail].append(len(heads))
+        heads.append(head)
+        capacities.append(capacity)
+        graph[head].append(len(heads))
+        heads.append(tail)
+        capacities.append(0)
+
+    while True:
+        level = [-1] * node_count
+        level[source] = 0
+        queue = deque([source])
+        while queue:
+            node = queue.popleft()
+            for edge in graph[node]:
+                if capacities[edge] > 0 and level[heads[edge]] < 0:
+                    level[heads[edge]] = level[node] + 1
+                    queue.append(heads[edge])
+        if level[sink] < 0:
+            break
+
+        # Blocking flow by iterative DFS; `position` skips edges already exhausted
+        position = [0] * node_count
+        path = []
+        node = source
+        while True:
+            if node == sink:
+                pushed = min(capacities[edge] for edge in path)
+                for edge in path:
+                    capacities[edge] -= pushed
+                    capacities[edge ^ 1] += pushed
+                # Back up to the tail of the first saturated edge
+                saturated = next(index for index, edge in enumerate(path) if capacities[edge] == 0)
+                del path[saturated:]
+                node = heads[path[-1]] if path else source
+                continue
+
+            edges_out = graph[node]
+            while position[node] < len(edges_out):
+                edge = edges_out[position[node]]
+                if capacities[edge] > 0 and level[heads[edge]] == level[node] + 1:
+                    break
+                position[node] += 1
+            else:
+                if node == source:
+                    break
+                # Dead end: drop the node from this phase and retreat
+                level[node] = -1
+                edge = path.pop()
+                node = heads[edge ^ 1]
+                position[node] += 1
+                continue
+
+            path.append(edge)
+            node = heads[edge]
+
+    return [capacities[2 * index + 1] for index in range(len(edges))]
+
+
+def overlaps(first, second):
+    return first[0] < second[1] and second[0] < first[1]
+
+
+def match_teacher(teacher_id, slots, later_slots, student_ids, schedules, seats):
+    """
+    Book `teacher_id` for as many of `student_ids` as its `slots`
+    [(slot_id, start, end)] can take. Each group of students with the same
+    day tries first the slots overlapping the fewest free seats it could
+    still take in `later_slots` [(teacher_id, slot_id, start, end)].
+    Returns the assignments; `schedules` and `seats` are updated in place.
+    """
+    slots = [slot for slot in slots if seats[slot[0]] > 0]
+    later_slots = [slot for slot in later_slots if seats[slot[1]] > 0]
+    groups = defaultdict(list)
+    for student_id in student_ids:
+        schedule = schedules[student_id]
+        groups[frozenset(schedule.teachers), tuple(schedule.intervals)].append(student_id)
+
+    source, sink = 0, 1
+    edges = [(2 + index, sink, seats[slot_id]) for index, (slot_id, _, _) in enumerate(slots)]
+    node = 2 + len(slots)
+    # Per group: its students and the (edge, slot index) pairs leaving its node, in slot order
+    group_edges = []
+    for group in groups.values():
+        schedule = schedules[group[0]]
+        if teacher_id in schedule.teachers:
+            continue
+        open_later = [
+            (start_time, end_time, seats[slot_id]) for later_id, slot_id, start_time, end_time in later_slots
+            if schedule.can_attend(later_id, start_time, end_time)
+        ]
+        contended = {
+            index: sum(free for *interval, free in open_later if overlaps((start_time, end_time), interval))
+            for index, (_, start_time, end_time) in enumerate(slots)
+            if not schedule.intervals.overlaps(start_time, end_time)
+        }
+        if not contended:
+            continue
+        edges.append((source, node, len(group)))
+        free = sorted(contended, key=contended.get)
+        group_edges.append((group, [(len(edges) + offset, index) for offset, index in enumerate(free)]))
+        edges.extend((node, 2 + index, len(group)) for index in free)
+        node += 1
+    if not group_edges:
+        return []
+
+    flows = dinic_max_flow(node, edges, source, sink)
+
+    assignments = []
+    for group, out_edges in group_edges:
+        students = iter(group)
+        for edge, index in out_edges:
+            slot_id, start_time, end_time = slots[index]
+            for _ in range(flows[edge]):
+                student_id = next(students)
+                schedules[student_id].attend(teacher_id, start_time, end_time)
+                seats[slot_id] -= 1
+                assignments.append((student_id, slot_id, start_time, end_time))
+    return assignments
+
+
+def assign_matching(teacher_slots, student_ids, schedules, seats):
+    """Drop-in replacement for assign_greedy booking teacher by teacher, see the module docstring."""
+    teacher_ids = sorted(teacher_slots, key=lambda teacher_id: (sum(seats[slot_id] for slot_id, _, _ in teacher_slots[teacher_id]), teacher_id))
+    assignments = []
+    for position, teacher_id in enumerate(teacher_ids):
+        later_slots = [(later_id, *slot) for later_id in teacher_ids[position + 1:] for slot in teacher_slots[later_id]]
+        assignments += match_teacher(teacher_id, teacher_slots[teacher_id], later_slots, student_ids, schedules, seats)
+    return assignments
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.4 on 2026-10-18 02:57
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_slot_time_range(apps, schema_editor):
+    SlotBooking = apps.get_model('slot_booking', 'SlotBooking')
+    TeacherAvailabilitySlot = apps.get_model('slot_booking', 'TeacherAvailabilitySlot')
+    slot = TeacherAvailabilitySlot.objects.filter(id=OuterRef('slot_id'))
+    SlotBooking.objects.filter(slot__isnull=False).update(
+        start_time=Subquery(slot.values('start_time')[:1]),
+        end_time=Subquery(slot.values('end_time')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('slot_booking', '0002_remove_slotbooking_end_time_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='slotbooking',
+            name='end_time',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name='slotbooking',
+            name='start_time',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(copy_slot_time_range, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='slotbooking',
+            index=models.Index(fields=['student', 'start_time', 'end_time'], name='booking_student_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teacheravailabilityslot',
+            index=models.Index(fields=['teacher', 'start_time', 'end_time'], name='slot_teacher_time_idx'),
+        ),
+    ]
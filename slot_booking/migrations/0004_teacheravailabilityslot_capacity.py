@@ -0,0 +1,34 @@
+# Generated by Django 5.1.4 on 2026-10-18 02:58
+
+import django.core.validators
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_existing_bookings(apps, schema_editor):
+    TeacherAvailabilitySlot = apps.get_model('slot_booking', 'TeacherAvailabilitySlot')
+    SlotBooking = apps.get_model('slot_booking', 'SlotBooking')
+    bookings = SlotBooking.objects.filter(slot_id=OuterRef('id')).order_by().values('slot_id').annotate(total=Count('id'))
+    TeacherAvailabilitySlot.objects.update(booked_count=Coalesce(Subquery(bookings.values('total')[:1]), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('slot_booking', '0003_slotbooking_time_range_and_overlap_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='teacheravailabilityslot',
+            name='booked_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='teacheravailabilityslot',
+            name='capacity',
+            field=models.PositiveIntegerField(default=30, validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+        migrations.RunPython(count_existing_bookings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.4 on 2026-10-18 03:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('slot_booking', '0004_teacheravailabilityslot_capacity'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='teacheravailabilityslot',
+            index=models.Index(fields=['start_time', 'id'], name='slot_start_time_id_idx'),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.1.4 on 2026-10-18 03:42
+
+import django.db.models.deletion
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+# Frozen copy of slot_booking.schedules as of this migration, so later
+# changes to the entry format do not change what it writes
+BULK_BATCH_SIZE = 1000
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+ONE_MICROSECOND = timedelta(microseconds=1)
+
+
+def to_micros(value):
+    return (value - EPOCH) // ONE_MICROSECOND
+
+
+def touched_days(start_time, end_time):
+    first_day = timezone.localdate(start_time)
+    last_day = timezone.localdate(end_time - ONE_MICROSECOND)
+    return [first_day + timedelta(days=offset) for offset in range((last_day - first_day).days + 1)]
+
+
+def day_entries(bookings):
+    """Sorted [start, end, teacher, slot, booking, created] entry lists by (student_id, day)."""
+    entries = defaultdict(list)
+    for student_id, teacher_id, slot_id, booking_id, start_time, end_time, created_at in bookings:
+        entry = [to_micros(start_time), to_micros(end_time), teacher_id, slot_id, booking_id, to_micros(created_at)]
+        for day in touched_days(start_time, end_time):
+            entries[student_id, day].append(entry)
+    for day_list in entries.values():
+        day_list.sort()
+    return entries
+
+
+def build_schedules(apps, schema_editor):
+    SlotBooking = apps.get_model('slot_booking', 'SlotBooking')
+    StudentDaySchedule = apps.get_model('slot_booking', 'StudentDaySchedule')
+    bookings = SlotBooking.objects.filter(slot__isnull=False).values_list(
+        'student_id', 'slot__teacher_id', 'slot_id', 'id', 'start_time', 'end_time', 'created_at'
+    )
+    StudentDaySchedule.objects.bulk_create(
+        [StudentDaySchedule(student_id=student_id, day=day, entries=entries) for (student_id, day), entries in day_entries(bookings.iterator()).items()],
+        batch_size=BULK_BATCH_SIZE
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('slot_booking', '0006_booking_jobs'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentDaySchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('entries', models.JSONField(default=list)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='day_schedules', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('student', 'day'), name='schedule_student_day_uniq')],
+            },
+        ),
+        migrations.RunPython(build_schedules, migrations.RunPython.noop),
+    ]
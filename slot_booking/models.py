@@ -1,18 +1,98 @@
+from django.core.validators import MinValueValidator
 from django.db import models
 from user.models import User
+from slot_booking.managers import TeacherAvailabilitySlotQuerySet, SlotBookingQuerySet
 
 
 # Model for Teacher Availability Slot
 class TeacherAvailabilitySlot(models.Model):
-    
+
     teacher = models.ForeignKey(User, related_name="slots", on_delete=models.CASCADE)
     start_time = models.DateTimeField()
     end_time = models.DateTimeField()
+    capacity = models.PositiveIntegerField(default=30, validators=[MinValueValidator(1)])
+    # Number of bookings, kept in step by the booking path and the delete signal
+    booked_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = TeacherAvailabilitySlotQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['teacher', 'start_time', 'end_time'], name='slot_teacher_time_idx'),
+            # Keyset pagination of the public catalog
+            models.Index(fields=['start_time', 'id'], name='slot_start_time_id_idx'),
+        ]
+
+    @property
+    def is_full(self):
+        return self.booked_count >= self.capacity
+
 
 # Model for Slot Booking
 class SlotBooking(models.Model):
     student = models.ForeignKey(User, related_name="booked_slots", on_delete=models.CASCADE)
     slot = models.ForeignKey(TeacherAvailabilitySlot, related_name="bookings", on_delete=models.CASCADE, null=True)
+    # Copied from the slot so the student's time range can be indexed
+    start_time = models.DateTimeField(null=True)
+    end_time = models.DateTimeField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = SlotBookingQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['student', 'start_time', 'end_time'], name='booking_student_time_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.slot is not None:
+            self.start_time = self.slot.start_time
+            self.end_time = self.slot.end_time
+        super().save(*args, **kwargs)
+
+
+# A student's bookings touching one server-local day, kept in step with SlotBooking (see slot_booking/schedules.py)
+class StudentDaySchedule(models.Model):
+    student = models.ForeignKey(User, related_name="day_schedules", on_delete=models.CASCADE)
+    day = models.DateField()
+    # [start, end, teacher_id, slot_id, booking_id, created_at] per booking, sorted by start; times in epoch microseconds
+    entries = models.JSONField(default=list)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'day'], name='schedule_student_day_uniq'),
+        ]
+
+
+# Background run of the daily default booking, one per day
+class BookingJob(models.Model):
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        RUNNING = 'running', 'Running'
+        DONE = 'done', 'Done'
+        FAILED = 'failed', 'Failed'
+
+    day = models.DateField(unique=True)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    # Last sign of life of the runner; a running job with a stale heartbeat is resumed
+    heartbeat_at = models.DateTimeField(null=True)
+    started_at = models.DateTimeField(null=True)
+    finished_at = models.DateTimeField(null=True)
+    result = models.JSONField(null=True)
+    error = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+
+
+# Students of a job with ids in [first_student_id, last_student_id], booked in one transaction
+class BookingJobShard(models.Model):
+    job = models.ForeignKey(BookingJob, related_name="shards", on_delete=models.CASCADE)
+    first_student_id = models.BigIntegerField()
+    last_student_id = models.BigIntegerField()
+    done = models.BooleanField(default=False)
+    students = models.PositiveIntegerField(default=0)
+    booked = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['first_student_id']
@@ -0,0 +1,225 @@
+"""
+Per-student day schedules (StudentDaySchedule).
+
+Every booking is copied into the row of each server-local day it touches,
+as a short list of entries sorted by start time. Booking conflict checks,
+the daily default booking and the student's upcoming bookings read these
+rows instead of joining SlotBooking with its slot.
+
+Single bookings are kept in step by the signals in slot_booking/signals.py;
+bulk writes call add_bookings themselves.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+from functools import lru_cache
+from django.utils import timezone
+from online_class_book.utils import date_window
+from slot_booking.models import SlotBooking, StudentDaySchedule
+from slot_booking.intervals import IntervalSet
+
+
+# Rows written per statement by bulk_create/bulk_update
+BULK_BATCH_SIZE = 1000
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+ONE_MICROSECOND = timedelta(microseconds=1)
+
+# Positions in an entry
+START, END, TEACHER, SLOT, BOOKING, CREATED = range(6)
+
+
+def to_micros(value):
+    """Aware datetime to epoch microseconds, the exact and sortable form stored in entries."""
+    return (value - EPOCH) // ONE_MICROSECOND
+
+
+@lru_cache(maxsize=4096)
+def from_micros(value):
+    return EPOCH + value * ONE_MICROSECOND
+
+
+def touched_days(start_time, end_time):
+    """Server-local days the half-open [start_time, end_time) touches."""
+    first_day = timezone.localdate(start_time)
+    last_day = timezone.localdate(end_time - ONE_MICROSECOND)
+    return [first_day + timedelta(days=offset) for offset in range((last_day - first_day).days + 1)]
+
+
+def day_entries(bookings):
+    """
+    Group (student_id, teacher_id, slot_id, booking_id, start_time, end_time,
+    created_at) tuples into sorted entry lists by (student_id, day).
+    """
+    entries = defaultdict(list)
+    # Bookings share a few slot time ranges; convert each one once
+    spans = {}
+    for student_id, teacher_id, slot_id, booking_id, start_time, end_time, created_at in bookings:
+        span = spans.get((start_time, end_time))
+        if span is None:
+            span = spans[start_time, end_time] = (to_micros(start_time), to_micros(end_time), touched_days(start_time, end_time))
+        start, end, days = span
+        entry = [start, end, teacher_id, slot_id, booking_id, to_micros(created_at)]
+        for day in days:
+            entries[student_id, day].append(entry)
+    for day_list in entries.values():
+        day_list.sort()
+    return entries
+
+
+def booking_tuple(booking):
+    """day_entries input for a booking with its slot attached."""
+    return (
+        booking.student_id, booking.slot.teacher_id, booking.slot_id, booking.id,
+        booking.start_time, booking.end_time, booking.created_at
+    )
+
+
+def existing_rows(keys, for_update=False):
+    """Schedule rows for (student_id, day) keys, in one range query; locked with `for_update` (see lock_rows)."""
+    if not keys:
+        return {}
+    student_ids = [student_id for student_id, _ in keys]
+    days = [day for _, day in keys]
+    rows = StudentDaySchedule.objects.select_for_update() if for_update else StudentDaySchedule.objects
+    rows = rows.filter(
+        student__id__range=(min(student_ids), max(student_ids)),
+        day__range=(min(days), max(days))
+    )
+    return {(row.student_id, row.day): row for row in rows if (row.student_id, row.day) in keys}
+
+
+def lock_rows(keys):
+    """
+    Schedule rows for (student_id, day) keys, locked until the transaction
+    ends. Missing rows are inserted empty first: locking finds nothing to lock
+    on a student's first booking of a day, so two such bookings would both
+    pass the conflict check. Rows still empty at commit are for the caller to
+    delete (see delete_empty_rows).
+    """
+    StudentDaySchedule.objects.bulk_create(
+        [StudentDaySchedule(student_id=student_id, day=day, entries=[]) for student_id, day in keys],
+        batch_size=BULK_BATCH_SIZE, ignore_conflicts=True
+    )
+    return existing_rows(keys, for_update=True)
+
+
+def delete_empty_rows(rows):
+    """Delete the rows of lock_rows nothing was added to."""
+    empty = [row.id for row in rows.values() if not row.entries]
+    if empty:
+        StudentDaySchedule.objects.filter(id__in=empty).delete()
+
+
+def add_bookings(bookings, rows=None):
+    """
+    Copy new bookings, each with its slot attached, into their students' day
+    schedules: one query for the existing rows, unless the caller already
+    read them into `rows` (see load_day_schedules), then bulk updates and inserts.
+    """
+    added = day_entries(booking_tuple(booking) for booking in bookings if booking.slot_id)
+    if rows is None:
+        rows = existing_rows(added)
+    updated = []
+    created = []
+    for (student_id, day), entries in added.items():
+        row = rows.get((student_id, day))
+        if row is None:
+            created.append(StudentDaySchedule(student_id=student_id, day=day, entries=entries))
+        else:
+            row.entries = sorted(row.entries + entries)
+            updated.append(row)
+
+    StudentDaySchedule.objects.bulk_update(updated, ['entries'], batch_size=BULK_BATCH_SIZE)
+    StudentDaySchedule.objects.bulk_create(created, batch_size=BULK_BATCH_SIZE)
+
+
+def remove_bookings(bookings):
+    """Drop deleted bookings from their students' day schedules; rows left empty are deleted."""
+    removed = defaultdict(set)
+    for booking in bookings:
+        if booking.start_time is None:
+            continue
+        for day in touched_days(booking.start_time, booking.end_time):
+            removed[booking.student_id, day].add(booking.id)
+
+    updated = []
+    emptied = []
+    for key, row in existing_rows(removed).items():
+        row.entries = [entry for entry in row.entries if entry[BOOKING] not in removed[key]]
+        if row.entries:
+            updated.append(row)
+        else:
+            emptied.append(row.id)
+
+    StudentDaySchedule.objects.bulk_update(updated, ['entries'], batch_size=BULK_BATCH_SIZE)
+    if emptied:
+        StudentDaySchedule.objects.filter(id__in=emptied).delete()
+
+
+def rebuild_schedules(student_ids):
+    """Rebuild the students' day schedules from their bookings."""
+    bookings = SlotBooking.objects.filter(student_id__in=student_ids, slot__isnull=False).values_list(
+        'student_id', 'slot__teacher_id', 'slot_id', 'id', 'start_time', 'end_time', 'created_at'
+    )
+    StudentDaySchedule.objects.filter(student_id__in=student_ids).delete()
+    StudentDaySchedule.objects.bulk_create(
+        [StudentDaySchedule(student_id=student_id, day=day, entries=entries) for (student_id, day), entries in day_entries(bookings).items()],
+        batch_size=BULK_BATCH_SIZE
+    )
+
+
+def load_day_schedules(student_id, start_time, end_time):
+    """
+    The student's rows for the days [start_time, end_time) touches, by
+    (student_id, day), created empty where missing and locked until the
+    transaction ends (see lock_rows).
+    """
+    return lock_rows({(student_id, day) for day in touched_days(start_time, end_time)})
+
+
+def booking_conflict(schedules, teacher_id, start_time, end_time):
+    """
+    Check a new booking against the student's rows from load_day_schedules:
+    returns 'teacher' when the student already booked `teacher_id` on the day
+    of `start_time`, 'overlap' when a booking overlaps [start_time, end_time),
+    otherwise None.
+    """
+    first_day = timezone.localdate(start_time)
+    # Rows also hold bookings running over from the day before; only those starting that day count
+    day_start = to_micros(date_window(first_day)[0])
+    for (_, day), row in schedules.items():
+        if day == first_day and any(entry[TEACHER] == teacher_id and entry[START] >= day_start for entry in row.entries):
+            return 'teacher'
+
+    start, end = to_micros(start_time), to_micros(end_time)
+    for row in schedules.values():
+        if IntervalSet((entry[START], entry[END]) for entry in row.entries).overlaps(start, end):
+            return 'overlap'
+    return None
+
+
+def upcoming_bookings(student_id, window=None):
+    """
+    The student's bookings starting after now, and inside the half-open
+    `window` if given, sorted by (start_time, id). Rows are dicts with the
+    booking's id, slot_id, start_time and created_at.
+    """
+    lower = to_micros(timezone.now())
+    schedules = StudentDaySchedule.objects.filter(student_id=student_id, day__gte=timezone.localdate())
+    upper = None
+    if window:
+        lower = max(lower, to_micros(window[0]) - 1)
+        upper = to_micros(window[1])
+        window_days = touched_days(*window)
+        schedules = schedules.filter(day__range=(window_days[0], window_days[-1]))
+
+    entries = {}
+    for day_list in schedules.values_list('entries', flat=True):
+        for entry in day_list:
+            if entry[START] > lower and (upper is None or entry[START] < upper):
+                entries[entry[BOOKING]] = entry
+
+    return [
+        {'id': entry[BOOKING], 'slot_id': entry[SLOT], 'start_time': from_micros(entry[START]), 'created_at': from_micros(entry[CREATED])}
+        for entry in sorted(entries.values(), key=lambda entry: (entry[START], entry[BOOKING]))
+    ]
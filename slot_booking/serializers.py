@@ -1,10 +1,24 @@
+from datetime import datetime, time, timedelta
+from operator import attrgetter
 from rest_framework import serializers
+from django.utils import timezone
 from django.utils.timezone import now
 from slot_booking.models import TeacherAvailabilitySlot
 from user.serializers import UserSerializer
+from online_class_book.instrumentation import TimedSerializerMixin
 
 
-class TeacherAvailabilitySlotSerializer(serializers.ModelSerializer):
+# Readable fields of UserSerializer, in output order
+STUDENT_FIELDS = ('email', 'first_name', 'last_name', 'phone', 'age', 'role')
+_student_values = attrgetter(*STUDENT_FIELDS)
+
+
+def student_representation(user):
+    """Read-only equivalent of UserSerializer(user).data without building a serializer."""
+    return dict(zip(STUDENT_FIELDS, _student_values(user)))
+
+
+class TeacherAvailabilitySlotSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     # Define start_time and end_time with custom input and output formats
     start_time = serializers.DateTimeField(
         input_formats=["%Y-%m-%d %H:%M"],  # Input format
@@ -18,8 +32,8 @@ class TeacherAvailabilitySlotSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = TeacherAvailabilitySlot
-        fields = ['id', 'teacher', 'start_time', 'end_time', 'reserved_students', 'created_at']
-        read_only_fields = ['created_at']
+        fields = ['id', 'teacher', 'start_time', 'end_time', 'capacity', 'booked_count', 'reserved_students', 'created_at']
+        read_only_fields = ['booked_count', 'created_at']
 
     def validate_start_time_and_end_time(self, start_time, end_time):
         """Validate time logic between start_time and end_time."""
@@ -38,11 +52,7 @@ class TeacherAvailabilitySlotSerializer(serializers.ModelSerializer):
 
     def validate_slot_overlap(self, teacher, start_time, end_time):
         """Check if the slot overlaps with existing slots for the same teacher."""
-        if TeacherAvailabilitySlot.objects.filter(
-            teacher=teacher,
-            start_time__lt=end_time,
-            end_time__gt=start_time
-        ).exists():
+        if TeacherAvailabilitySlot.objects.has_overlap(teacher.id, start_time, end_time):
             raise serializers.ValidationError("This time slot overlaps with an existing slot.")
 
     def validate(self, data):
@@ -59,12 +69,68 @@ class TeacherAvailabilitySlotSerializer(serializers.ModelSerializer):
         return data
 
     def get_reserved_students(self, obj):
-        booked_slots = obj.bookings.all()
-        student_list = []
-        for slot in booked_slots:
-            student_list.append(UserSerializer(slot.student).data)
+        # Expects bookings prefetched with their students, see TeacherSlotAPIView
+        return [student_representation(booking.student) for booking in obj.bookings.all()]
+
+
+class BulkSlotItemSerializer(TeacherAvailabilitySlotSerializer):
+    """
+    One slot of a bulk request. Overlaps are checked for the whole batch at
+    once, see slot_booking.bulk_slots.
+    """
+
+    class Meta(TeacherAvailabilitySlotSerializer.Meta):
+        fields = ['start_time', 'end_time', 'capacity']
+
+    def validate(self, data):
+        self.validate_start_time_and_end_time(data['start_time'], data['end_time'])
+        self.validate_future_dates(data['start_time'], data['end_time'])
+        return data
+
+
+class SlotRecurrenceSerializer(serializers.Serializer):
+    """
+    Weekly recurrence rule: a slot of `duration` hours starting at each of
+    `hours` on each of `weekdays` (0 is Monday) between date_from and date_to.
+    """
+    # Longest recurrence accepted in one request
+    MAX_DAYS = 366
+
+    date_from = serializers.DateField()
+    date_to = serializers.DateField()
+    weekdays = serializers.ListField(child=serializers.IntegerField(min_value=0, max_value=6), allow_empty=False)
+    hours = serializers.ListField(child=serializers.IntegerField(min_value=0, max_value=23), allow_empty=False)
+    duration = serializers.IntegerField(min_value=1, max_value=12, default=1)
+    capacity = serializers.IntegerField(min_value=1, required=False)
+
+    def validate(self, data):
+        if data['date_to'] < data['date_from']:
+            raise serializers.ValidationError("'date_to' must not be earlier than 'date_from'.")
+        if (data['date_to'] - data['date_from']).days >= self.MAX_DAYS:
+            raise serializers.ValidationError(f"Recurrence can span at most {self.MAX_DAYS} days.")
+        return data
 
-        return student_list
+    def expand(self):
+        """Slot items, in BulkSlotItemSerializer input format, generated by the rule."""
+        data = self.validated_data
+        weekdays = set(data['weekdays'])
+        hours = sorted(set(data['hours']))
+        items = []
+        day = data['date_from']
+        while day <= data['date_to']:
+            if day.weekday() in weekdays:
+                for hour in hours:
+                    start_time = timezone.make_aware(datetime.combine(day, time(hour)))
+                    end_time = start_time + timedelta(hours=data['duration'])
+                    item = {
+                        'start_time': timezone.localtime(start_time).strftime("%Y-%m-%d %H:%M"),
+                        'end_time': timezone.localtime(end_time).strftime("%Y-%m-%d %H:%M"),
+                    }
+                    if 'capacity' in data:
+                        item['capacity'] = data['capacity']
+                    items.append(item)
+            day += timedelta(days=1)
+        return items
 
 
 class AvailableSlotForStudent(serializers.ModelSerializer):
@@ -85,7 +151,7 @@ class AvailableSlotForStudent(serializers.ModelSerializer):
         read_only_fields = ['created_at']
 
 
-class SlotBookingForStudentSerializer(serializers.ModelSerializer):
+class SlotBookingForStudentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
 
     slot = AvailableSlotForStudent(many=False)
 
@@ -0,0 +1,45 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from slot_booking.models import TeacherAvailabilitySlot, SlotBooking
+from slot_booking.cache import invalidate_slot_days, invalidate_students
+from slot_booking.schedules import add_bookings, remove_bookings, rebuild_schedules
+
+
+@receiver(post_delete, sender=SlotBooking)
+def release_slot_seat(sender, instance, **kwargs):
+    """Give the seat back when a booking is removed."""
+    if instance.slot_id:
+        TeacherAvailabilitySlot.objects.filter(
+            id=instance.slot_id,
+            booked_count__gt=0
+        ).update(booked_count=F('booked_count') - 1)
+
+
+@receiver(post_save, sender=SlotBooking)
+def add_to_schedule(sender, instance, created, raw=False, **kwargs):
+    """Copy the booking into the student's day schedule."""
+    if raw:
+        return
+    invalidate_students(instance.student_id)
+    if created:
+        # book_slot hands over the rows it already read for its conflict checks
+        add_bookings([instance], getattr(instance, 'loaded_schedules', None))
+    else:
+        # The booking's time range may have moved to other days
+        rebuild_schedules([instance.student_id])
+
+
+@receiver(post_delete, sender=SlotBooking)
+def remove_from_schedule(sender, instance, **kwargs):
+    invalidate_students(instance.student_id)
+    remove_bookings([instance])
+
+
+@receiver(post_save, sender=TeacherAvailabilitySlot)
+@receiver(post_delete, sender=TeacherAvailabilitySlot)
+@receiver(post_save, sender=SlotBooking)
+@receiver(post_delete, sender=SlotBooking)
+def invalidate_catalog(sender, instance, **kwargs):
+    """Bump the catalog cache versions of the slot's day."""
+    invalidate_slot_days(instance.start_time)
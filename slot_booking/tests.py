@@ -1,3 +1,1303 @@
-from django.test import TestCase
+import csv
+import json
+import random
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from datetime import datetime, time, timedelta
+from asgiref.sync import sync_to_async
+import time as time_module
+from django.db import connection, transaction, OperationalError
+from io import StringIO
+from django.conf import settings
+from django.core.management import call_command
+from django.db.models import Q
+from django.test import TestCase, TransactionTestCase, AsyncRequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from user.models import User, TeacherProfile
+from user.serializers import UserSerializer
+from slot_booking.models import TeacherAvailabilitySlot, SlotBooking, BookingJob, StudentDaySchedule
+from slot_booking.schedules import load_day_schedules, upcoming_bookings
+from slot_booking.default_booking import DefaultBookingEngine, StudentDay, assign_greedy
+from slot_booking.matching import assign_matching
+from slot_booking.jobs import enqueue_default_booking, claim_job, create_shards, run_shard, run_pending_jobs, BookingWorker
+from slot_booking.booking import book_slot, BookingError
+from slot_booking.async_views import AsyncStudentTeacherSlotsAPIView, AsyncBookSlotAPIView
+from slot_booking.cache import get_cache, catalog_cache_stats
+from slot_booking.serializers import TeacherAvailabilitySlotSerializer, AvailableSlotForStudent, SlotBookingForStudentSerializer
+from slot_booking.fast_serializers import (
+    available_slot_values, available_slot_rows, teacher_slot_values, teacher_slot_rows,
+    schedule_booking_rows
+)
+from online_class_book.renderers import FastJSONRenderer
+from online_class_book.pagination import KeysetPagination
+from rest_framework.renderers import JSONRenderer
+from benchmarks import suite
+from user.tokens import RoleRefreshToken
+from online_class_book.instrumentation import collected_histograms
+from online_class_book.db import configure_sqlite
 
-# Create your tests here.
+
+def create_user(index, role, subject=None):
+    user = User.objects.create_user(
+        email=f"{role.lower()}{index}@yopmail.com",
+        first_name=role,
+        last_name=f"User{index}",
+        phone=f"9{index:09d}",
+        age=25,
+        role=role
+    )
+    if subject:
+        TeacherProfile.objects.create(user=user, subject=subject)
+    return user
+
+
+def at_hour(day, hour):
+    return timezone.make_aware(datetime.combine(day, time(hour)))
+
+
+class DefaultSlotBookAPITests(TestCase):
+    def setUp(self):
+        """
+        Two teachers with overlapping slots today and three students.
+        """
+        self.default_url = reverse("set_default_class_slot")
+        self.today = timezone.now().date()
+        self.teachers = [create_user(i, "Teacher", "Math") for i in range(2)]
+        self.students = [create_user(10 + i, "Student") for i in range(3)]
+
+        for teacher in self.teachers:
+            for hour in (9, 10):
+                TeacherAvailabilitySlot.objects.create(
+                    teacher=teacher,
+                    start_time=at_hour(self.today, hour),
+                    end_time=at_hour(self.today, hour + 1)
+                )
+
+    def assert_conflict_free(self, student):
+        bookings = list(SlotBooking.objects.filter(student=student).select_related('slot').order_by('slot__start_time'))
+        self.assertEqual(len({booking.slot.teacher_id for booking in bookings}), len(bookings))
+        for previous, current in zip(bookings, bookings[1:]):
+            self.assertLessEqual(previous.slot.end_time, current.slot.start_time)
+        return bookings
+
+    def test_books_every_teacher_without_conflicts(self):
+        """
+        Test every student gets one non-overlapping slot per teacher.
+        """
+        result = DefaultBookingEngine().run()
+        self.assertEqual(result["booked"], len(self.students) * len(self.teachers))
+        self.assertEqual(set(result["timings_ms"]), {"load", "assign", "write", "total"})
+        for student in self.students:
+            self.assertEqual(len(self.assert_conflict_free(student)), len(self.teachers))
+
+    def test_respects_existing_bookings_and_is_idempotent(self):
+        """
+        Test existing bookings are kept and a second run books nothing.
+        """
+        first_slot = TeacherAvailabilitySlot.objects.get(teacher=self.teachers[0], start_time=at_hour(self.today, 9))
+        SlotBooking.objects.create(student=self.students[0], slot=first_slot)
+
+        result = DefaultBookingEngine().run()
+        self.assertEqual(result["booked"], len(self.students) * len(self.teachers) - 1)
+        self.assertEqual(SlotBooking.objects.filter(student=self.students[0], slot=first_slot).count(), 1)
+        self.assert_conflict_free(self.students[0])
+
+        self.assertEqual(DefaultBookingEngine().run()["booked"], 0)
+
+    def test_drops_assignments_conflicting_with_new_bookings(self):
+        """
+        Test bookings made between load and write are checked again, like book_slot does.
+        """
+        engine = DefaultBookingEngine()
+        assignments = engine.assign(*engine.load())
+        student = self.students[0]
+        self.assertEqual({slot_id for student_id, slot_id, _, _ in assignments if student_id == student.id}, set(
+            TeacherAvailabilitySlot.objects.filter(
+                Q(teacher=self.teachers[0], start_time=at_hour(self.today, 9)) | Q(teacher=self.teachers[1], start_time=at_hour(self.today, 10))
+            ).values_list('id', flat=True)
+        ))
+
+        # Same teacher as the 9:00 assignment, same time as the 10:00 one
+        book_slot(student, TeacherAvailabilitySlot.objects.get(teacher=self.teachers[0], start_time=at_hour(self.today, 10)).id)
+        bookings = engine.write(assignments)
+        self.assertEqual(len(bookings), len(assignments) - 2)
+        self.assertEqual(len(self.assert_conflict_free(student)), 1)
+        self.assertEqual(len(StudentDaySchedule.objects.get(student=student).entries), 1)
+
+    def test_respects_slot_capacity(self):
+        """
+        Test full slots are skipped and seat counters are updated.
+        """
+        TeacherAvailabilitySlot.objects.update(capacity=1)
+
+        result = DefaultBookingEngine().run()
+        # One seat per slot: two students fill all four slots, the third gets none
+        self.assertEqual(result["booked"], 4)
+        for slot in TeacherAvailabilitySlot.objects.all():
+            self.assertEqual(slot.booked_count, slot.bookings.count())
+            self.assertLessEqual(slot.booked_count, slot.capacity)
+
+    def test_query_count_is_constant(self):
+        """
+        Test the number of queries does not grow with the number of students.
+        """
+        with self.assertNumQueries(11):
+            DefaultBookingEngine().run()
+
+        SlotBooking.objects.all().delete()
+        for i in range(20):
+            create_user(100 + i, "Student")
+
+        with self.assertNumQueries(11):
+            DefaultBookingEngine().run()
+
+
+class MatchingSolverTests(TestCase):
+    def setUp(self):
+        """
+        Teacher A teaches at 9 and 10, teacher B only at 9, one seat each.
+        """
+        self.today = timezone.now().date()
+        self.teacher_a, self.teacher_b = create_user(0, "Teacher", "Math"), create_user(1, "Teacher", "Physics")
+        self.student = create_user(10, "Student")
+        for teacher, hours in ((self.teacher_a, (9, 10)), (self.teacher_b, (9,))):
+            for hour in hours:
+                TeacherAvailabilitySlot.objects.create(
+                    teacher=teacher, start_time=at_hour(self.today, hour), end_time=at_hour(self.today, hour + 1), capacity=1
+                )
+
+    def test_matching_covers_more_than_greedy(self):
+        """
+        Test the matching solver moves teacher A to 10 so the student also gets teacher B.
+        """
+        with transaction.atomic():
+            self.assertEqual(DefaultBookingEngine(solver="greedy").run()["booked"], 1)
+            transaction.set_rollback(True)
+
+        result = DefaultBookingEngine(solver="matching").run()
+        self.assertEqual(result["booked"], 2)
+        self.assertEqual(result["solver"], "matching")
+        booked = dict(SlotBooking.objects.filter(student=self.student).values_list("slot__teacher_id", "start_time"))
+        self.assertEqual(booked, {self.teacher_a.id: at_hour(self.today, 10), self.teacher_b.id: at_hour(self.today, 9)})
+
+    def test_partly_overlapping_slots(self):
+        """
+        Test every teacher is booked without overlaps when slots partly overlap.
+        """
+        teacher_c = create_user(2, "Teacher", "Chemistry")
+        TeacherAvailabilitySlot.objects.create(
+            teacher=teacher_c,
+            start_time=at_hour(self.today, 9) + timedelta(minutes=30),
+            end_time=at_hour(self.today, 10) + timedelta(minutes=30)
+        )
+        TeacherAvailabilitySlot.objects.create(
+            teacher=self.teacher_b, start_time=at_hour(self.today, 11), end_time=at_hour(self.today, 12)
+        )
+        TeacherAvailabilitySlot.objects.filter(teacher=self.teacher_a, start_time=at_hour(self.today, 10)).update(
+            start_time=at_hour(self.today, 12), end_time=at_hour(self.today, 13)
+        )
+
+        self.assertEqual(DefaultBookingEngine(solver="matching").run()["booked"], 3)
+        intervals = sorted(SlotBooking.objects.filter(student=self.student).values_list("start_time", "end_time"))
+        for (_, previous_end), (start, _) in zip(intervals, intervals[1:]):
+            self.assertLessEqual(previous_end, start)
+
+    def random_day(self, rng):
+        """Random in-memory solver input: on-the-hour slots of one to three hours, some students already booked."""
+        day = timezone.make_aware(datetime(2030, 1, 7))
+        teacher_slots = {}
+        seats = {}
+        for teacher_id in range(1, rng.randint(1, 4) + 1):
+            teacher_slots[teacher_id] = []
+            hour = 8 + rng.randint(0, 2)
+            while hour < 17 and len(teacher_slots[teacher_id]) < 3:
+                length = rng.randint(1, 3)
+                slot_id = len(seats) + 1
+                teacher_slots[teacher_id].append((slot_id, day + timedelta(hours=hour), day + timedelta(hours=hour + length)))
+                seats[slot_id] = rng.randint(1, 4)
+                hour += length + rng.randint(0, 2)
+
+        student_ids = list(range(1, rng.randint(1, 6) + 1))
+        schedules = {student_id: StudentDay() for student_id in student_ids}
+        all_slots = [(teacher_id, slot) for teacher_id, slots in teacher_slots.items() for slot in slots]
+        for student_id in student_ids:
+            teacher_id, (slot_id, start_time, end_time) = rng.choice(all_slots)
+            if rng.random() < 0.3 and seats[slot_id]:
+                seats[slot_id] -= 1
+                schedules[student_id].attend(teacher_id, start_time, end_time)
+        return teacher_slots, student_ids, schedules, seats
+
+    def solve(self, assign, day):
+        teacher_slots, student_ids, schedules, seats = day
+        schedules = {student_id: schedule.copy() for student_id, schedule in schedules.items()}
+        seats = dict(seats)
+        check_schedules = {student_id: schedule.copy() for student_id, schedule in schedules.items()}
+        assignments = assign(teacher_slots, student_ids, schedules, seats)
+
+        # Every booking fits the student's day and the slot's seats
+        slot_teachers = {slot_id: teacher_id for teacher_id, slots in teacher_slots.items() for slot_id, _, _ in slots}
+        for student_id, slot_id, start_time, end_time in assignments:
+            self.assertTrue(check_schedules[student_id].can_attend(slot_teachers[slot_id], start_time, end_time))
+            check_schedules[student_id].attend(slot_teachers[slot_id], start_time, end_time)
+        self.assertTrue(all(free >= 0 for free in seats.values()))
+        return len(assignments)
+
+    def test_random_days(self):
+        """
+        Test the matching solver books valid schedules on random days, more of them in total than greedy.
+        """
+        rng = random.Random(7)
+        days = [self.random_day(rng) for _ in range(300)]
+        self.assertGreater(sum(self.solve(assign_matching, day) for day in days), sum(self.solve(assign_greedy, day) for day in days))
+
+    def test_chained_two_hour_slots(self):
+        """
+        Test a morning of chained two-hour slots is fully booked, like greedy does.
+        """
+        day = timezone.make_aware(datetime(2030, 1, 7))
+        hours = lambda start, end: (day + timedelta(hours=start), day + timedelta(hours=end))
+        teacher_slots = {
+            1: [(1, *hours(10, 11)), (2, *hours(11, 12))],
+            2: [(3, *hours(8, 10)), (4, *hours(12, 13))],
+            3: [(5, *hours(9, 11)), (6, *hours(12, 13))],
+        }
+        seats = {1: 2, 2: 1, 3: 2, 4: 3, 5: 4, 6: 3}
+        student_ids = list(range(1, 6))
+        schedules = {student_id: StudentDay() for student_id in student_ids}
+        self.assertEqual(self.solve(assign_greedy, (teacher_slots, student_ids, schedules, seats)), 13)
+        self.assertEqual(self.solve(assign_matching, (teacher_slots, student_ids, schedules, seats)), 13)
+
+
+class DefaultBookingJobTests(TestCase):
+    def setUp(self):
+        """
+        Two teachers with two slots today and five students.
+        """
+        self.today = timezone.now().date()
+        self.teachers = [create_user(i, "Teacher", "Math") for i in range(2)]
+        self.students = [create_user(10 + i, "Student") for i in range(5)]
+        for teacher in self.teachers:
+            for hour in (9, 10):
+                TeacherAvailabilitySlot.objects.create(
+                    teacher=teacher,
+                    start_time=at_hour(self.today, hour),
+                    end_time=at_hour(self.today, hour + 1)
+                )
+
+    def test_endpoint_enqueues_job(self):
+        """
+        Test the endpoint only queues one job per day and the status endpoint reports its result, for staff only.
+        """
+        staff = create_user(30, "Teacher", "Math")
+        staff.is_staff = True
+        staff.save()
+        auth = {"HTTP_AUTHORIZATION": f'Bearer {RoleRefreshToken.for_user(staff).access_token}'}
+        student_auth = {"HTTP_AUTHORIZATION": f'Bearer {RoleRefreshToken.for_user(self.students[0]).access_token}'}
+        self.assertIn(self.client.post(reverse("set_default_class_slot")).status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+        self.assertEqual(self.client.post(reverse("set_default_class_slot"), **student_auth).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(BookingJob.objects.exists())
+
+        response = self.client.post(reverse("set_default_class_slot"), **auth)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job_id = response.json()["data"]["job_id"]
+        self.assertEqual(response.json()["data"]["status"], BookingJob.Status.PENDING)
+        self.assertFalse(SlotBooking.objects.exists())
+        self.assertEqual(self.client.post(reverse("set_default_class_slot"), **auth).json()["data"]["job_id"], job_id)
+
+        run_pending_jobs(workers=1)
+        self.assertEqual(self.client.get(reverse("default_class_slot_job", args=[job_id]), **student_auth).status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.get(reverse("default_class_slot_job", args=[job_id]), **auth)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()["data"]
+        self.assertEqual(data["status"], BookingJob.Status.DONE)
+        self.assertEqual(data["result"]["booked"], len(self.students) * len(self.teachers))
+
+        response = self.client.get(reverse("default_class_slot_job", args=[job_id + 1]), **auth)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(DEFAULT_BOOKING_SHARD_SIZE=2)
+    def test_sharded_run_matches_single_run(self):
+        """
+        Test a job split into shards books every student and a second run books nothing.
+        """
+        call_command("default_booking", workers=1, stdout=StringIO())
+        job = BookingJob.objects.get(day=self.today)
+        self.assertEqual(job.status, BookingJob.Status.DONE)
+        self.assertEqual(job.shards.count(), 3)
+        self.assertEqual(SlotBooking.objects.count(), len(self.students) * len(self.teachers))
+
+        call_command("default_booking", workers=1, force=True, stdout=StringIO())
+        self.assertEqual(BookingJob.objects.get(day=self.today).result["booked"], 0)
+
+    @override_settings(DEFAULT_BOOKING_SHARD_SIZE=2)
+    def test_resumes_interrupted_job(self):
+        """
+        Test a job left running by a dead worker is resumed from its pending shards.
+        """
+        job = enqueue_default_booking(self.today)
+        self.assertIsNone(claim_job(job.id + 1))
+        job = claim_job(job.id)
+        create_shards(job)
+        first_shard = job.shards.first()
+        run_shard(first_shard.id)
+        self.assertIsNone(claim_job())
+
+        # The worker dies: its heartbeat goes stale
+        BookingJob.objects.filter(id=job.id).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        jobs = run_pending_jobs(workers=1)
+        self.assertEqual([resumed.id for resumed in jobs], [job.id])
+        self.assertEqual(jobs[0].result["booked"], len(self.students) * len(self.teachers))
+        self.assertEqual(SlotBooking.objects.count(), len(self.students) * len(self.teachers))
+
+    def test_scheduler_enqueues_once_per_day(self):
+        """
+        Test the worker enqueues the day's job after DEFAULT_BOOKING_TIME, once.
+        """
+        worker = BookingWorker(workers=1)
+        current = timezone.make_aware(datetime.combine(self.today, time(0, 1)))
+        self.assertIsNone(worker.schedule_due(current))
+        self.assertIsNotNone(worker.schedule_due(current + timedelta(hours=1)))
+        self.assertIsNone(worker.schedule_due(current + timedelta(hours=2)))
+        self.assertEqual(BookingJob.objects.count(), 1)
+
+
+class OverlapLookupTests(TestCase):
+    def setUp(self):
+        """
+        One teacher with back-to-back slots tomorrow and a student booked into one.
+        """
+        self.day = timezone.now().date() + timedelta(days=1)
+        self.teacher = create_user(1, "Teacher", "Math")
+        self.student = create_user(2, "Student")
+        self.slots = [
+            TeacherAvailabilitySlot.objects.create(
+                teacher=self.teacher,
+                start_time=at_hour(self.day, hour),
+                end_time=at_hour(self.day, hour + 1)
+            )
+            for hour in (9, 10, 14)
+        ]
+        self.booking = SlotBooking.objects.create(student=self.student, slot=self.slots[1])
+
+    def test_booking_copies_slot_time_range(self):
+        """
+        Test a booking stores its slot's time range.
+        """
+        self.assertEqual(self.booking.start_time, self.slots[1].start_time)
+        self.assertEqual(self.booking.end_time, self.slots[1].end_time)
+
+    def test_slot_overlap(self):
+        """
+        Test overlap detection for a teacher's slots, including touching edges.
+        """
+        slots = TeacherAvailabilitySlot.objects
+        self.assertTrue(slots.has_overlap(self.teacher.id, at_hour(self.day, 10), at_hour(self.day, 12)))
+        self.assertTrue(slots.has_overlap(self.teacher.id, at_hour(self.day, 8), at_hour(self.day, 15)))
+        self.assertFalse(slots.has_overlap(self.teacher.id, at_hour(self.day, 11), at_hour(self.day, 14)))
+        self.assertFalse(slots.has_overlap(self.teacher.id, at_hour(self.day, 15), at_hour(self.day, 16)))
+
+
+class BookSlotAPITests(TestCase):
+    def setUp(self):
+        """
+        A one-seat slot tomorrow and two students with access tokens.
+        """
+        self.book_url = reverse("book_class_slot")
+        day = timezone.now().date() + timedelta(days=1)
+        self.teacher = create_user(1, "Teacher", "Math")
+        self.students = [create_user(10 + i, "Student") for i in range(2)]
+        self.slot = TeacherAvailabilitySlot.objects.create(
+            teacher=self.teacher,
+            start_time=at_hour(day, 9),
+            end_time=at_hour(day, 10),
+            capacity=1
+        )
+
+    def book(self, student):
+        access_token = str(RoleRefreshToken.for_user(student).access_token)
+        return self.client.post(self.book_url, {
+            "slot_id": self.slot.id
+        }, HTTP_AUTHORIZATION=f'Bearer {access_token}', content_type="application/json")
+
+    def test_book_slot_until_full(self):
+        """
+        Test booking takes a seat and a full slot is rejected.
+        """
+        response = self.book(self.students[0])
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.booked_count, 1)
+
+        response = self.book(self.students[1])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json()["msg"], "This slot is fully booked.")
+
+    def test_cancelled_booking_frees_seat(self):
+        """
+        Test deleting a booking releases its seat.
+        """
+        book_slot(self.students[0], self.slot.id).delete()
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.booked_count, 0)
+        self.assertEqual(self.book(self.students[1]).status_code, status.HTTP_201_CREATED)
+
+
+class StudentScheduleTests(TestCase):
+    def setUp(self):
+        """
+        Two teachers with slots tomorrow, one of them running past midnight, and a student.
+        """
+        self.book_url = reverse("book_class_slot")
+        self.day = timezone.now().date() + timedelta(days=1)
+        self.teachers = [create_user(i, "Teacher", "Math") for i in range(2)]
+        self.student = create_user(10, "Student")
+        self.access_token = str(RoleRefreshToken.for_user(self.student).access_token)
+        self.slots = {
+            (teacher_index, hour): TeacherAvailabilitySlot.objects.create(
+                teacher=self.teachers[teacher_index],
+                start_time=at_hour(self.day, hour),
+                end_time=at_hour(self.day, hour) + timedelta(hours=length)
+            )
+            for teacher_index, hour, length in ((0, 9, 1), (0, 11, 1), (1, 9, 1), (1, 10, 1), (1, 23, 2))
+        }
+
+    def book(self, teacher_index, hour):
+        return self.client.post(self.book_url, {
+            "slot_id": self.slots[teacher_index, hour].id
+        }, HTTP_AUTHORIZATION=f'Bearer {self.access_token}', content_type="application/json")
+
+    def test_conflicts_from_schedule(self):
+        """
+        Test both conflict rules are read from the day schedule, which follows creates and deletes.
+        """
+        self.assertEqual(self.book(0, 9).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.book(0, 11).json()["msg"], "You have already booked a slot with this teacher for the same date.")
+        self.assertEqual(self.book(1, 9).json()["msg"], "You have already booked a slot for this time range.")
+        self.assertEqual(self.book(1, 23).status_code, status.HTTP_201_CREATED)
+        # The late slot is copied into both days it touches
+        self.assertEqual(StudentDaySchedule.objects.filter(student=self.student).count(), 2)
+
+        SlotBooking.objects.filter(slot=self.slots[0, 9]).delete()
+        self.assertEqual(self.book(1, 9).json()["msg"], "You have already booked a slot with this teacher for the same date.")
+        self.assertEqual(self.book(0, 11).status_code, status.HTTP_201_CREATED)
+
+        SlotBooking.objects.filter(student=self.student).delete()
+        self.assertFalse(StudentDaySchedule.objects.filter(student=self.student).exists())
+
+    def test_first_booking_of_the_day_locks_a_row(self):
+        """
+        Test a student without schedule rows gets one to lock for each day the booking touches.
+        """
+        late_slot = self.slots[1, 23]
+        with transaction.atomic():
+            schedules = load_day_schedules(self.student.id, late_slot.start_time, late_slot.end_time)
+            self.assertEqual(set(schedules), {(self.student.id, self.day), (self.student.id, self.day + timedelta(days=1))})
+            self.assertEqual([row.entries for row in schedules.values()], [[], []])
+            # A failed booking rolls the new rows back
+            transaction.set_rollback(True)
+        self.assertFalse(StudentDaySchedule.objects.filter(student=self.student).exists())
+
+    def test_listing_from_schedule(self):
+        """
+        Test upcoming bookings are listed from the schedule in both pagination modes.
+        """
+        self.teachers.append(create_user(2, "Teacher", "Math"))
+        self.slots[2, 12] = TeacherAvailabilitySlot.objects.create(
+            teacher=self.teachers[2], start_time=at_hour(self.day, 12), end_time=at_hour(self.day, 13)
+        )
+        for key in ((0, 9), (1, 23), (2, 12)):
+            self.assertEqual(self.book(*key).status_code, status.HTTP_201_CREATED)
+        expected = list(SlotBooking.objects.order_by("start_time", "id").values_list("id", flat=True))
+
+        with self.assertNumQueries(2):
+            response = self.client.get(self.book_url, HTTP_AUTHORIZATION=f'Bearer {self.access_token}')
+        self.assertEqual([booking["id"] for booking in response.json()["results"]], expected)
+
+        response = self.client.get(self.book_url, {"date": (self.day + timedelta(days=1)).isoformat()}, HTTP_AUTHORIZATION=f'Bearer {self.access_token}')
+        self.assertEqual(response.json()["results"], [])
+
+        with mock.patch.object(KeysetPagination, "page_size", 2):
+            first_page = self.client.get(self.book_url, {"pagination": "cursor"}, HTTP_AUTHORIZATION=f'Bearer {self.access_token}').json()
+            second_page = self.client.get(first_page["next"], HTTP_AUTHORIZATION=f'Bearer {self.access_token}').json()
+            previous_page = self.client.get(second_page["previous"], HTTP_AUTHORIZATION=f'Bearer {self.access_token}').json()
+        self.assertEqual([booking["id"] for page in (first_page, second_page) for booking in page["results"]], expected)
+        self.assertIsNone(second_page["next"])
+        self.assertEqual(previous_page["results"], first_page["results"])
+
+
+    @override_settings(SLOT_LISTING_VALIDATORS=True)
+    def test_listing_conditional_get(self):
+        """
+        Test the booking listing answers 304 until the student's own bookings change.
+        """
+        get_cache().clear()
+        response = self.client.get(self.book_url, HTTP_AUTHORIZATION=f'Bearer {self.access_token}')
+        etag = response["ETag"]
+        with self.assertNumQueries(0):
+            response = self.client.get(self.book_url, HTTP_AUTHORIZATION=f'Bearer {self.access_token}', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Another student's booking leaves this listing alone
+        with self.captureOnCommitCallbacks(execute=True):
+            book_slot(create_user(11, "Student"), self.slots[0, 9].id)
+        response = self.client.get(self.book_url, HTTP_AUTHORIZATION=f'Bearer {self.access_token}', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.book(0, 9).status_code, status.HTTP_201_CREATED)
+        response = self.client.get(self.book_url, HTTP_AUTHORIZATION=f'Bearer {self.access_token}', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()["results"]), 1)
+
+class ConcurrentBookingTests(TransactionTestCase):
+    capacity = 3
+    attempts = 24
+
+    def setUp(self):
+        day = timezone.now().date() + timedelta(days=1)
+        self.students = [create_user(10 + i, "Student") for i in range(self.attempts)]
+        self.slot = TeacherAvailabilitySlot.objects.create(
+            teacher=create_user(1, "Teacher", "Math"),
+            start_time=at_hour(day, 9),
+            end_time=at_hour(day, 10),
+            capacity=self.capacity
+        )
+
+    def try_booking(self, student, slot_id=None):
+        """
+        Book the slot (or `slot_id`) for `student`; returns None on success or the BookingError
+        message. The shared in-memory test database refuses a second writer
+        with "table is locked" instead of waiting, so those attempts are
+        retried like a busy timeout would; any other error fails the test.
+        """
+        try:
+            while True:
+                try:
+                    book_slot(student, slot_id or self.slot.id)
+                    return None
+                except BookingError as e:
+                    return str(e)
+                except OperationalError as e:
+                    if 'locked' not in str(e):
+                        raise
+                    time_module.sleep(0.001)
+        finally:
+            connection.close()
+
+    def test_parallel_bookings_never_overbook(self):
+        """
+        Test many parallel bookings of one slot fill exactly its capacity and reject the rest as full.
+        """
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(self.try_booking, self.students))
+
+        self.slot.refresh_from_db()
+        self.assertEqual(results.count(None), self.capacity)
+        self.assertEqual(set(results) - {None}, {"This slot is fully booked."})
+        self.assertEqual(SlotBooking.objects.filter(slot=self.slot).count(), self.capacity)
+        self.assertEqual(self.slot.booked_count, self.capacity)
+
+    def test_parallel_overlapping_first_bookings_of_the_day(self):
+        """
+        Test a student without schedule rows booking two overlapping slots in parallel gets exactly one.
+        """
+        other = TeacherAvailabilitySlot.objects.create(
+            teacher=create_user(2, "Teacher", "Art"),
+            start_time=self.slot.start_time + timedelta(minutes=30),
+            end_time=self.slot.end_time + timedelta(minutes=30)
+        )
+        for student in self.students[:self.capacity]:
+            self.assertFalse(StudentDaySchedule.objects.filter(student=student).exists())
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                results = list(executor.map(self.try_booking, [student, student], [self.slot.id, other.id]))
+            self.assertEqual(results.count(None), 1)
+            self.assertIn("You have already booked a slot for this time range.", results)
+            self.assertEqual(SlotBooking.objects.filter(student=student).count(), 1)
+            self.assertEqual(len(StudentDaySchedule.objects.get(student=student).entries), 1)
+
+
+class TeacherSlotAPITests(TestCase):
+    def setUp(self):
+        """
+        A teacher with upcoming slots and an access token.
+        """
+        self.teacher_slots_url = reverse("teacher_slot_get_create")
+        self.day = timezone.now().date() + timedelta(days=1)
+        self.teacher = create_user(1, "Teacher", "Math")
+        self.access_token = str(RoleRefreshToken.for_user(self.teacher).access_token)
+        self.slots = [
+            TeacherAvailabilitySlot.objects.create(
+                teacher=self.teacher,
+                start_time=at_hour(self.day, hour),
+                end_time=at_hour(self.day, hour + 1)
+            )
+            for hour in range(8, 18)
+        ]
+
+    def get_slots(self):
+        return self.client.get(self.teacher_slots_url, HTTP_AUTHORIZATION=f'Bearer {self.access_token}')
+
+    def test_reserved_students(self):
+        """
+        Test reserved students match the UserSerializer representation.
+        """
+        student = create_user(10, "Student")
+        book_slot(student, self.slots[0].id)
+
+        response = self.get_slots()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.json()["results"]
+        self.assertEqual(results[0]["reserved_students"], [dict(UserSerializer(student).data)])
+        self.assertEqual(results[1]["reserved_students"], [])
+
+    def test_query_count_is_fixed(self):
+        """
+        Test listing slots costs the same number of queries however many students booked.
+        """
+        # Count, page and the reserved students; the token user needs no query
+        with self.assertNumQueries(3):
+            self.assertEqual(self.get_slots().status_code, status.HTTP_200_OK)
+
+        for i, slot in enumerate(self.slots):
+            for j in range(3):
+                book_slot(create_user(100 + i * 10 + j, "Student"), slot.id)
+
+        with self.assertNumQueries(3):
+            response = self.get_slots()
+        self.assertEqual(sum(len(slot["reserved_students"]) for slot in response.json()["results"]), 30)
+
+
+class TeacherSlotExportTests(TestCase):
+    def setUp(self):
+        """
+        Two teachers with slots tomorrow, two students booked on the first slot.
+        """
+        self.export_url = reverse("teacher_slot_export")
+        self.day = timezone.now().date() + timedelta(days=1)
+        self.teacher = create_user(1, "Teacher", "Math")
+        self.other_teacher = create_user(2, "Teacher", "Science")
+        self.slots = [
+            TeacherAvailabilitySlot.objects.create(
+                teacher=teacher,
+                start_time=at_hour(self.day, hour),
+                end_time=at_hour(self.day, hour + 1)
+            )
+            for teacher in (self.teacher, self.other_teacher)
+            for hour in range(8, 11)
+        ]
+        self.students = [create_user(10 + i, "Student") for i in range(2)]
+        for student in self.students:
+            book_slot(student, self.slots[0].id)
+
+    def export(self, user, **params):
+        token = RoleRefreshToken.for_user(user).access_token
+        return self.client.get(self.export_url, params, HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_teacher_ndjson(self):
+        """
+        Test teachers get one line per own slot, shaped like the teacher slot listing.
+        """
+        response = self.export(self.teacher, export_format="ndjson")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+
+        token = RoleRefreshToken.for_user(self.teacher).access_token
+        listing = self.client.get(reverse("teacher_slot_get_create"), HTTP_AUTHORIZATION=f'Bearer {token}').json()["results"]
+        self.assertEqual(lines, listing)
+        self.assertEqual(len(lines[0]["reserved_students"]), 2)
+
+    def test_staff_csv(self):
+        """
+        Test staff get every slot as CSV, one row per reserved student, and students are refused.
+        """
+        staff = create_user(20, "Student")
+        staff.is_staff = True
+        staff.save()
+
+        User.objects.filter(id=self.students[1].id).update(first_name='=HYPERLINK("http://x.test")', last_name="-1")
+
+        response = self.export(staff, teacher=self.teacher.id)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("attachment;", response["Content-Disposition"])
+        rows = list(csv.DictReader(StringIO(b"".join(response.streaming_content).decode())))
+        # Spreadsheet formulas in user-entered text are quoted
+        self.assertEqual((rows[1]["student_first_name"], rows[1]["student_last_name"]), ('\'=HYPERLINK("http://x.test")', "'-1"))
+        self.assertEqual(rows[0]["student_first_name"], "Student")
+        self.assertEqual(len(rows), 4)
+        self.assertEqual([row["student_email"] for row in rows[:2]], [student.email for student in self.students])
+        self.assertEqual(rows[2]["booking_id"], "")
+
+        self.assertEqual(len(list(csv.DictReader(StringIO(b"".join(self.export(staff).streaming_content).decode())))), 7)
+        self.assertEqual(self.export(self.students[0]).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.export(staff, export_format="xml").status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_command(self):
+        """
+        Test the export_slots command writes the same rows, filtered by teacher and day.
+        """
+        out = StringIO()
+        call_command("export_slots", "--teacher", str(self.other_teacher.id), "--date-from", self.day.isoformat(), stdout=out)
+        rows = list(csv.DictReader(StringIO(out.getvalue())))
+        self.assertEqual([int(row["slot_id"]) for row in rows], [slot.id for slot in self.slots[3:]])
+
+        out = StringIO()
+        call_command("export_slots", "--format", "ndjson", "--date-from", (self.day + timedelta(days=1)).isoformat(), stdout=out)
+        self.assertEqual(out.getvalue(), "")
+
+
+class TeacherSlotBulkAPITests(TestCase):
+    def setUp(self):
+        """
+        A teacher with one existing slot tomorrow at 10:00 and an access token.
+        """
+        self.bulk_url = reverse("teacher_slot_bulk_create")
+        self.day = timezone.localdate() + timedelta(days=1)
+        self.teacher = create_user(1, "Teacher", "Math")
+        self.access_token = str(RoleRefreshToken.for_user(self.teacher).access_token)
+        TeacherAvailabilitySlot.objects.create(
+            teacher=self.teacher,
+            start_time=at_hour(self.day, 10),
+            end_time=at_hour(self.day, 11)
+        )
+
+    def post_bulk(self, data):
+        return self.client.post(self.bulk_url, data, content_type="application/json", HTTP_AUTHORIZATION=f'Bearer {self.access_token}')
+
+    def item(self, start_hour, end_hour, **extra):
+        return {
+            "start_time": timezone.localtime(at_hour(self.day, start_hour)).strftime("%Y-%m-%d %H:%M"),
+            "end_time": timezone.localtime(at_hour(self.day, end_hour)).strftime("%Y-%m-%d %H:%M"),
+            **extra
+        }
+
+    def test_per_item_errors(self):
+        """
+        Test valid slots are created while invalid and overlapping ones are reported by index.
+        """
+        items = [
+            self.item(8, 9, capacity=5),
+            self.item(10, 11),  # overlaps the existing slot
+            self.item(12, 14),
+            self.item(13, 14),  # overlaps item 2
+            self.item(15, 15),  # invalid times
+        ]
+        response = self.post_bulk({"slots": items})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        data = response.json()["data"]
+        self.assertEqual([slot["start_time"] for slot in data["created"]], [items[0]["start_time"], items[2]["start_time"]])
+        self.assertEqual(data["created"][0]["capacity"], 5)
+        self.assertEqual(data["created"][1]["capacity"], 30)
+        self.assertEqual([error["index"] for error in data["errors"]], [1, 3, 4])
+        self.assertEqual(TeacherAvailabilitySlot.objects.filter(teacher=self.teacher).count(), 3)
+
+    def test_nothing_created(self):
+        """
+        Test a batch without any valid slot is rejected.
+        """
+        response = self.post_bulk({"slots": [self.item(10, 11)]})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json()["data"]["errors"][0]["index"], 0)
+
+    def test_bodies_that_are_not_lists_or_objects(self):
+        """
+        Test JSON bodies other than a list or an object get a 400 in the usual envelope.
+        """
+        for body in ("abc", 42, None):
+            response = self.post_bulk(json.dumps(body))
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(response.json()["msg"], "Please Pass a 'slots' list or a 'recurrence' rule.")
+
+    def test_recurrence(self):
+        """
+        Test a weekly rule expands to one slot per matching day and hour.
+        """
+        date_to = self.day + timedelta(days=13)
+        response = self.post_bulk({"recurrence": {
+            "date_from": self.day.isoformat(),
+            "date_to": date_to.isoformat(),
+            "weekdays": [self.day.weekday()],
+            "hours": [10, 16],
+        }})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        data = response.json()["data"]
+        # Two days, two hours each; the first 10:00 slot already exists
+        self.assertEqual(len(data["created"]), 3)
+        self.assertEqual([error["index"] for error in data["errors"]], [0])
+
+    def test_single_insert(self):
+        """
+        Test the slots are written with a single insert query.
+        """
+        items = [self.item(hour, hour + 1) for hour in range(12, 22)]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post_bulk({"slots": items})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        inserts = [query for query in queries.captured_queries if query["sql"].startswith("INSERT")]
+        self.assertEqual(len(inserts), 1)
+
+    def test_students_cannot_bulk_create(self):
+        """
+        Test only teachers can add slots.
+        """
+        self.access_token = str(RoleRefreshToken.for_user(create_user(10, "Student")).access_token)
+        response = self.post_bulk({"slots": [self.item(8, 9)]})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class RolePermissionTests(TestCase):
+    def setUp(self):
+        """
+        Access tokens for a teacher and a student.
+        """
+        self.teacher_token = str(RoleRefreshToken.for_user(create_user(1, "Teacher", "Math")).access_token)
+        self.student_token = str(RoleRefreshToken.for_user(create_user(2, "Student")).access_token)
+
+    def test_rejected_before_database(self):
+        """
+        Test a request with the wrong role is refused without touching the database.
+        """
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("teacher_available_slot"), HTTP_AUTHORIZATION=f'Bearer {self.teacher_token}')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(response.json(), {
+            "status": status.HTTP_403_FORBIDDEN,
+            "msg": "You do not have permission to requested endpoint.",
+            "data": {}
+        })
+
+    def test_rejected_before_parsing(self):
+        """
+        Test the request body is not parsed for a forbidden request.
+        """
+        response = self.client.post(reverse("book_class_slot"), "{not json", content_type="application/json", HTTP_AUTHORIZATION=f'Bearer {self.teacher_token}')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(response.json()["msg"], "You do not have permission to book a slot.")
+
+        response = self.client.get(reverse("teacher_slot_get_create"), HTTP_AUTHORIZATION=f'Bearer {self.student_token}')
+        self.assertEqual(response.json()["msg"], "You do not have permission to this endpoint.")
+
+    def test_unauthenticated(self):
+        """
+        Test requests without a token still get the invalid access key response.
+        """
+        response = self.client.get(reverse("book_class_slot"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.json()["msg"], "Invalid Access key.")
+
+
+class StudentTeacherSlotsAPITests(TestCase):
+    def setUp(self):
+        """
+        Upcoming slots of a math and a physics teacher, and a student token.
+        """
+        get_cache().clear()
+        self.catalog_url = reverse("teacher_available_slot")
+        day = timezone.now().date() + timedelta(days=1)
+        student = create_user(10, "Student")
+        self.access_token = str(RoleRefreshToken.for_user(student).access_token)
+        self.slots = []
+        for index, subject in enumerate(("Math", "Physics")):
+            teacher = create_user(index, "Teacher", subject)
+            for hour in range(8, 14):
+                self.slots.append(TeacherAvailabilitySlot.objects.create(
+                    teacher=teacher,
+                    start_time=at_hour(day, hour),
+                    end_time=at_hour(day, hour + 1),
+                    capacity=1
+                ))
+
+    def get_catalog(self, **params):
+        return self.client.get(self.catalog_url, params, HTTP_AUTHORIZATION=f'Bearer {self.access_token}')
+
+    def test_subject_filter(self):
+        """
+        Test subject search is case-insensitive and matches the subject prefix.
+        """
+        response = self.get_catalog(subject="PHY")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["count"], 6)
+        self.assertEqual({slot["subject"] for slot in response.json()["results"]}, {"Physics"})
+        self.assertEqual(self.get_catalog(subject="Chemistry").json()["count"], 0)
+
+    def test_date_window_filters(self):
+        """
+        Test date, date_from/date_to and tz filters select by start time range.
+        """
+        tomorrow = (timezone.now().date() + timedelta(days=1)).isoformat()
+        self.assertEqual(self.get_catalog(date=tomorrow).json()["count"], 12)
+        self.assertEqual(self.get_catalog(date_from=tomorrow, date_to=tomorrow).json()["count"], 12)
+        # In Honolulu (UTC-10) the day starts at 10:00 UTC, leaving the 10:00-13:00 slots
+        self.assertEqual(self.get_catalog(date=tomorrow, tz="Pacific/Honolulu").json()["count"], 8)
+
+        self.assertEqual(self.get_catalog(date="18-10-2026").status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.get_catalog(date="9999-12-31").status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.get_catalog(date="0001-01-01", tz="Asia/Tokyo").status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.get_catalog(date=tomorrow, tz="Mars/Olympus").status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_date_filter_is_a_range_predicate(self):
+        """
+        Test the date filter compiles to a plain range on start_time, not a date cast.
+        """
+        with CaptureQueriesContext(connection) as captured:
+            self.get_catalog(date=(timezone.now().date() + timedelta(days=1)).isoformat())
+        self.assertFalse(any("cast_date" in query["sql"].lower() for query in captured))
+
+    def test_cursor_pagination(self):
+        """
+        Test cursor pages walk the catalog in (start_time, id) order in both directions.
+        """
+        page_number_ids = [slot["id"] for page in (1, 2) for slot in self.get_catalog(page=page).json()["results"]]
+
+        first_page = self.get_catalog(pagination="cursor").json()
+        self.assertNotIn("count", first_page)
+        self.assertIsNone(first_page["previous"])
+
+        second_page = self.client.get(first_page["next"], HTTP_AUTHORIZATION=f'Bearer {self.access_token}').json()
+        self.assertIsNone(second_page["next"])
+        cursor_ids = [slot["id"] for page in (first_page, second_page) for slot in page["results"]]
+        self.assertEqual(cursor_ids, page_number_ids)
+
+        previous_page = self.client.get(second_page["previous"], HTTP_AUTHORIZATION=f'Bearer {self.access_token}').json()
+        self.assertEqual(previous_page["results"], first_page["results"])
+
+    def test_invalid_cursor(self):
+        """
+        Test a malformed cursor is rejected.
+        """
+        response = self.get_catalog(pagination="cursor", cursor="not-a-cursor")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(SLOT_CATALOG_PAGE_CACHE=True)
+    def test_catalog_cache(self):
+        """
+        Test repeated listings are served from the cache until a booking changes the day.
+        """
+        self.assertEqual(self.get_catalog()["X-Cache"], "MISS")
+        # A hit does not touch the database at all
+        with self.assertNumQueries(0):
+            response = self.get_catalog()
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertEqual(response.json()["count"], 12)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            book_slot(create_user(11, "Student"), self.slots[0].id)
+
+        response = self.get_catalog()
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.json()["count"], 11)
+        self.assertEqual(catalog_cache_stats(), {"hits": 1, "misses": 2, "hit_ratio": 0.3333})
+
+        out = StringIO()
+        call_command("catalog_cache_stats", stdout=out)
+        self.assertEqual(json.loads(out.getvalue()), catalog_cache_stats())
+        call_command("catalog_cache_stats", "--reset", stdout=StringIO())
+        self.assertEqual(catalog_cache_stats(), {"hits": 0, "misses": 0, "hit_ratio": None})
+
+    @override_settings(SLOT_LISTING_VALIDATORS=True)
+    def test_conditional_get(self):
+        """
+        Test a matching If-None-Match or If-Modified-Since gets a 304 without queries until a booking.
+        """
+        response = self.get_catalog()
+        etag, last_modified = response["ETag"], response["Last-Modified"]
+        with self.assertNumQueries(0):
+            response = self.client.get(self.catalog_url, HTTP_AUTHORIZATION=f'Bearer {self.access_token}', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+        response = self.client.get(self.catalog_url, HTTP_AUTHORIZATION=f'Bearer {self.access_token}', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        # Other query params are another listing
+        self.assertNotEqual(self.get_catalog(page=2)["ETag"], etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            book_slot(create_user(11, "Student"), self.slots[0].id)
+        response = self.client.get(self.catalog_url, HTTP_AUTHORIZATION=f'Bearer {self.access_token}', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["count"], 11)
+
+    def test_no_validators_with_a_process_local_cache(self):
+        """
+        Test listings send no ETag and never answer 304 when the version counters live in LocMemCache.
+        """
+        with override_settings(SLOT_LISTING_VALIDATORS=True):
+            etag = self.get_catalog()["ETag"]
+        response = self.client.get(self.catalog_url, HTTP_AUTHORIZATION=f'Bearer {self.access_token}', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("ETag", response)
+        self.assertNotIn("Last-Modified", response)
+
+    def test_no_page_cache_with_a_process_local_cache(self):
+        """
+        Test listings are never served from the page cache when it lives in LocMemCache.
+        """
+        self.get_catalog()
+        with self.assertNumQueries(2):
+            response = self.get_catalog()
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(catalog_cache_stats(), {"hits": 0, "misses": 0, "hit_ratio": None})
+
+    def get_heatmap(self, **params):
+        return self.client.get(reverse("teacher_available_slot_heatmap"), params, HTTP_AUTHORIZATION=f'Bearer {self.access_token}')
+
+    @override_settings(SLOT_CATALOG_PAGE_CACHE=True)
+    def test_heatmap(self):
+        """
+        Test the heatmap counts open slots per day and hour with one grouped query, cached until a booking.
+        """
+        tomorrow = (timezone.now().date() + timedelta(days=1)).isoformat()
+        with self.assertNumQueries(1):
+            response = self.get_heatmap(date_from=tomorrow, date_to=tomorrow)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("private", response["Cache-Control"])
+        self.assertEqual(response.json()["data"], {
+            tomorrow: {"slots": 12, "seats": 12, "hours": {str(hour): 2 for hour in range(8, 14)}}
+        })
+        self.assertEqual(self.get_heatmap(date=tomorrow, subject="Math").json()["data"][tomorrow]["slots"], 6)
+        # Hours are read in the requested timezone, shifting half an hour past the day's end
+        kolkata = self.get_heatmap(date=tomorrow, tz="Asia/Kolkata").json()["data"][tomorrow]["hours"]
+        self.assertEqual(kolkata, {str(hour): 2 for hour in range(13, 19)})
+
+        self.assertEqual(self.get_heatmap(date_from=tomorrow, date_to=tomorrow)["X-Cache"], "HIT")
+        with self.captureOnCommitCallbacks(execute=True):
+            book_slot(create_user(11, "Student"), self.slots[0].id)
+        response = self.get_heatmap(date_from=tomorrow, date_to=tomorrow)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.json()["data"][tomorrow]["hours"]["8"], 1)
+
+    def test_heatmap_needs_short_window(self):
+        """
+        Test the heatmap rejects a missing or too long date window.
+        """
+        self.assertEqual(self.get_heatmap().status_code, status.HTTP_400_BAD_REQUEST)
+        today = timezone.now().date()
+        response = self.get_heatmap(date_from=today.isoformat(), date_to=(today + timedelta(days=100)).isoformat())
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_query_count_is_fixed(self):
+        """
+        Test teacher profiles are joined instead of fetched per row.
+        """
+        # Count and page
+        with self.assertNumQueries(2):
+            response = self.get_catalog()
+        self.assertEqual(len(response.json()["results"]), 10)
+
+
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        """
+        Upcoming slots of two teachers, a student with one booking, and the async views.
+        """
+        get_cache().clear()
+        self.factory = AsyncRequestFactory()
+        day = timezone.now().date() + timedelta(days=1)
+        self.student = create_user(10, "Student")
+        self.headers = {"Authorization": f"Bearer {RoleRefreshToken.for_user(self.student).access_token}"}
+        self.slots = []
+        for index, subject in enumerate(("Math", "Physics")):
+            teacher = create_user(index, "Teacher", subject)
+            for hour in range(8, 16):
+                self.slots.append(TeacherAvailabilitySlot.objects.create(
+                    teacher=teacher,
+                    start_time=at_hour(day, hour),
+                    end_time=at_hour(day, hour + 1)
+                ))
+        book_slot(self.student, self.slots[0].id)
+
+    async def compare(self, view, name, params=None):
+        """Assert the async view answers a GET exactly like the sync one."""
+        url = reverse(name)
+        await sync_to_async(get_cache().clear)()
+        expected = await self.async_client.get(url, params or {}, headers=self.headers)
+        await sync_to_async(get_cache().clear)()
+        response = await view.as_view()(self.factory.get(url, params or {}, headers=self.headers))
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(json.loads(response.content), expected.json())
+        return response
+
+    async def test_catalog(self):
+        """
+        Test the async catalog matches the sync one across filters and pagination.
+        """
+        view = AsyncStudentTeacherSlotsAPIView
+        await self.compare(view, "teacher_available_slot")
+        await self.compare(view, "teacher_available_slot", {"page": 2, "subject": "math"})
+        await self.compare(view, "teacher_available_slot", {"page": 9})
+        response = await self.compare(view, "teacher_available_slot", {"pagination": "cursor"})
+        cursor_url = json.loads(response.content)["next"]
+        await self.compare(view, "teacher_available_slot", {"pagination": "cursor", "cursor": cursor_url.split("cursor=")[1]})
+        await self.compare(view, "teacher_available_slot", {"date": "2020-13-01"})
+
+    async def test_bookings(self):
+        """
+        Test listing and booking slots through the async booking view.
+        """
+        await self.compare(AsyncBookSlotAPIView, "book_class_slot")
+
+        view = AsyncBookSlotAPIView.as_view()
+        url = reverse("book_class_slot")
+        request = self.factory.post(url, {"slot_id": self.slots[9].id}, content_type="application/json", headers=self.headers)
+        response = await view(request)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(json.loads(response.content)["data"]["slot"]["id"], self.slots[9].id)
+
+        # Same teacher, same day
+        request = self.factory.post(url, {"slot_id": self.slots[10].id}, content_type="application/json", headers=self.headers)
+        response = await view(request)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(json.loads(response.content)["msg"], "You have already booked a slot with this teacher for the same date.")
+
+    async def test_auth_errors(self):
+        """
+        Test the async views keep the 401 and 403 envelopes.
+        """
+        view = AsyncBookSlotAPIView.as_view()
+        response = await view(self.factory.get(reverse("book_class_slot")))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(json.loads(response.content)["msg"], "Invalid Access key.")
+
+        teacher = await User.objects.aget(email="teacher0@yopmail.com")
+        headers = {"Authorization": f"Bearer {(await sync_to_async(RoleRefreshToken.for_user)(teacher)).access_token}"}
+        request = self.factory.post(reverse("book_class_slot"), {"slot_id": 1}, content_type="application/json", headers=headers)
+        response = await view(request)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(json.loads(response.content)["msg"], "You do not have permission to book a slot.")
+
+
+class FastSerializerTests(TestCase):
+    def setUp(self):
+        """
+        Slots of teachers with and without a profile, booked by a student with a unicode name.
+        """
+        day = timezone.now().date() + timedelta(days=1)
+        teachers = [create_user(1, "Teacher", "Mathématiques"), create_user(2, "Teacher")]
+        self.student = student = create_user(10, "Student")
+        student.first_name = "Zoë Ünal"
+        student.last_name = "Line\u2028Separator"
+        student.save()
+        for index, teacher in enumerate(teachers):
+            for hour in (9, 10):
+                slot = TeacherAvailabilitySlot.objects.create(
+                    teacher=teacher,
+                    start_time=at_hour(day, hour),
+                    end_time=at_hour(day, hour + 1)
+                )
+                if hour == 9 + index:
+                    book_slot(student, slot.id)
+
+    def assert_same_bytes(self, serializer_data, fast_rows):
+        self.assertEqual(FastJSONRenderer().render(fast_rows), JSONRenderer().render(serializer_data))
+
+    def test_payloads_match_model_serializers(self):
+        """
+        Test fast path rows render to the same bytes as the ModelSerializers.
+        """
+        for tz in ("UTC", "Asia/Kolkata"):
+            with timezone.override(tz):
+                slots = TeacherAvailabilitySlot.objects.order_by('start_time', 'id')
+                self.assert_same_bytes(
+                    AvailableSlotForStudent(slots, many=True).data,
+                    available_slot_rows(available_slot_values(slots))
+                )
+                self.assert_same_bytes(
+                    TeacherAvailabilitySlotSerializer(slots, many=True).data,
+                    teacher_slot_rows(list(teacher_slot_values(slots)))
+                )
+                bookings = SlotBooking.objects.order_by('start_time', 'id')
+                self.assert_same_bytes(
+                    SlotBookingForStudentSerializer(bookings, many=True).data,
+                    schedule_booking_rows(upcoming_bookings(self.student.id))
+                )
+
+
+# A file cache of its own, like the default request metrics cache, without touching the server's metrics
+@override_settings(REQUEST_METRICS_CACHE_ALIAS="test_request_metrics", CACHES={
+    **settings.CACHES,
+    "test_request_metrics": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": tempfile.mkdtemp()},
+})
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        call_command("request_metrics", reset=True, stdout=StringIO())
+        student = create_user(10, "Student")
+        self.access_token = str(RoleRefreshToken.for_user(student).access_token)
+        teacher = create_user(0, "Teacher", "Math")
+        day = timezone.now().date() + timedelta(days=1)
+        TeacherAvailabilitySlot.objects.create(teacher=teacher, start_time=at_hour(day, 8), end_time=at_hour(day, 9))
+
+    def get_catalog(self):
+        return self.client.get(reverse("teacher_available_slot"), HTTP_AUTHORIZATION=f'Bearer {self.access_token}')
+
+    def test_server_timing_header(self):
+        """
+        Test the Server-Timing header reports the request's query count and timings.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get_catalog()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        timing = response["Server-Timing"]
+        self.assertIn('db;dur=', timing)
+        self.assertIn(f'desc="{len(queries)} queries"', timing)
+        for name in ("serializer", "render", "total"):
+            self.assertIn(f"{name};dur=", timing)
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=0)
+    def test_sampling_disabled(self):
+        """
+        Test unsampled requests get no Server-Timing header.
+        """
+        response = self.get_catalog()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.has_header("Server-Timing"))
+
+    @override_settings(REQUEST_METRICS_FLUSH_INTERVAL=0)
+    def test_histogram_command(self):
+        """
+        Test the histogram sink publishes per-view metrics read by the request_metrics command.
+        """
+        self.get_catalog()
+        self.get_catalog()
+        self.assertEqual(collected_histograms()["StudentTeacherSlotsAPIView"]["count"], 2)
+        output = StringIO()
+        errors = StringIO()
+        call_command("request_metrics", view="StudentTeacherSlotsAPIView", stdout=output, stderr=errors)
+        self.assertIn("StudentTeacherSlotsAPIView", output.getvalue())
+        self.assertEqual(errors.getvalue(), "")
+
+    @override_settings(REQUEST_METRICS_CACHE_ALIAS="default")
+    def test_command_warns_about_process_local_caches(self):
+        """
+        Test the request_metrics command warns that a local-memory cache hides the server's metrics.
+        """
+        errors = StringIO()
+        call_command("request_metrics", stdout=StringIO(), stderr=errors)
+        self.assertIn("LocMemCache", errors.getvalue())
+
+
+class DatabaseSetupTests(TestCase):
+    @override_settings(SQLITE_PRAGMAS={"busy_timeout": 1234})
+    def test_sqlite_pragmas(self):
+        """
+        Test new SQLite connections run the configured PRAGMAs.
+        """
+        configure_sqlite(sender=connection.__class__, connection=connection)
+        with connection.cursor() as cursor:
+            self.assertEqual(cursor.execute("PRAGMA busy_timeout").fetchone()[0], 1234)
+
+
+class BenchmarkSuiteTests(TestCase):
+    def test_scenarios_run(self):
+        """
+        Test every benchmark scenario succeeds on a small dataset and reports its queries.
+        """
+        results = suite.run({"teachers": 3, "students": 6, "slots_per_day": 4, "days": 3, "repeat": 1})
+        for name in ("default_booking", "default_booking_status", "teacher_slots_export", "register_bulk"):
+            self.assertIn(name, results)
+        self.assertEqual(results["catalog_cached"]["queries"], 0)
+        self.assertTrue(all(result["runs"] == 1 for result in results.values()))
@@ -1,10 +1,25 @@
+from django.conf import settings
 from django.urls import path
-from slot_booking.views import TeacherSlotAPIView, StudentTeacherSlotsAPIView, BookSlotAPIView, DefaultSlotBookApiView
+from slot_booking.views import TeacherSlotAPIView, TeacherSlotBulkAPIView, TeacherSlotExportAPIView, StudentTeacherSlotsAPIView, SlotHeatmapAPIView, BookSlotAPIView, DefaultSlotBookApiView, DefaultSlotBookJobApiView
+from slot_booking.async_views import AsyncStudentTeacherSlotsAPIView, AsyncBookSlotAPIView
+
+
+# Catalog and booking have ASGI-native versions, see settings.ASYNC_VIEWS
+if settings.ASYNC_VIEWS:
+    catalog_view = AsyncStudentTeacherSlotsAPIView.as_view()
+    booking_view = AsyncBookSlotAPIView.as_view()
+else:
+    catalog_view = StudentTeacherSlotsAPIView.as_view()
+    booking_view = BookSlotAPIView.as_view()
 
 
 urlpatterns = [
     path('teacher-slots/', TeacherSlotAPIView.as_view(), name='teacher_slot_get_create'),
-    path('teacher-available-slot/', StudentTeacherSlotsAPIView.as_view(), name='teacher_available_slot'),
-    path('book-class-slot/', BookSlotAPIView.as_view(), name='book_class_slot'),
+    path('teacher-slots/bulk/', TeacherSlotBulkAPIView.as_view(), name='teacher_slot_bulk_create'),
+    path('teacher-slots/export/', TeacherSlotExportAPIView.as_view(), name='teacher_slot_export'),
+    path('teacher-available-slot/', catalog_view, name='teacher_available_slot'),
+    path('teacher-available-slot/heatmap/', SlotHeatmapAPIView.as_view(), name='teacher_available_slot_heatmap'),
+    path('book-class-slot/', booking_view, name='book_class_slot'),
     path('set-default-class-slot/', DefaultSlotBookApiView.as_view(), name='set_default_class_slot'),
+    path('set-default-class-slot/<int:job_id>/', DefaultSlotBookJobApiView.as_view(), name='default_class_slot_job'),
 ]
@@ -1,18 +1,39 @@
+from datetime import timedelta
+from django.conf import settings
 from rest_framework.generics import GenericAPIView
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticated, AllowAny
 from user.models import User
-from slot_booking.models import TeacherAvailabilitySlot, SlotBooking
-from slot_booking.serializers import TeacherAvailabilitySlotSerializer, AvailableSlotForStudent, SlotBookingForStudentSerializer
-from online_class_book.utils import get_response
+from user.permissions import IsTeacher, IsStudent, IsStaff
+from slot_booking.models import TeacherAvailabilitySlot, BookingJob
+from slot_booking.serializers import TeacherAvailabilitySlotSerializer, SlotBookingForStudentSerializer, SlotRecurrenceSerializer
+from slot_booking.fast_serializers import (
+    teacher_slot_values, teacher_slot_rows, new_teacher_slot_rows, available_slot_values, available_slot_rows,
+    schedule_booking_rows
+)
+from slot_booking.bulk_slots import create_bulk_slots, MAX_BULK_SLOTS
+from slot_booking.jobs import enqueue_default_booking, start_in_process_worker, job_data
+from slot_booking.booking import book_slot, BookingError
+from slot_booking.cache import catalog_validators, listing_validators, student_scope, get_cached_page, set_cached_page
+from slot_booking.schedules import upcoming_bookings
+from slot_booking.export import EXPORT_FORMATS, export_chunks
+from online_class_book.utils import get_response, get_date_window, validator_headers, get_not_modified_response
+from online_class_book.pagination import SelectablePaginationMixin
 from rest_framework.pagination import PageNumberPagination
-from django.utils.timezone import now
-from datetime import datetime
+from rest_framework.response import Response
+from django.db.models import F
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils.timezone import now, localtime
 
 
-class TeacherSlotAPIView(GenericAPIView):
+# Longest date window of the slot heatmap, about two months of calendar
+MAX_HEATMAP_DAYS = 62
 
-    permission_classes = [IsAuthenticated]
+
+class TeacherSlotAPIView(SelectablePaginationMixin, GenericAPIView):
+
+    permission_classes = [IsTeacher]
+    permission_denied_messages = {'POST': "You do not have permission to add slots."}
     pagination_class = PageNumberPagination  # Enable pagination for this view
 
 
@@ -20,49 +41,29 @@ class TeacherSlotAPIView(GenericAPIView):
         """
         Retrieve all upcoming availability slots for the authenticated teacher.
         """
-        date = request.query_params.get("date", None)  # Filter by start_date
-
-        # Check if the user is a teacher
-        if request.user.role != User.UserRole.TEACHER:
-            return get_response(
-                status.HTTP_403_FORBIDDEN,
-                "You do not have permission to this endpoint.",
-                {}
-            )
-
         # Filter future availability slots for the teacher and order by start_time
         slot_queryset = TeacherAvailabilitySlot.objects.filter(
-            teacher=request.user,
+            teacher_id=request.user.id,
             start_time__gt=now()  # Only include slots starting after the current time
-        ).order_by('start_time')
+        ).order_by('start_time', 'id')
 
-        if date:
-            try: 
-                date = datetime.strptime(date, "%Y-%m-%d").date()
-            except:
-                return get_response(status.HTTP_400_BAD_REQUEST, "Please Pass Valid Date Params in 'YYYY-MM-DD' format", {})
+        # Filter by date window (date or date_from/date_to) if provided
+        try:
+            window = get_date_window(request.query_params)
+        except ValueError as e:
+            return get_response(status.HTTP_400_BAD_REQUEST, str(e), {})
 
-            slot_queryset = slot_queryset.filter(start_time__date=date)
+        if window:
+            slot_queryset = slot_queryset.starting_within(window)
 
         # Paginate the queryset
-        slots = self.paginate_queryset(slot_queryset)
-
-        # Serialize the paginated slots
-        serializer = TeacherAvailabilitySlotSerializer(slots, many=True)
+        slots = self.paginate_queryset(teacher_slot_values(slot_queryset))
 
-        # Return the paginated response with serialized data
-        return self.get_paginated_response(serializer.data)
+        # Return the paginated response with the read-only fast path rows
+        return self.get_paginated_response(teacher_slot_rows(slots))
 
 
     def post(self, request):
-        # Check if the user is a teacher
-        if request.user.role != User.UserRole.TEACHER:
-            return get_response(
-                status.HTTP_403_FORBIDDEN,
-                "You do not have permission to add slots.",
-                {}
-            )
-
         # Add the teacher ID to the request data
         data = request.data.copy()
         data["teacher"] = request.user.id
@@ -75,12 +76,83 @@ class TeacherSlotAPIView(GenericAPIView):
         return get_response(status.HTTP_400_BAD_REQUEST, serializer.errors, {})
 
 
-class StudentTeacherSlotsAPIView(GenericAPIView):
+class TeacherSlotBulkAPIView(GenericAPIView):
+    """
+    API for teachers to publish many slots at once, from a list of slots
+    or a weekly recurrence rule. Invalid or overlapping items are reported
+    without failing the rest of the batch.
+    """
+    permission_classes = [IsTeacher]
+    permission_denied_messages = {'POST': "You do not have permission to add slots."}
+
+    def post(self, request):
+        # Accept a bare list, {"slots": [...]} or {"recurrence": {...}}; other JSON values get the 400 below
+        data = request.data if isinstance(request.data, (list, dict)) else {}
+        if isinstance(data, list):
+            items = data
+        elif data.get("recurrence") is not None:
+            recurrence = SlotRecurrenceSerializer(data=data["recurrence"])
+            if not recurrence.is_valid():
+                return get_response(status.HTTP_400_BAD_REQUEST, recurrence.errors, {})
+            items = recurrence.expand()
+        elif isinstance(data.get("slots"), list):
+            items = data["slots"]
+        else:
+            return get_response(status.HTTP_400_BAD_REQUEST, "Please Pass a 'slots' list or a 'recurrence' rule.", {})
+
+        if not items:
+            return get_response(status.HTTP_400_BAD_REQUEST, "No slots to create.", {})
+        if len(items) > MAX_BULK_SLOTS:
+            return get_response(status.HTTP_400_BAD_REQUEST, f"At most {MAX_BULK_SLOTS} slots can be created at once.", {})
+
+        slots, errors = create_bulk_slots(request.user.id, items)
+        payload = {'created': new_teacher_slot_rows(slots), 'errors': errors}
+        if not slots:
+            return get_response(status.HTTP_400_BAD_REQUEST, "No slots were created.", payload)
+        return get_response(status.HTTP_201_CREATED, f"{len(slots)} slots created successfully!", payload)
+
+
+class TeacherSlotExportAPIView(GenericAPIView):
+    """
+    API for teachers and staff to download slots with their reserved students
+    as CSV or NDJSON, streamed in chunks (see slot_booking/export.py).
+    Teachers get their own slots, staff all slots or one `teacher`'s.
+    """
+    permission_classes = [IsTeacher | IsStaff]
+
+    def get(self, request):
+        export_format = request.query_params.get("export_format", "csv")
+        if export_format not in EXPORT_FORMATS:
+            return get_response(status.HTTP_400_BAD_REQUEST, f"'export_format' must be one of {', '.join(EXPORT_FORMATS)}.", {})
+
+        try:
+            window = get_date_window(request.query_params)
+        except ValueError as e:
+            return get_response(status.HTTP_400_BAD_REQUEST, str(e), {})
+
+        slots_queryset = TeacherAvailabilitySlot.objects.all()
+        if request.user.role == User.UserRole.TEACHER:
+            slots_queryset = slots_queryset.filter(teacher_id=request.user.id)
+        elif request.query_params.get("teacher"):
+            try:
+                slots_queryset = slots_queryset.filter(teacher_id=int(request.query_params["teacher"]))
+            except ValueError:
+                return get_response(status.HTTP_400_BAD_REQUEST, "Please Pass a Valid 'teacher' ID.", {})
+        if window:
+            slots_queryset = slots_queryset.starting_within(window)
+
+        response = StreamingHttpResponse(export_chunks(slots_queryset, export_format), content_type=EXPORT_FORMATS[export_format])
+        response["Content-Disposition"] = f'attachment; filename="slots-{now():%Y%m%d%H%M%S}.{export_format}"'
+        return response
+
+
+class StudentTeacherSlotsAPIView(SelectablePaginationMixin, GenericAPIView):
     """
     API for students to retrieve teacher slots with optional filters for subject and start_date.
     """
     pagination_class = PageNumberPagination  # Enable pagination for this view
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsStudent]
+    permission_denied_messages = {'GET': "You do not have permission to requested endpoint."}
 
     def get(self, request):
         """
@@ -88,117 +160,157 @@ class StudentTeacherSlotsAPIView(GenericAPIView):
         """
         # Get query parameters
         subject = request.query_params.get("subject", None)  # Filter by subject
-        date = request.query_params.get("date", None)  # Filter by start_date
 
-        # Check if the user is a teacher
-        if request.user.role != User.UserRole.STUDENT:
-            return get_response(
-                status.HTTP_403_FORBIDDEN,
-                "You do not have permission to requested endpoint.",
-                {}
-            )
+        # Parse the date window (date or date_from/date_to) if provided
+        try:
+            window = get_date_window(request.query_params)
+        except ValueError as e:
+            return get_response(status.HTTP_400_BAD_REQUEST, str(e), {})
+
+        # Nothing changed since the client's copy: 304 before any query
+        cache_key, etag, last_modified = catalog_validators(request, window)
+        not_modified = get_not_modified_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+        headers = validator_headers(etag, last_modified)
+
+        # Serve the page from the catalog cache when nothing changed since it was built
+        cached_page = get_cached_page(cache_key)
+        if cached_page is not None:
+            return Response(cached_page, headers={'X-Cache': 'HIT', **headers})
 
         # Filter teacher slots
-        slots_queryset = TeacherAvailabilitySlot.objects.select_related('teacher').filter(
-            start_time__gt=now()  # Only future slots
+        slots_queryset = TeacherAvailabilitySlot.objects.filter(
+            start_time__gt=now(),  # Only future slots
+            booked_count__lt=F('capacity')  # Only slots with seats left
         )
 
         # Filter by subject if provided
         if subject:
-            slots_queryset = slots_queryset.filter(teacher__teacher_profile__subject__icontains=subject)
-
-        # Filter by start_date if provided
-        if date:
-            try: 
-                date = datetime.strptime(date, "%Y-%m-%d").date()
-            except:
-                return get_response(status.HTTP_400_BAD_REQUEST, "Please Pass Valid Date Params in 'YYYY-MM-DD' format", {})
-        
-            slots_queryset = slots_queryset.filter(start_time__date=date)
+            slots_queryset = slots_queryset.for_subject(subject)
+
+        # Filter by date window if provided
+        if window:
+            slots_queryset = slots_queryset.starting_within(window)
 
         # Order slots by start_time
-        slots_queryset = slots_queryset.order_by('start_time')
+        slots_queryset = slots_queryset.order_by('start_time', 'id')
 
         # Paginate the queryset
-        slots = self.paginate_queryset(slots_queryset)
+        slots = self.paginate_queryset(available_slot_values(slots_queryset))
 
-        # Serialize the paginated slots
-        serializer = AvailableSlotForStudent(slots, many=True)
+        # Return the paginated response with the read-only fast path rows
+        response = self.get_paginated_response(available_slot_rows(slots))
+        set_cached_page(cache_key, response.data)
+        response['X-Cache'] = 'MISS'
+        for name, value in headers.items():
+            response[name] = value
+        return response
 
-        # Return the paginated response with serialized data
-        return self.get_paginated_response(serializer.data)
 
+class SlotHeatmapAPIView(GenericAPIView):
+    """
+    API for calendar views: open slots per day and hour over a date window,
+    with an optional subject filter, counted with one grouped query.
+    """
+    permission_classes = [IsStudent]
+    permission_denied_messages = {'GET': "You do not have permission to requested endpoint."}
 
-class BookSlotAPIView(GenericAPIView):
+    def get(self, request):
+        """
+        Return {day: {slots, seats, hours: {hour: slots}}} for days with open
+        slots, read in the `tz` timezone when given.
+        """
+        subject = request.query_params.get("subject", None)
+
+        try:
+            window = get_date_window(request.query_params)
+        except ValueError as e:
+            return get_response(status.HTTP_400_BAD_REQUEST, str(e), {})
+
+        if window is None:
+            return get_response(status.HTTP_400_BAD_REQUEST, "Please Pass 'date' or 'date_from'/'date_to' Params.", {})
+        if window[1] - window[0] > timedelta(days=MAX_HEATMAP_DAYS):
+            return get_response(status.HTTP_400_BAD_REQUEST, f"The date range can span at most {MAX_HEATMAP_DAYS} days.", {})
+
+        # Same validators, cache and invalidation as the catalog listing
+        cache_key, etag, last_modified = catalog_validators(request, window)
+        not_modified = get_not_modified_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        data = get_cached_page(cache_key)
+        cache_status = 'HIT'
+        if data is None:
+            slots_queryset = TeacherAvailabilitySlot.objects.filter(
+                start_time__gt=now(),
+                booked_count__lt=F('capacity')
+            ).starting_within(window)
+            if subject:
+                slots_queryset = slots_queryset.for_subject(subject)
+
+            days = {}
+            for start_time, slot_count, seats in slots_queryset.start_time_counts():
+                start_time = localtime(start_time, window[0].tzinfo)
+                day = days.setdefault(start_time.date().isoformat(), {'slots': 0, 'seats': 0, 'hours': {}})
+                day['slots'] += slot_count
+                day['seats'] += seats
+                hour = str(start_time.hour)
+                day['hours'][hour] = day['hours'].get(hour, 0) + slot_count
+
+            data = {'status': status.HTTP_200_OK, 'msg': "Slot heatmap fetched successfully.", 'data': days}
+            set_cached_page(cache_key, data)
+            cache_status = 'MISS'
+
+        response = Response(data, headers={'X-Cache': cache_status, **validator_headers(etag, last_modified)})
+        patch_cache_control(response, private=True, max_age=settings.SLOT_CATALOG_CACHE_TIMEOUT)
+        return response
+
+
+class BookSlotAPIView(SelectablePaginationMixin, GenericAPIView):
     """
     API for students to book a teacher's slot.
     Validates that the user is a student and that the slot is available.
     """
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsStudent]
+    permission_denied_messages = {'POST': "You do not have permission to book a slot."}
 
     def get(self, request):
-        
-        date = request.query_params.get("date", None)
-
-        user_object = request.user
-        if user_object.role != User.UserRole.STUDENT:
-            return get_response(status.HTTP_403_FORBIDDEN, "You do not have permission to this endpoint.", {})
-        
-        booked_slot_queryset = user_object.booked_slots.filter(
-            slot__start_time__gt = now()
-        ).order_by('slot__start_time')
-
-        if date:
-            try: 
-                date = datetime.strptime(date, "%Y-%m-%d").date()
-            except:
-                return get_response(status.HTTP_400_BAD_REQUEST, "Please Pass Valid Date Params in 'YYYY-MM-DD' format", {})
 
-            booked_slot_queryset = booked_slot_queryset.filter(slot__start_time__date = date)
+        # Filter by date window (date or date_from/date_to) if provided
+        try:
+            window = get_date_window(request.query_params)
+        except ValueError as e:
+            return get_response(status.HTTP_400_BAD_REQUEST, str(e), {})
 
-        # Paginate the queryset
-        slots = self.paginate_queryset(booked_slot_queryset)
+        # Nothing booked or cancelled since the client's copy: 304 before any query
+        _, etag, last_modified = listing_validators(request, [student_scope(request.user.id)])
+        not_modified = get_not_modified_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
 
-        # Serialize the paginated slots
-        serializer = SlotBookingForStudentSerializer(slots, many=True)
+        # Upcoming bookings come from the student's day schedules, already sorted
+        slots = self.paginate_queryset(upcoming_bookings(request.user.id, window))
 
-        # Return the paginated response with serialized data
-        return self.get_paginated_response(serializer.data)
+        # Return the paginated response with the read-only fast path rows
+        response = self.get_paginated_response(schedule_booking_rows(slots))
+        for name, value in validator_headers(etag, last_modified).items():
+            response[name] = value
+        return response
 
 
     def post(self, request):
         """
         Handle the booking of a slot by a student.
         """
-        # Ensure the user is a student
-        if request.user.role != User.UserRole.STUDENT:
-            return get_response(status.HTTP_403_FORBIDDEN, "You do not have permission to book a slot.", {})
-        
         # Extract relevant data from request
         slot_id = request.data.get("slot_id")
-        print(slot_id)
 
-        # Check if the teacher's slot exists
-        slot_object = TeacherAvailabilitySlot.objects.select_related('teacher',
-                                                                    'teacher__teacher_profile').filter(id = slot_id).first()
+        try:
+            slot_booking = book_slot(request.user, slot_id)
+        except BookingError as e:
+            return get_response(status.HTTP_400_BAD_REQUEST, str(e), {})
 
-        if not slot_object:
-            return get_response(status.HTTP_400_BAD_REQUEST, "The slot does not exist.", {})
-        
-        # Check if the student has already booked a slot with the same teacher for the same date
-        if SlotBooking.objects.select_related('slot').filter(student=request.user, slot__teacher=slot_object.teacher, slot__start_time__date=slot_object.start_time.date()).exists():
-            return get_response(status.HTTP_400_BAD_REQUEST, "You have already booked a slot with this teacher for the same date.", {})
-        
-        # Check if the student has already booked a slot for the same time range
-        if SlotBooking.objects.select_related('slot').filter(student=request.user, slot__start_time__lt=slot_object.end_time, slot__end_time__gt=slot_object.start_time).exists():
-            return get_response(status.HTTP_400_BAD_REQUEST, "You have already booked a slot for this time range.", {})
-
-        # If validation passes, create the booking
-        slot_booking = SlotBooking.objects.create(
-            student=request.user,
-            slot=slot_object,
-        )
-        
         # Serialize the slot booking data
         serializer = SlotBookingForStudentSerializer(slot_booking)
         
@@ -208,59 +320,33 @@ class BookSlotAPIView(GenericAPIView):
 
 class DefaultSlotBookApiView(GenericAPIView):
     """
-    API to automatically book default slots for students should run code at the starting of the day.
-    Ensures each student attends all teacher classes without conflicts or repetition.
+    API to queue the automatic booking of today's default slots for students.
+    The booking itself runs in the booking worker (slot_booking/jobs.py);
+    there is one job per day, so repeated calls return the same job.
+    Staff only, as it writes bookings for every student.
     """
-    permission_classes = [AllowAny]
+    permission_classes = [IsStaff]
 
     def post(self, request):
         """
-        Automatically book slots for students who haven't attended all teacher classes today.
+        Queue today's default booking job and return its id.
         """
-        today = now().date()
+        job = enqueue_default_booking()
+        if settings.BOOKING_WORKER_IN_PROCESS:
+            start_in_process_worker()
 
-        # Get the list of teachers who have available slots today
-        available_teachers = list(
-            TeacherAvailabilitySlot.objects.filter(
-                start_time__date=today
-            ).distinct('teacher').values_list('teacher', flat=True)
-        )
-        print("available_teachers ", available_teachers)
-
-        # Fetch all students
-        students = User.objects.filter(role=User.UserRole.STUDENT)
-        print("students ", students)
-
-        for student in students:
-            # Get slots already booked by the student for today
-            booked_slots_today = student.booked_slots.filter(slot__start_time__date=today)
-
-            # Skip the student if they have already booked slots for all available teachers
-            if len(available_teachers) == booked_slots_today.count():
-                continue
-
-            # Iterate over available teachers and book slots
-            for teacher_id in available_teachers:
-                # Skip if the student already has a slot for this teacher
-                if booked_slots_today.filter(slot__teacher__id=teacher_id).exists():
-                    continue
-
-                # Get available slots for the teacher today
-                available_teacher_slots = TeacherAvailabilitySlot.objects.filter(
-                    teacher__id=teacher_id,
-                    start_time__date=today
-                )
-
-                # Book the first non-conflicting slot for the student
-                for slot in available_teacher_slots:
-                    if not booked_slots_today.filter(
-                        slot__start_time__lt=slot.end_time,
-                        slot__end_time__gt=slot.start_time
-                    ).exists():
-                        # Create the booking
-                        SlotBooking.objects.create(student=student, slot=slot)
-                        booked_slots_today = student.booked_slots.filter(slot__start_time__date=today)
-                        break  # Move to the next teacher
-
-        # Return a success response
-        return get_response(status.HTTP_201_CREATED, "Default slots booked successfully!", {})
+        return get_response(status.HTTP_202_ACCEPTED, "Default slot booking queued.", job_data(job))
+
+
+class DefaultSlotBookJobApiView(GenericAPIView):
+    """
+    API for staff to check the status of a default booking job.
+    """
+    permission_classes = [IsStaff]
+
+    def get(self, request, job_id):
+        job = BookingJob.objects.filter(id=job_id).first()
+        if job is None:
+            return get_response(status.HTTP_404_NOT_FOUND, "Job not found.", {})
+
+        return get_response(status.HTTP_200_OK, "Job status fetched successfully.", job_data(job))
@@ -0,0 +1,51 @@
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.models import TokenUser as BaseTokenUser
+from user.cache import get_cached_user
+from user.models import User
+from user.tokens import ROLE_CLAIM
+
+
+class TokenUser(BaseTokenUser):
+    """
+    Request user built from the access token alone. `id` and `role` come from
+    the token claims, so role checks cost no query; `user` loads the full row
+    when a view really needs it.
+    """
+
+    @cached_property
+    def role(self):
+        role = self.token.get(ROLE_CLAIM)
+        if role is None:
+            # Token issued before the role claim was added
+            user = self.user
+            role = user.role if user else None
+        return role
+
+    @cached_property
+    def user(self):
+        return get_cached_user(self.id)
+
+    async def aload(self):
+        """Load `role` in async code, where the sync fallback query is not allowed."""
+        if self.token.get(ROLE_CLAIM) is None and 'role' not in self.__dict__:
+            self.__dict__['user'] = await User.objects.filter(id=self.id).afirst()
+            self.__dict__['role'] = self.user.role if self.user else None
+
+
+class StatelessJWTAuthentication(JWTStatelessUserAuthentication):
+    """
+    JWT authentication that trusts the token claims instead of loading the
+    User row on every request.
+
+    A deleted or deactivated user keeps access until the access token expires;
+    logout still blacklists the refresh token.
+    """
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+        return TokenUser(validated_token)
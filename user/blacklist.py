@@ -0,0 +1,244 @@
+"""
+Token blacklist front for simplejwt's token_blacklist tables.
+
+Each process keeps a Bloom filter of the blacklisted token ids (jti), so
+checking a token that was never blacklisted, the common case on refresh,
+needs no query; only filter hits are confirmed against the database.
+
+Filters follow new blacklist rows incrementally. Writers bump a version in
+the cache so other processes catch up on their next check, and every
+process also re-syncs at least every TOKEN_BLACKLIST_SYNC_INTERVAL seconds
+in case the version was evicted. The purge command bumps a generation that
+makes every filter rebuild from scratch.
+
+With a process-local cache (locmem) processes never see each other's
+versions, so a token logged out in one process would still be accepted by
+the others until their next re-sync. The filter is then off unless
+settings.TOKEN_BLACKLIST_BLOOM forces it, accepting that window (a single
+process deployment, say).
+"""
+import hashlib
+import math
+import threading
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken, BlacklistedToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+from online_class_book.caches import is_process_local
+
+
+VERSION_KEY = 'token_blacklist:version'
+GENERATION_KEY = 'token_blacklist:generation'
+# Rows re-read below the last seen id, for ids committed out of order
+ID_OVERLAP = 1000
+
+
+def get_cache():
+    return caches[getattr(settings, 'TOKEN_BLACKLIST_CACHE_ALIAS', 'default')]
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter of strings, sized for `capacity` items at `error_rate`."""
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size = max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        # Double hashing over one 128-bit digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + index * second) % self.size for index in range(self.hash_count)]
+
+    def add(self, key):
+        positions = self._positions(key)
+        if all(self.bits[position >> 3] & (1 << (position & 7)) for position in positions):
+            return
+        for position in positions:
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def estimated_error_rate(self):
+        return (1 - math.exp(-self.hash_count * self.count / self.size)) ** self.hash_count
+
+
+class BlacklistFilter:
+    """Process-local Bloom filter of blacklisted jtis, kept in sync with the database."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.bloom = None
+        self._last_id = 0
+        self._version = None
+        self._generation = None
+        self._synced_at = 0
+        self.stats = dict.fromkeys(('checks', 'skipped_db', 'db_checks', 'syncs', 'rebuilds'), 0)
+
+    def sync(self):
+        cache = get_cache()
+        state = cache.get_many([VERSION_KEY, GENERATION_KEY])
+        version = state.get(VERSION_KEY)
+        generation = state.get(GENERATION_KEY)
+        interval = getattr(settings, 'TOKEN_BLACKLIST_SYNC_INTERVAL', 5)
+
+        with self._lock:
+            if self.bloom is None or generation != self._generation or self.bloom.count >= self.bloom.capacity:
+                self._rebuild(generation)
+            elif version != self._version or time.monotonic() - self._synced_at >= interval:
+                self._load(max(0, self._last_id - ID_OVERLAP))
+            else:
+                return
+            self._version = version
+            self._synced_at = time.monotonic()
+
+    def _rebuild(self, generation):
+        capacity = getattr(settings, 'TOKEN_BLACKLIST_BLOOM_CAPACITY', 100000)
+        capacity = max(capacity, 2 * BlacklistedToken.objects.count())
+        self.bloom = BloomFilter(capacity, getattr(settings, 'TOKEN_BLACKLIST_BLOOM_ERROR_RATE', 0.001))
+        self._last_id = 0
+        self._generation = generation
+        self._load(0)
+        self.stats['rebuilds'] += 1
+
+    def _load(self, after_id):
+        rows = BlacklistedToken.objects.filter(id__gt=after_id).order_by('id').values_list('id', 'token__jti')
+        for row_id, jti in rows.iterator(chunk_size=5000):
+            self.bloom.add(jti)
+            self._last_id = max(self._last_id, row_id)
+        self.stats['syncs'] += 1
+
+    def add(self, jtis):
+        """Record jtis blacklisted by this process without waiting for a sync."""
+        with self._lock:
+            if self.bloom is not None:
+                for jti in jtis:
+                    self.bloom.add(jti)
+
+    def is_blacklisted(self, jti):
+        self.sync()
+        self.stats['checks'] += 1
+        if jti not in self.bloom:
+            self.stats['skipped_db'] += 1
+            return False
+        self.stats['db_checks'] += 1
+        return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+    def reset(self):
+        """Drop the filter and counters; the next check rebuilds it."""
+        with self._lock:
+            self.bloom = None
+            self._generation = None
+            self.stats = dict.fromkeys(self.stats, 0)
+
+
+blacklist_filter = BlacklistFilter()
+
+
+def filter_enabled():
+    """Whether checks go through the Bloom filter: settings.TOKEN_BLACKLIST_BLOOM, or unset for only with a shared cache."""
+    enabled = getattr(settings, 'TOKEN_BLACKLIST_BLOOM', None)
+    if enabled is None:
+        enabled = not is_process_local(get_cache())
+    return enabled
+
+
+def is_blacklisted(jti):
+    if not filter_enabled():
+        return BlacklistedToken.objects.filter(token__jti=jti).exists()
+    return blacklist_filter.is_blacklisted(jti)
+
+
+def bump_version(key=VERSION_KEY):
+    get_cache().set(key, time.time_ns(), None)
+
+
+def blacklist_tokens(tokens):
+    """
+    Blacklist refresh tokens in a fixed number of queries however many are
+    given: their outstanding rows are read in one query and the blacklist
+    rows inserted with one bulk insert, skipping the ones that already
+    exist. Tokens without an outstanding row (RefreshToken.for_user records
+    one at login) get theirs in bulk first. Returns the blacklisted jtis.
+    """
+    tokens = {token.payload[api_settings.JTI_CLAIM]: token for token in tokens}
+    if not tokens:
+        return []
+
+    with transaction.atomic():
+        token_ids = dict(OutstandingToken.objects.filter(jti__in=tokens).values_list('jti', 'id'))
+        missing = [
+            OutstandingToken(jti=jti, token=str(token), expires_at=datetime_from_epoch(token.payload['exp']))
+            for jti, token in tokens.items() if jti not in token_ids
+        ]
+        if missing:
+            OutstandingToken.objects.bulk_create(missing, ignore_conflicts=True)
+            token_ids = dict(OutstandingToken.objects.filter(jti__in=tokens).values_list('jti', 'id'))
+        BlacklistedToken.objects.bulk_create(
+            [BlacklistedToken(token_id=token_id) for token_id in token_ids.values()],
+            ignore_conflicts=True
+        )
+        jtis = list(tokens)
+
+        def published():
+            blacklist_filter.add(jtis)
+            bump_version()
+
+        transaction.on_commit(published)
+    return jtis
+
+
+def purge_expired_tokens(chunk_size=5000, now=None):
+    """
+    Delete expired outstanding tokens and their blacklist rows, `chunk_size`
+    at a time so no single transaction holds many locks. Expired tokens fail
+    verification anyway, so dropping them loses nothing.
+    Returns (outstanding deleted, blacklisted deleted).
+    """
+    now = now or timezone.now()
+    outstanding_deleted = blacklisted_deleted = 0
+    while True:
+        with transaction.atomic():
+            ids = list(
+                OutstandingToken.objects.filter(expires_at__lt=now).order_by('id').values_list('id', flat=True)[:chunk_size]
+            )
+            if not ids:
+                break
+            # Blacklist rows go with their outstanding token (one DELETE each)
+            _, deleted = OutstandingToken.objects.filter(id__in=ids).delete()
+            outstanding_deleted += deleted.get(OutstandingToken._meta.label, 0)
+            blacklisted_deleted += deleted.get(BlacklistedToken._meta.label, 0)
+
+    if blacklisted_deleted:
+        # Filters still hold the purged jtis; have them rebuilt smaller
+        bump_version(GENERATION_KEY)
+    return outstanding_deleted, blacklisted_deleted
+
+
+def blacklist_stats():
+    """Table sizes and this process's filter counters."""
+    now = timezone.now()
+    bloom = blacklist_filter.bloom
+    return {
+        'outstanding': OutstandingToken.objects.count(),
+        'outstanding_expired': OutstandingToken.objects.filter(expires_at__lt=now).count(),
+        'blacklisted': BlacklistedToken.objects.count(),
+        'filter': {
+            'items': bloom.count,
+            'capacity': bloom.capacity,
+            'bytes': len(bloom.bits),
+            'hashes': bloom.hash_count,
+            'estimated_error_rate': round(bloom.estimated_error_rate(), 6),
+            **blacklist_filter.stats,
+        } if bloom is not None else None,
+    }
@@ -0,0 +1,154 @@
+"""
+Bulk user import: RegisterUserView for many rows at once, for the bulk
+register endpoint and the import_users command.
+
+Rows are validated with UserImportSerializer, then in chunks: checked for
+taken emails and phones with one query, hashed and inserted with
+bulk_create. The endpoint hashes in the shared password hash pool (see
+user.hashers), the command in processes of its own.
+"""
+import csv
+import io
+import json
+from contextlib import nullcontext
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from online_class_book.workers import spawn_pool
+from user import hash_worker
+from user.hashers import get_executor
+from user.models import User, TeacherProfile, normalize_subject
+from user.serializers import UserImportSerializer
+
+
+# Most rows accepted by one bulk register request, as each password hash
+# takes ~0.1s of CPU; larger files go through the import_users command
+MAX_IMPORT_ROWS = 500
+# Rows hashed and inserted per transaction
+IMPORT_BATCH_SIZE = 500
+# Passwords sent to a hash process at a time
+HASH_CHUNK_SIZE = 16
+
+IMPORT_FILE_MESSAGE = "Please Pass a UTF-8 CSV file or a JSON list of users."
+UNIQUE_FIELDS = ('email', 'phone')
+# Same wording as the unique checks of RegisterUserView
+TAKEN_MESSAGES = {field: f"user with this {field} already exists." for field in UNIQUE_FIELDS}
+REPEATED_MESSAGES = {field: f"This {field} appears earlier in the import." for field in UNIQUE_FIELDS}
+
+
+def import_format_of(filename):
+    return 'json' if filename.lower().endswith('.json') else 'csv'
+
+
+def read_rows(content, import_format):
+    """
+    Rows of an import file's bytes: a JSON list of users (or {"users": [...]})
+    or a CSV file with a header. Empty CSV cells are left out, like omitted
+    fields. Raises ValueError with a client message on unreadable files.
+    """
+    try:
+        text = content.decode('utf-8-sig')
+        if import_format == 'json':
+            rows = json.loads(text)
+            if isinstance(rows, dict):
+                rows = rows.get('users')
+        else:
+            rows = [{key: value for key, value in row.items() if key and value} for row in csv.DictReader(io.StringIO(text))]
+    except (UnicodeDecodeError, json.JSONDecodeError, csv.Error):
+        raise ValueError(IMPORT_FILE_MESSAGE)
+    if not isinstance(rows, list):
+        raise ValueError(IMPORT_FILE_MESSAGE)
+    return rows
+
+
+def import_users(rows, batch_size=IMPORT_BATCH_SIZE, workers=None):
+    """
+    Register the valid users of `rows` (RegisterUserView input), hashing
+    passwords in `workers` spawned processes, or in the shared hash pool when
+    not given. Returns (number of users created, per-row errors) where each
+    error is {'index': position in `rows`, 'errors': ...}.
+    """
+    errors = []
+    valid = []
+    seen = {field: set() for field in UNIQUE_FIELDS}
+    # One serializer checks every row, as ListSerializer does, so its fields are built once
+    serializer = UserImportSerializer()
+    for index, row in enumerate(rows):
+        try:
+            data = serializer.run_validation(row)
+        except ValidationError as e:
+            errors.append({'index': index, 'errors': e.detail})
+            continue
+        repeated = {field: [REPEATED_MESSAGES[field]] for field in UNIQUE_FIELDS if data[field] in seen[field]}
+        if repeated:
+            errors.append({'index': index, 'errors': repeated})
+            continue
+        for field in UNIQUE_FIELDS:
+            seen[field].add(data[field])
+        valid.append((index, data))
+
+    created = 0
+    # Spawning and setting up Django in each process only pays off for the command's large files
+    with spawn_pool(workers) if workers and workers > 1 and len(valid) > 1 else nullcontext(get_executor()) as pool:
+        for start in range(0, len(valid), batch_size):
+            chunk_created, chunk_errors = insert_chunk(valid[start:start + batch_size], pool)
+            created += chunk_created
+            errors.extend({'index': index, 'errors': row_errors} for index, row_errors in chunk_errors.items())
+
+    errors.sort(key=lambda error: error['index'])
+    return created, errors
+
+
+def taken_errors(chunk):
+    """Errors of the (index, data) rows whose email or phone is already registered, by index; one query."""
+    existing = User.objects.filter(
+        Q(email__in=[data['email'] for _, data in chunk]) | Q(phone__in=[data['phone'] for _, data in chunk])
+    ).values_list(*UNIQUE_FIELDS)
+    taken = {field: set(values) for field, values in zip(UNIQUE_FIELDS, zip(*existing))}
+    errors = {}
+    for index, data in chunk:
+        row_errors = {field: [TAKEN_MESSAGES[field]] for field in taken if data[field] in taken[field]}
+        if row_errors:
+            errors[index] = row_errors
+    return errors
+
+
+def save_users(rows):
+    """Insert (index, data, password hash) rows and the teachers' profiles in one transaction."""
+    users = [
+        User(
+            email=data['email'],
+            first_name=data.get('first_name', ''),
+            last_name=data.get('last_name', ''),
+            phone=data['phone'],
+            age=data.get('age'),
+            role=data['role'],
+            password=password
+        )
+        for _, data, password in rows
+    ]
+    with transaction.atomic():
+        User.objects.bulk_create(users)
+        # bulk_create skips TeacherProfile.save, which sets subject_key
+        TeacherProfile.objects.bulk_create([
+            TeacherProfile(user=user, subject=data['subject'], subject_key=normalize_subject(data['subject']))
+            for user, (_, data, _) in zip(users, rows)
+            if user.role == User.UserRole.TEACHER
+        ])
+
+
+def insert_chunk(chunk, pool):
+    """Check, hash in `pool` and insert a chunk of valid (index, data) rows. Returns (created, errors by index)."""
+    errors = taken_errors(chunk)
+    chunk = [(index, data) for index, data in chunk if index not in errors]
+    # Thread pools ignore chunksize; process pools send passwords in batches
+    passwords = pool.map(hash_worker.make_password, [data['password'] for _, data in chunk], chunksize=HASH_CHUNK_SIZE)
+    rows = [(index, data, password) for (index, data), password in zip(chunk, passwords)]
+    try:
+        save_users(rows)
+    except IntegrityError:
+        # Someone registered since the check: check again and insert the others
+        errors.update(taken_errors(chunk))
+        rows = [row for row in rows if row[0] not in errors]
+        save_users(rows)
+    return len(rows), errors
@@ -0,0 +1,48 @@
+import threading
+import time
+from django.conf import settings
+from user.models import User
+
+
+class UserCache:
+    """
+    Small in-process cache of User rows keyed by id, for views that need the
+    full row behind a stateless token. Entries live for `ttl` seconds; a ttl
+    of 0 disables caching.
+    """
+
+    def __init__(self, ttl=0, max_size=10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        if self.ttl > 0:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > time.monotonic():
+                return entry[1]
+
+        user = User.objects.filter(id=user_id).first()
+        if user is not None and self.ttl > 0:
+            with self._lock:
+                if len(self._entries) >= self.max_size:
+                    self._entries.clear()
+                self._entries[user_id] = (time.monotonic() + self.ttl, user)
+        return user
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache(getattr(settings, 'USER_CACHE_TTL', 0))
+
+
+def get_cached_user(user_id):
+    """User row for `user_id`, or None if it no longer exists."""
+    return user_cache.get(user_id)
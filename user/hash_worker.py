@@ -0,0 +1,8 @@
+"""
+Process pool entry points for user.bulk_import, see online_class_book.workers.
+"""
+
+
+def make_password(raw_password):
+    from django.contrib.auth.hashers import make_password
+    return make_password(raw_password)
@@ -0,0 +1,60 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher, ScryptPasswordHasher, make_password, verify_password
+)
+
+
+class TunedScryptPasswordHasher(ScryptPasswordHasher):
+    """Scrypt with the cost parameters of settings.PASSWORD_SCRYPT."""
+
+    def __init__(self):
+        params = settings.PASSWORD_SCRYPT
+        self.work_factor = params['work_factor']
+        self.block_size = params['block_size']
+        self.parallelism = params['parallelism']
+        # hashlib's default limit is too low for larger work factors
+        self.maxmem = 2 * 128 * self.work_factor * self.block_size * self.parallelism
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """Argon2 with the cost parameters of settings.PASSWORD_ARGON2."""
+
+    def __init__(self):
+        params = settings.PASSWORD_ARGON2
+        self.time_cost = params['time_cost']
+        self.memory_cost = params['memory_cost']
+        self.parallelism = params['parallelism']
+
+
+_executor = None
+
+
+def get_executor():
+    """Shared pool for password hashing; hashlib and argon2 release the GIL."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'PASSWORD_HASH_WORKERS', 1),
+            thread_name_prefix='password-hash'
+        )
+    return _executor
+
+
+async def acheck_password(user, raw_password):
+    """
+    Async User.check_password with the hashing done in the hash pool, so the
+    event loop keeps serving other requests meanwhile. Passwords stored with
+    an outdated hasher or parameters are rehashed and saved on success.
+
+    `user` may be None, in which case a hash is still computed to keep the
+    response time of unknown emails the same.
+    """
+    loop = asyncio.get_running_loop()
+    encoded = user.password if user is not None else None
+    is_correct, must_update = await loop.run_in_executor(get_executor(), verify_password, raw_password, encoded)
+    if is_correct and must_update:
+        user.password = await loop.run_in_executor(get_executor(), make_password, raw_password)
+        await user.asave(update_fields=['password'])
+    return is_correct
@@ -0,0 +1,29 @@
+import json
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from user.bulk_import import IMPORT_BATCH_SIZE, import_users, read_rows, import_format_of
+
+
+class Command(BaseCommand):
+    help = (
+        "Register users from a CSV or JSON file with the RegisterUserView fields, in chunks, "
+        "and report the rows that were not registered."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV file with a header row, or JSON list of users.")
+        parser.add_argument('--format', choices=('csv', 'json'), dest='import_format', help="File format, from the file extension by default.")
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE, help="Users hashed and inserted per transaction.")
+        parser.add_argument('--workers', type=int, default=settings.PASSWORD_IMPORT_WORKERS, help="Processes hashing passwords, settings.PASSWORD_IMPORT_WORKERS by default.")
+
+    def handle(self, *args, **options):
+        with open(options['path'], 'rb') as import_file:
+            content = import_file.read()
+        try:
+            rows = read_rows(content, options['import_format'] or import_format_of(options['path']))
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        created, errors = import_users(rows, options['batch_size'], options['workers'])
+        self.stdout.write(f"Registered {created} of {len(rows)} users.")
+        self.stdout.write(json.dumps({'created': created, 'errors': errors}, indent=2))
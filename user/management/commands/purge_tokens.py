@@ -0,0 +1,17 @@
+import json
+from django.core.management.base import BaseCommand
+from user.blacklist import purge_expired_tokens, blacklist_stats
+
+
+class Command(BaseCommand):
+    help = "Delete expired outstanding and blacklisted JWT refresh tokens in chunks, and report blacklist sizes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000, help="Tokens deleted per transaction.")
+        parser.add_argument('--stats', action='store_true', help="Only report blacklist sizes.")
+
+    def handle(self, *args, **options):
+        if not options['stats']:
+            outstanding, blacklisted = purge_expired_tokens(options['chunk_size'])
+            self.stdout.write(f"Deleted {outstanding} expired outstanding tokens and {blacklisted} blacklisted tokens.")
+        self.stdout.write(json.dumps(blacklist_stats(), indent=2))
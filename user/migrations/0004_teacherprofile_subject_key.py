@@ -0,0 +1,43 @@
+# Generated by Django 5.1.4 on 2026-10-18 03:00
+
+from django.db import migrations, models
+from django.db.models.functions import Lower, Trim
+
+
+def fill_subject_key(apps, schema_editor):
+    TeacherProfile = apps.get_model('user', 'TeacherProfile')
+    TeacherProfile.objects.update(subject_key=Lower(Trim('subject')))
+
+
+def create_trigram_index(apps, schema_editor):
+    # Substring subject search on PostgreSQL is served by a pg_trgm GIN index
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS user_teacherprofile_subject_key_trgm '
+        'ON user_teacherprofile USING gin (subject_key gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS user_teacherprofile_subject_key_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0003_alter_user_phone'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='teacherprofile',
+            name='subject_key',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=20),
+        ),
+        migrations.RunPython(fill_subject_key, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
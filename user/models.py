@@ -26,7 +26,18 @@ class User(AbstractUser):
       return "{}".format(self.email)
 
 
+def normalize_subject(subject):
+   """Canonical form of a subject used for indexed subject search."""
+   return subject.strip().lower()
+
+
 class TeacherProfile(models.Model):
    
    user = models.OneToOneField(User, related_name="teacher_profile", on_delete=models.CASCADE)
    subject = models.CharField(max_length=20)
+   # Normalized copy of subject, indexed for subject search
+   subject_key = models.CharField(max_length=20, db_index=True, editable=False, default='')
+
+   def save(self, *args, **kwargs):
+      self.subject_key = normalize_subject(self.subject)
+      super().save(*args, **kwargs)
@@ -0,0 +1,48 @@
+from rest_framework.permissions import BasePermission
+from user.models import User
+
+
+class HasRole(BasePermission):
+    """
+    Allow authenticated users with `role`. The role is read from the request
+    user, which for token users is the token claim, so the check runs before
+    the body is parsed and without a query.
+
+    Views can set `permission_denied_messages` to a {method: message} dict to
+    word the 403 per method.
+    """
+    role = None
+    message = "You do not have permission to this endpoint."
+
+    def has_permission(self, request, view):
+        user = request.user
+        if not (user and user.is_authenticated):
+            return False
+        if getattr(user, 'role', None) == self.role:
+            return True
+        self.message = getattr(view, 'permission_denied_messages', {}).get(request.method, self.message)
+        return False
+
+
+class IsTeacher(HasRole):
+    role = User.UserRole.TEACHER
+
+
+class IsStudent(HasRole):
+    role = User.UserRole.STUDENT
+
+
+class IsStaff(BasePermission):
+    """
+    Allow authenticated staff users. The flag is not a token claim, so it is
+    read from the user's cached row; put role checks first in `|` to skip it.
+    """
+    message = "You do not have permission to this endpoint."
+
+    def has_permission(self, request, view):
+        user = request.user
+        if not (user and user.is_authenticated):
+            return False
+        # Token users carry the row on `user`
+        user = getattr(user, 'user', user)
+        return bool(user and user.is_staff)
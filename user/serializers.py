@@ -1,9 +1,10 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
 from user.models import User, TeacherProfile
+from online_class_book.instrumentation import TimedSerializerMixin
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     
     # For Subject Field For Teacher
     subject = serializers.CharField(write_only=True, required=False)
@@ -51,6 +52,21 @@ class UserSerializer(serializers.ModelSerializer):
         return data
 
 
+class UserImportSerializer(UserSerializer):
+    """
+    UserSerializer checks for one row of a bulk import. The unique email and
+    phone checks query per row, so they are left to the import, which checks
+    all rows against one pre-fetched set (see user.bulk_import).
+    """
+
+    class Meta(UserSerializer.Meta):
+        extra_kwargs = {
+            **UserSerializer.Meta.extra_kwargs,
+            'email': {'validators': []},
+            'phone': {'validators': []},
+        }
+
+
 class LoginUserSerializer(serializers.ModelSerializer):
     email = serializers.EmailField(write_only=True)
     password = serializers.CharField(write_only=True)
@@ -70,3 +86,9 @@ class LoginUserSerializer(serializers.ModelSerializer):
 
         data['user'] = user
         return data
+
+
+class LoginCredentialsSerializer(serializers.Serializer):
+    """Login input checks only; the async login view verifies the password itself."""
+    email = serializers.EmailField()
+    password = serializers.CharField()
@@ -1,8 +1,24 @@
-from django.test import TestCase
+import json
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.contrib.auth.hashers import make_password
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, AsyncRequestFactory, override_settings
+from django.utils import timezone
 from django.urls import reverse
 from rest_framework import status
 from user.models import User
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.tokens import RefreshToken, AccessToken
+from user.authentication import StatelessJWTAuthentication
+from user.cache import UserCache
+from user.views import AsyncLoginAPIView
+from user.tokens import RoleRefreshToken
+from user.bulk_import import import_users, read_rows
+from user.blacklist import BloomFilter, blacklist_filter, blacklist_tokens, get_cache, purge_expired_tokens
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken, BlacklistedToken
 
 
 class RegisterAPITests(TestCase):
@@ -62,6 +78,112 @@ class RegisterAPITests(TestCase):
         self.assertIn("phone", response.json()["msg"])  # Validate duplicate phone error
 
 
+class BulkRegisterAPITests(TestCase):
+    def setUp(self):
+        """
+        A staff user with an access token, and import rows with every kind of error.
+        """
+        self.bulk_register_url = reverse("register_bulk")
+        self.staff = User.objects.create_user(
+            email="staff@yopmail.com", first_name="Staff", last_name="User", phone="9000000000",
+            role="Student", is_staff=True
+        )
+        self.access_token = str(RoleRefreshToken.for_user(self.staff).access_token)
+        self.rows = [
+            {"email": "student1@yopmail.com", "first_name": "Student", "last_name": "One", "phone": "8000000001", "age": 19, "role": "Student", "password": "Student@123"},
+            {"email": "teacher1@yopmail.com", "first_name": "Teacher", "last_name": "One", "phone": "8000000002", "age": 30, "role": "Teacher", "password": "Teacher@123", "subject": " Math "},
+            {"email": "student2@yopmail.com", "first_name": "Student", "last_name": "Two", "phone": "80000", "role": "Student", "password": "Student@123"},
+            {"email": "student1@yopmail.com", "first_name": "Student", "last_name": "Three", "phone": "8000000003", "role": "Student", "password": "Student@123"},
+            {"email": "student4@yopmail.com", "first_name": "Student", "last_name": "Four", "phone": "9000000000", "role": "Student", "password": "Student@123"},
+        ]
+
+    def test_bulk_register(self):
+        """
+        Test valid rows are registered like RegisterUserView does and the others reported by index.
+        """
+        # Requests hash in the shared hash pool, without spawning processes
+        with mock.patch("user.bulk_import.spawn_pool") as spawn_pool:
+            response = self.client.post(
+                self.bulk_register_url, {"users": self.rows}, content_type="application/json",
+                HTTP_AUTHORIZATION=f'Bearer {self.access_token}'
+            )
+        spawn_pool.assert_not_called()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        data = response.json()["data"]
+        self.assertEqual(data["created"], 2)
+        self.assertEqual([error["index"] for error in data["errors"]], [2, 3, 4])
+        self.assertIn("phone", data["errors"][0]["errors"])
+        self.assertEqual(data["errors"][1]["errors"], {"email": ["This email appears earlier in the import."]})
+        self.assertEqual(data["errors"][2]["errors"], {"phone": ["user with this phone already exists."]})
+
+        teacher = User.objects.get(email="teacher1@yopmail.com")
+        self.assertTrue(teacher.check_password("Teacher@123"))
+        self.assertEqual(teacher.teacher_profile.subject_key, "math")
+        self.assertFalse(hasattr(User.objects.get(email="student1@yopmail.com"), "teacher_profile"))
+
+        # Nothing left to register
+        response = self.client.post(
+            self.bulk_register_url, self.rows[:2], content_type="application/json",
+            HTTP_AUTHORIZATION=f'Bearer {self.access_token}'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json()["data"]["errors"][0]["errors"], {
+            "email": ["user with this email already exists."], "phone": ["user with this phone already exists."]
+        })
+
+    def test_bodies_that_are_not_lists_or_objects(self):
+        """
+        Test JSON bodies other than a list or an object get a 400 in the usual envelope.
+        """
+        for body in ("abc", 42, None):
+            response = self.client.post(
+                self.bulk_register_url, json.dumps(body), content_type="application/json",
+                HTTP_AUTHORIZATION=f'Bearer {self.access_token}'
+            )
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(response.json()["msg"], "Please Pass a 'users' list or a CSV/JSON 'file'.")
+
+    def test_csv_upload_and_command(self):
+        """
+        Test CSV files through the upload and the import_users command, and that only staff may import.
+        """
+        header = ["email", "first_name", "last_name", "phone", "age", "role", "password", "subject"]
+        lines = [",".join(header)] + [",".join(str(row.get(field, "")) for field in header) for row in self.rows[:2]]
+        upload = SimpleUploadedFile("users.csv", "\n".join(lines).encode())
+        response = self.client.post(self.bulk_register_url, {"file": upload}, HTTP_AUTHORIZATION=f'Bearer {self.access_token}')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()["data"], {"created": 2, "errors": []})
+
+        with tempfile.NamedTemporaryFile("w", suffix=".json") as import_file:
+            json.dump([{**self.rows[0], "email": "student5@yopmail.com", "phone": "8000000005"}, self.rows[0]], import_file)
+            import_file.flush()
+            out = StringIO()
+            call_command("import_users", import_file.name, stdout=out)
+        self.assertIn("Registered 1 of 2 users.", out.getvalue())
+        self.assertTrue(User.objects.filter(email="student5@yopmail.com").exists())
+
+        student = User.objects.get(email="student1@yopmail.com")
+        token = RoleRefreshToken.for_user(student).access_token
+        response = self.client.post(self.bulk_register_url, self.rows, content_type="application/json", HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_optional_names_and_hash_pool(self):
+        """
+        Test rows with empty optional names import, with passwords hashed in spawned processes as the command does.
+        """
+        content = (
+            b"email,first_name,last_name,phone,age,role,password\n"
+            b"a@yopmail.com,,L,8000000011,20,Student,Student@123\n"
+            b"b@yopmail.com,F,,8000000012,,Student,Student@123\n"
+        )
+        created, errors = import_users(read_rows(content, "csv"), workers=2)
+        self.assertEqual((created, errors), (2, []))
+        first = User.objects.get(email="a@yopmail.com")
+        self.assertEqual((first.first_name, first.last_name), ("", "L"))
+        self.assertTrue(first.check_password("Student@123"))
+        self.assertEqual(User.objects.get(email="b@yopmail.com").last_name, "")
+
+
 class LoginAPITests(TestCase):
     def setUp(self):
         """
@@ -213,3 +335,240 @@ class LogoutAPITests(TestCase):
         }, content_type="application/json")
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
         self.assertIn("Invalid Access key", str(response.content))
+
+
+class StatelessAuthenticationTests(TestCase):
+    def setUp(self):
+        """
+        Set up a teacher and the tokens issued at login.
+        """
+        self.user = User.objects.create_user(
+            email="teacher@yopmail.com",
+            first_name="Teacher",
+            last_name="User",
+            phone="8498364650",
+            age=25,
+            role="Teacher",
+            password="Teacher@123"
+        )
+        response = self.client.post(reverse("login"), {
+            "email": "teacher@yopmail.com",
+            "password": "Teacher@123"
+        }, content_type="application/json")
+        self.tokens = response.json()["data"]
+
+    def test_tokens_carry_role(self):
+        """
+        Test login and refreshed access tokens carry the role claim.
+        """
+        self.assertEqual(AccessToken(self.tokens["access"])["role"], "Teacher")
+        response = self.client.post(reverse("refresh"), {"refresh": self.tokens["refresh"]}, content_type="application/json")
+        self.assertEqual(AccessToken(response.json()["data"]["access"])["role"], "Teacher")
+
+    def test_role_without_query(self):
+        """
+        Test the token user's id and role need no query.
+        """
+        authentication = StatelessJWTAuthentication()
+        with self.assertNumQueries(0):
+            user = authentication.get_user(authentication.get_validated_token(self.tokens["access"]))
+            self.assertEqual((user.id, user.role), (self.user.id, "Teacher"))
+
+    def test_token_without_role_claim(self):
+        """
+        Test tokens issued before the role claim fall back to the user row.
+        """
+        authentication = StatelessJWTAuthentication()
+        user = authentication.get_user(authentication.get_validated_token(str(RefreshToken.for_user(self.user).access_token)))
+        with self.assertNumQueries(1):
+            self.assertEqual(user.role, "Teacher")
+
+    def test_user_cache(self):
+        """
+        Test cached users are reused within the ttl and dropped when saved.
+        """
+        cache = UserCache(ttl=60)
+        with self.assertNumQueries(1):
+            self.assertEqual(cache.get(self.user.id), self.user)
+            self.assertEqual(cache.get(self.user.id), self.user)
+
+        cache.invalidate(self.user.id)
+        with self.assertNumQueries(1):
+            cache.get(self.user.id)
+
+        with self.assertNumQueries(2):
+            self.assertEqual(UserCache(ttl=0).get(self.user.id), self.user)
+            UserCache(ttl=0).get(self.user.id)
+
+
+@override_settings(PASSWORD_HASHERS=[
+    "user.hashers.TunedScryptPasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+])
+class PasswordHashingTests(TestCase):
+    def setUp(self):
+        """
+        Set up a student whose password was hashed with PBKDF2 before opting in to scrypt.
+        """
+        self.user = User.objects.create_user(
+            email="student@yopmail.com",
+            first_name="Student",
+            last_name="User",
+            phone="8498364650",
+            age=19,
+            role="Student"
+        )
+        self.user.password = make_password("Student@123", hasher="pbkdf2_sha256")
+        self.user.save()
+
+    def test_rehash_on_login(self):
+        """
+        Test logging in upgrades the stored hash to the preferred hasher.
+        """
+        response = self.client.post(reverse("login"), {
+            "email": "student@yopmail.com",
+            "password": "Student@123"
+        }, content_type="application/json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("scrypt$32768$"))
+        self.assertTrue(self.user.check_password("Student@123"))
+
+    async def test_async_login(self):
+        """
+        Test the async login view issues tokens and rehashes like the sync one.
+        """
+        view = AsyncLoginAPIView.as_view()
+        factory = AsyncRequestFactory()
+
+        request = factory.post("/api/login/", {"email": "student@yopmail.com", "password": "Wrong@123"}, content_type="application/json")
+        response = await view(request)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(json.loads(response.content)["msg"], {"detail": ["Invalid email or password"]})
+
+        request = factory.post("/api/login/", {"email": "student@yopmail.com", "password": "Student@123"}, content_type="application/json")
+        response = await view(request)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = json.loads(response.content)["data"]
+        self.assertEqual(AccessToken(data["access"])["role"], "Student")
+        self.assertEqual(data["user_details"]["email"], "student@yopmail.com")
+
+        await self.user.arefresh_from_db()
+        self.assertTrue(self.user.password.startswith("scrypt$"))
+
+
+class TokenBlacklistTests(TestCase):
+    def setUp(self):
+        """
+        Set up a student with a fresh blacklist filter.
+        """
+        get_cache().clear()
+        blacklist_filter.reset()
+        self.user = User.objects.create_user(
+            email="student@yopmail.com",
+            first_name="Student",
+            last_name="User",
+            phone="8498364650",
+            age=19,
+            role="Student"
+        )
+        self.refresh = RoleRefreshToken.for_user(self.user)
+
+    def refresh_access(self, token):
+        return self.client.post(reverse("refresh"), {"refresh": str(token)}, content_type="application/json")
+
+    @override_settings(TOKEN_BLACKLIST_BLOOM=True)
+    def test_refresh_skips_database(self):
+        """
+        Test refreshing a token that was never blacklisted runs no query once the filter is loaded.
+        """
+        self.assertEqual(self.refresh_access(self.refresh).status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.refresh_access(self.refresh).status_code, status.HTTP_200_OK)
+        self.assertEqual(blacklist_filter.stats["skipped_db"], 2)
+
+    def test_process_local_cache_checks_database(self):
+        """
+        Test that with a local-memory cache, which hides other processes' logouts, every check reads the database.
+        """
+        with self.assertNumQueries(1):
+            self.assertEqual(self.refresh_access(self.refresh).status_code, status.HTTP_200_OK)
+        # Logged out by another process
+        BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=self.refresh["jti"]))
+        self.assertEqual(self.refresh_access(self.refresh).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(blacklist_filter.stats["checks"], 0)
+
+    @override_settings(TOKEN_BLACKLIST_BLOOM=True)
+    def test_forced_filter_revocation_window(self):
+        """
+        Test a filter forced on with a local cache accepts another process's logout until its next sync.
+        """
+        self.assertEqual(self.refresh_access(self.refresh).status_code, status.HTTP_200_OK)
+        BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=self.refresh["jti"]))
+        self.assertEqual(self.refresh_access(self.refresh).status_code, status.HTTP_200_OK)
+        with override_settings(TOKEN_BLACKLIST_SYNC_INTERVAL=0):
+            self.assertEqual(self.refresh_access(self.refresh).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_logout_blacklists(self):
+        """
+        Test a logged out refresh token can no longer be used.
+        """
+        self.assertEqual(self.refresh_access(self.refresh).status_code, status.HTTP_200_OK)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse("logout"), {
+                "refresh": str(self.refresh)
+            }, HTTP_AUTHORIZATION=f'Bearer {self.refresh.access_token}', content_type="application/json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.refresh_access(self.refresh)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("Token is blacklisted", str(response.json()["msg"]))
+
+    def test_batched_writes(self):
+        """
+        Test blacklisting many tokens costs the same queries as one, and repeats are ignored.
+        """
+        tokens = [RoleRefreshToken.for_user(self.user) for _ in range(5)]
+        # One read of the outstanding rows and one insert, inside a savepoint
+        with self.assertNumQueries(4):
+            blacklist_tokens(tokens[:1])
+        with self.assertNumQueries(4):
+            blacklist_tokens(tokens)
+        self.assertEqual(BlacklistedToken.objects.count(), 5)
+
+        # Tokens without outstanding rows get them in bulk first
+        unrecorded = [RoleRefreshToken.for_user(self.user) for _ in range(3)]
+        OutstandingToken.objects.filter(jti__in=[token["jti"] for token in unrecorded]).delete()
+        with self.assertNumQueries(6):
+            blacklist_tokens(unrecorded)
+        self.assertEqual(BlacklistedToken.objects.count(), 8)
+
+    def test_purge_expired(self):
+        """
+        Test expired tokens and their blacklist rows are purged in chunks.
+        """
+        tokens = [RoleRefreshToken.for_user(self.user) for _ in range(5)]
+        blacklist_tokens(tokens[:3])
+        OutstandingToken.objects.filter(jti__in=[token["jti"] for token in tokens[:4]]).update(
+            expires_at=timezone.now() - timedelta(days=1)
+        )
+
+        self.assertEqual(purge_expired_tokens(chunk_size=2), (4, 3))
+        # The login token and one unexpired token are left
+        self.assertEqual(OutstandingToken.objects.count(), 2)
+        self.assertEqual(BlacklistedToken.objects.count(), 0)
+
+        output = StringIO()
+        call_command("purge_tokens", "--stats", stdout=output)
+        self.assertIn('"outstanding": 2', output.getvalue())
+
+    def test_bloom_filter(self):
+        """
+        Test the filter has no false negatives and about the configured false positive rate.
+        """
+        bloom = BloomFilter(1000, 0.01)
+        for index in range(1000):
+            bloom.add(f"jti-{index}")
+        self.assertTrue(all(f"jti-{index}" in bloom for index in range(1000)))
+        false_positives = sum(f"other-{index}" in bloom for index in range(10000))
+        self.assertLess(false_positives, 300)
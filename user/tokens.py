@@ -0,0 +1,35 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from user.blacklist import is_blacklisted, blacklist_tokens
+
+
+# Claims copied from the user into issued tokens, read back by user.authentication.TokenUser
+ROLE_CLAIM = 'role'
+
+
+class RoleRefreshToken(RefreshToken):
+    """
+    Refresh token carrying the user's role. Access tokens made from it,
+    including refreshed ones, copy the claim. Blacklist checks and writes go
+    through user.blacklist.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token[ROLE_CLAIM] = user.role
+        return token
+
+    def check_blacklist(self):
+        if is_blacklisted(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        return blacklist_tokens([self])
+
+
+class RoleTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = RoleRefreshToken
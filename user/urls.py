@@ -1,10 +1,16 @@
+from django.conf import settings
 from django.urls import path
-from user.views import LoginAPIView, RegisterUserView, CustomRefreshTokenView, LogoutApiView
+from user.views import LoginAPIView, AsyncLoginAPIView, RegisterUserView, BulkRegisterUserView, CustomRefreshTokenView, LogoutApiView
+
+
+# The async login only pays off under ASGI
+login_view = AsyncLoginAPIView.as_view() if settings.ASYNC_VIEWS else LoginAPIView.as_view()
 
 
 urlpatterns = [
-    path('login/', LoginAPIView.as_view(), name='login'),
+    path('login/', login_view, name='login'),
     path('register/', RegisterUserView.as_view(), name='register'),
+    path('register/bulk/', BulkRegisterUserView.as_view(), name='register_bulk'),
     path('refresh/', CustomRefreshTokenView.as_view(), name='refresh'),
     path('logout/', LogoutApiView.as_view(), name='logout'),
 ]
@@ -1,9 +1,14 @@
+from asgiref.sync import sync_to_async
 from rest_framework.generics import GenericAPIView
 from rest_framework import status
-from online_class_book.utils import get_response
-from rest_framework_simplejwt.tokens import RefreshToken
-from rest_framework_simplejwt.serializers import TokenRefreshSerializer
-from user.serializers import UserSerializer, LoginUserSerializer
+from online_class_book.utils import get_response, get_json_response
+from online_class_book.async_views import AsyncAPIView
+from user.tokens import RoleRefreshToken, RoleTokenRefreshSerializer
+from user.models import User
+from user.hashers import acheck_password
+from user.permissions import IsStaff
+from user.bulk_import import import_users, read_rows, import_format_of, MAX_IMPORT_ROWS
+from user.serializers import UserSerializer, LoginUserSerializer, LoginCredentialsSerializer
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 
@@ -25,6 +30,50 @@ class RegisterUserView(GenericAPIView):
         return get_response(status.HTTP_400_BAD_REQUEST, serializer.errors, {})
 
 
+class BulkRegisterUserView(GenericAPIView):
+    """
+    API for staff to register many users at once, from a JSON list or an
+    uploaded CSV or JSON `file` (see user.bulk_import). Invalid or taken rows
+    are reported without failing the rest.
+    """
+    permission_classes = [IsStaff]
+
+    def post(self, request):
+        upload = request.FILES.get("file")
+        if upload is not None:
+            try:
+                rows = read_rows(upload.read(), import_format_of(upload.name))
+            except ValueError as e:
+                return get_response(status.HTTP_400_BAD_REQUEST, str(e), {})
+        elif isinstance(request.data, list):
+            rows = request.data
+        elif isinstance(request.data, dict) and isinstance(request.data.get("users"), list):
+            rows = request.data["users"]
+        else:
+            return get_response(status.HTTP_400_BAD_REQUEST, "Please Pass a 'users' list or a CSV/JSON 'file'.", {})
+
+        if not rows:
+            return get_response(status.HTTP_400_BAD_REQUEST, "No users to register.", {})
+        if len(rows) > MAX_IMPORT_ROWS:
+            return get_response(status.HTTP_400_BAD_REQUEST, f"At most {MAX_IMPORT_ROWS} users can be registered at once.", {})
+
+        created, errors = import_users(rows)
+        payload = {'created': created, 'errors': errors}
+        if not created:
+            return get_response(status.HTTP_400_BAD_REQUEST, "No users were registered.", payload)
+        return get_response(status.HTTP_201_CREATED, f"{created} users registered successfully!", payload)
+
+
+def login_data(user):
+    """Tokens, carrying the user's role, and user details returned by the login views."""
+    refresh = RoleRefreshToken.for_user(user)
+    return {
+        'refresh': str(refresh),
+        'access': str(refresh.access_token),
+        'user_details': UserSerializer(user).data
+    }
+
+
 class LoginAPIView(GenericAPIView):
 
     permission_classes = [AllowAny]
@@ -37,26 +86,36 @@ class LoginAPIView(GenericAPIView):
         if serializer.is_valid():
             user = serializer.validated_data['user']
 
-            # Generate JWT tokens
-            refresh = RefreshToken.for_user(user)
-            access_token = str(refresh.access_token)
-            refresh_token = str(refresh)
-
-            user_serializer = UserSerializer(user)
-
-            data = {
-                    'refresh': refresh_token,
-                    'access': access_token
-                }
-            data['user_details'] = user_serializer.data
-
             # Custom response
-            return get_response(status.HTTP_200_OK, "Login successful !", data) 
+            return get_response(status.HTTP_200_OK, "Login successful !", login_data(user))
 
         # Custom error response
         return get_response(status.HTTP_400_BAD_REQUEST, serializer.errors, {})
 
 
+class AsyncLoginAPIView(AsyncAPIView):
+    """
+    Async version of LoginAPIView for ASGI deployments, enabled with
+    settings.ASYNC_VIEWS. The password hash is verified in the hash pool
+    (see user.hashers) instead of blocking a request thread.
+    """
+    authentication_classes = []
+
+    async def post(self, request):
+        serializer = LoginCredentialsSerializer(data=request.data)
+        if not serializer.is_valid():
+            return get_json_response(status.HTTP_400_BAD_REQUEST, serializer.errors, {})
+
+        # Same checks as ModelBackend.authenticate
+        user = await User._default_manager.filter(email=serializer.validated_data['email']).afirst()
+        if not await acheck_password(user, serializer.validated_data['password']) or not user.is_active:
+            return get_json_response(status.HTTP_400_BAD_REQUEST, {"detail": ["Invalid email or password"]}, {})
+
+        # Issuing tokens writes the outstanding refresh token
+        data = await sync_to_async(login_data)(user)
+        return get_json_response(status.HTTP_200_OK, "Login successful !", data)
+
+
 class CustomRefreshTokenView(GenericAPIView):
 
     permission_classes = [AllowAny]
@@ -65,7 +124,7 @@ class CustomRefreshTokenView(GenericAPIView):
     """
     def post(self, request):
         try:
-            serializer = TokenRefreshSerializer(data=request.data)
+            serializer = RoleTokenRefreshSerializer(data=request.data)
             if serializer.is_valid(raise_exception=True):
                 # Get the new access token from the serializer
                 access_token = serializer.validated_data.get('access')
@@ -90,7 +149,7 @@ class LogoutApiView(GenericAPIView):
         if not refresh_token:
             return get_response(status.HTTP_400_BAD_REQUEST, "Refresh token is required", {})
         try:
-            token = RefreshToken(refresh_token)
+            token = RoleRefreshToken(refresh_token)
             token.blacklist()  # Blacklist the token
             return get_response(status.HTTP_200_OK, "Logout successful", {})
 